@@ -0,0 +1,79 @@
+"""
+Activity summary benchmark: the one-row DataFrame get_summary used to return (built, then read
+field by field with .iloc[0] the way processor.py does) vs. the slotted ActivitySummary record,
+and gathering many summaries into one table by concatenating frames vs. summaries_frame().
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_activity_summary [--activities 1000]
+"""
+from src.activity_summary import FIELDS, ActivitySummary, summaries_frame
+from time import perf_counter
+import argparse
+import numpy as np
+import pandas as pd
+import tracemalloc
+
+
+# Reference implementation, as get_summary built its result and processor.py read it
+def legacy_summary(values: dict) -> pd.DataFrame:
+    return pd.DataFrame({name: [value] for name, value in values.items()})
+
+def legacy_read(summary_df: pd.DataFrame) -> list:
+    return [summary_df[name].iloc[0] for name in FIELDS]
+
+def synthetic_values(count: int, seed: int = 0) -> list:
+    rng    = np.random.default_rng(seed)
+    result = []
+    for _ in range(count):
+        values = {name: int(rng.integers(0, 400)) for name in FIELDS}
+        values.update({name: f"{values[name] // 60}m" for name in FIELDS if name.endswith('_string')})
+        values['intensity_factor'] = round(float(rng.random()), 3)
+        result.append(values)
+    return result
+
+def allocated(func) -> float:
+    # MiB still allocated by what func() returns
+    tracemalloc.start()
+    result = func()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size / 1024**2
+
+def timed(func) -> tuple:
+    ts     = perf_counter()
+    result = func()
+    return perf_counter() - ts, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the activity summary record")
+    parser.add_argument('--activities', type=int, default=1000, help="number of synthetic summaries")
+    args = parser.parse_args()
+
+    values = synthetic_values(args.activities)
+
+    legacy_time, frames    = timed(lambda: [legacy_summary(v) for v in values])
+    record_time, summaries = timed(lambda: [ActivitySummary(**v) for v in values])
+    legacy_read_time, _    = timed(lambda: [legacy_read(df) for df in frames])
+    record_read_time, _    = timed(lambda: [[getattr(s, name) for name in FIELDS] for s in summaries])
+    legacy_table_time, old = timed(lambda: pd.concat(frames, ignore_index=True))
+    record_table_time, new = timed(lambda: summaries_frame(summaries))
+
+    pd.testing.assert_frame_equal(old, new)
+    for frame, summary in zip(frames[:10], summaries):
+        pd.testing.assert_frame_equal(frame, summary.to_frame())
+
+    frames_mib  = allocated(lambda: [legacy_summary(v) for v in values])
+    records_mib = allocated(lambda: [ActivitySummary(**v) for v in values])
+
+    print(f"{args.activities} summaries of {len(FIELDS)} fields")
+    print(f"{'step':<24} {'DataFrame (ms)':>15} {'record (ms)':>12} {'speedup':>9}")
+    for step, old_time, new_time in [('build', legacy_time, record_time),
+                                     ('read every field', legacy_read_time, record_read_time),
+                                     ('batch to one table', legacy_table_time, record_table_time)]:
+        print(f"{step:<24} {old_time * 1e3:>15.1f} {new_time * 1e3:>12.1f} {old_time / new_time:>8.0f}x")
+    print(f"{'memory (MiB)':<24} {frames_mib:>15.2f} {records_mib:>12.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Aerobic training effect inference benchmark: per-call model loading vs. the shared model registry,
+and single vs. batch predictions.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_aerobic_te
+
+When ./models/aerobic_training_effect_model.keras is not available, an untrained network with
+the same inputs is saved to a temporary folder and used instead; timings are representative,
+predicted values are not.
+"""
+from src.inference import AEROBIC_TE_FEATURES, MODEL_FILE, SCALER_FILE, AerobicTrainingEffectModel, REGISTRY
+from time import perf_counter
+import numpy as np
+import os
+import pandas as pd
+import src.utils as h
+import tempfile
+
+
+def stand_in_model(path: str):
+    import tensorflow as tf
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(len(AEROBIC_TE_FEATURES),)),
+        tf.keras.layers.Dense(64, activation='relu'),
+        tf.keras.layers.Dense(32, activation='relu'),
+        tf.keras.layers.Dense(1),
+    ])
+    model.save(path)
+
+def synthetic_activities(count: int) -> pd.DataFrame:
+    rng     = np.random.default_rng(42)
+    zones   = rng.uniform(0, 3600, size=(count, 5))
+    total   = zones.sum(axis=1)
+    return pd.DataFrame({
+        'activity_distance':     rng.uniform(10, 200, count).round(),
+        'hr_average':            rng.uniform(110, 170, count).round(),
+        'hr_max':                rng.uniform(150, 190, count).round(),
+        'hr_time_in_zone_1':     zones[:, 0],
+        'hr_time_in_zone_2':     zones[:, 1],
+        'hr_time_in_zone_3':     zones[:, 2],
+        'hr_time_in_zone_4':     zones[:, 3],
+        'hr_time_in_zone_5':     zones[:, 4],
+        'intensity_factor':      rng.uniform(0.5, 1.05, count).round(3),
+        'time_total':            total,
+        'training_stress_score': rng.uniform(20, 400, count).round(1),
+    })
+
+def main(count: int = 1000, legacy_count: int = 5):
+    with tempfile.TemporaryDirectory() as tmp:
+        model_file = MODEL_FILE
+        if not os.path.isfile(model_file):
+            model_file = os.path.join(tmp, 'stand_in_model.keras')
+            stand_in_model(model_file)
+            print(f"{MODEL_FILE} not found, using an untrained stand-in network")
+
+        REGISTRY.clear()
+        # Point the shared registry at the model used for this run
+        REGISTRY.get('aerobic_training_effect', lambda: AerobicTrainingEffectModel(model_file, SCALER_FILE))
+
+        activities = synthetic_activities(count)
+
+        # Previous behaviour: load the model and scaler, and trace a new graph, on every call
+        ts = perf_counter()
+        for i in range(legacy_count):
+            AerobicTrainingEffectModel(model_file, SCALER_FILE).predict(activities.iloc[[i]])
+        legacy = (perf_counter() - ts) / legacy_count
+
+        ts = perf_counter()
+        single_values = [h.predict_aerobic_training_effect(activities.iloc[[i]]) for i in range(count)]
+        single = (perf_counter() - ts) / count
+
+        ts = perf_counter()
+        batch_values = h.predict_aerobic_training_effect_batch(activities)
+        batch = (perf_counter() - ts) / count
+
+        assert np.allclose(single_values, batch_values, atol=0.1)
+
+        print(f"activities:                {count}")
+        print(f"load per call (previous):  {legacy * 1e3:10.3f} ms/activity")
+        print(f"registry, single calls:    {single * 1e3:10.3f} ms/activity")
+        print(f"registry, one batch call:  {batch * 1e3:10.3f} ms/activity")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Chart benchmark: Vega-Lite spec size and build time of create_chart at full resolution vs.
+downsampled with LTTB, on the FIT samples and synthetic 1 Hz rides. Browser rendering time
+grows with the number of points in the spec, which is what the downsampling caps.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_charts
+"""
+from time import perf_counter
+import altair as alt
+import numpy as np
+import os
+import pandas as pd
+import src.utils as h
+
+SAMPLES = './samples'
+
+
+def synthetic_ride(hours: float, seed: int = 0) -> pd.DataFrame:
+    rng   = np.random.default_rng(seed)
+    count = int(hours * 3600)
+    power = np.clip(200 + np.cumsum(rng.normal(0, 5, count)) + rng.normal(0, 40, count), 0, None)
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-09-21 13:00', periods=count, freq='s', tz='UTC'),
+        'power':     power,
+    })
+
+def measure(df: pd.DataFrame, max_points: int) -> tuple:
+    ts   = perf_counter()
+    spec = h.create_chart(df, 'power', 'Power', 'W', max_points=max_points).to_json()
+    return perf_counter() - ts, len(spec) / 1024
+
+def main():
+    # Full resolution charts exceed Altair's default 5000 row limit
+    alt.data_transformers.disable_max_rows()
+
+    rides = []
+    for file in sorted(os.listdir(SAMPLES)):
+        if file.endswith('.fit'):
+            rides.append((file, h.parse_fit_file(os.path.join(SAMPLES, file))[0]))
+    for hours in (1, 6, 24):
+        rides.append((f"synthetic {hours}h", synthetic_ride(hours)))
+
+    print(f"{'ride':<28} {'rows':>7} {'full (KiB)':>11} {'full (s)':>9} {'lttb (KiB)':>11} {'lttb (s)':>9}")
+    for name, df in rides:
+        full_time, full_size = measure(df, len(df))
+        lttb_time, lttb_size = measure(df, h.CHART_MAX_POINTS)
+        print(f"{name:<28} {len(df):>7} {full_size:>11.0f} {full_time:>9.3f} {lttb_size:>11.0f} {lttb_time:>9.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Cold start benchmark: time and peak RSS of a fresh process that imports src.utils and predicts one
+aerobic training effect, with the Keras backend vs. the exported NumPy backend.
+
+Run from the activity-file-utilities folder (TensorFlow is needed to build the comparison):
+
+    python -m benchmarks.bench_cold_start
+
+When ./models/aerobic_training_effect_model.keras is not available, an untrained network with
+the same inputs is exported and used for both backends.
+"""
+from src.inference import MODEL_FILE, SCALER_FILE, export_aerobic_te_model
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+CHILD = """
+from time import perf_counter
+ts = perf_counter()
+import sys, json
+import src.utils as h
+import src.inference as inference
+imported = perf_counter() - ts
+
+inference.MODEL_FILE    = {model_file!r}
+inference.EXPORTED_FILE = {exported_file!r}
+features = {{key: [1.0] for key in inference.AEROBIC_TE_FEATURES}}
+import pandas as pd
+h.predict_aerobic_training_effect(pd.DataFrame(features))
+predicted = perf_counter() - ts
+
+print(json.dumps({{
+    'import_s':        imported,
+    'first_predict_s': predicted,
+    # VmHWM rather than ru_maxrss, which Linux carries over from the (TensorFlow-loaded) parent across exec
+    'max_rss_mb':      int([line for line in open('/proc/self/status') if line.startswith('VmHWM')][0].split()[1]) / 1024,
+    'tensorflow':      'tensorflow' in sys.modules,
+}}))
+"""
+
+def run(model_file: str, exported_file: str) -> dict:
+    result = subprocess.run([sys.executable, '-c', CHILD.format(model_file=model_file, exported_file=exported_file)],
+                            capture_output=True, text=True, check=True, env={**os.environ, 'PYTHONPATH': os.getcwd()})
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(repeat: int = 3):
+    with tempfile.TemporaryDirectory() as tmp:
+        model_file = MODEL_FILE
+        if not os.path.isfile(model_file):
+            from benchmarks.bench_aerobic_te import stand_in_model
+            model_file = os.path.join(tmp, 'stand_in_model.keras')
+            stand_in_model(model_file)
+            print(f"{MODEL_FILE} not found, using an untrained stand-in network")
+
+        exported_file = export_aerobic_te_model(model_file, SCALER_FILE, os.path.join(tmp, 'model.npz'))
+
+        print(f"{'backend':<8} {'import (s)':>11} {'first prediction (s)':>21} {'peak RSS (MB)':>14} {'tensorflow loaded':>18}")
+        for backend, exported in (('keras', os.path.join(tmp, 'missing.npz')), ('numpy', exported_file)):
+            runs = [run(model_file, exported) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r['first_predict_s'])
+            print(f"{backend:<8} {best['import_s']:>11.2f} {best['first_predict_s']:>21.2f} {best['max_rss_mb']:>14.0f} {str(best['tensorflow']):>18}")
+
+if __name__ == '__main__':
+    main()
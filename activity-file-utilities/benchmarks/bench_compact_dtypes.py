@@ -0,0 +1,72 @@
+"""
+Parsed frame memory benchmark: the record, event and session frames as pandas infers them
+(float64/int64/object columns) vs. after compact_frame(), on the bundled sample FIT files and
+synthetic rides. Checks that the summary, zone times, power curve and route come out the same.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_compact_dtypes [--hours 1 6 24]
+"""
+from benchmarks.synthetic import synthetic_records, write_fit
+from src.core import UserProfile
+from src.fit_reader import read_fit_columns
+import argparse
+import numpy as np
+import os
+import pandas as pd
+import src.utils as h
+import tempfile
+
+SAMPLES = './samples'
+FTP     = 250
+
+
+# Reference implementation, as decode_fit used to build its frames
+def legacy_frames(path: str) -> tuple:
+    tables = read_fit_columns(path, {name: None for name in h.FIT_MESSAGES})
+    return tuple(pd.DataFrame(tables.get(name, {})) for name in h.FIT_MESSAGES)
+
+def compact_frames(frames: tuple) -> tuple:
+    return tuple(h.compact_frame(df.copy(), h.RECORD_DTYPES if name == 'record' else {}) for name, df in zip(h.FIT_MESSAGES, frames))
+
+def mib(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024**2
+
+def metrics(df: pd.DataFrame, profile: UserProfile) -> list:
+    return [
+        h.get_summary(df, FTP, format="fit").to_frame(),
+        h.calculate_hr_zone_time(df, profile.get_hr_zones()),
+        h.calculate_power_zone_time(df, profile.get_power_zones()),
+        h.get_power_curve(df),
+        pd.DataFrame(dict(zip(['lat', 'lon'], h.route_coordinates(df)))),
+    ]
+
+def activities(tmp: str, hours: list) -> list:
+    result = [(file, os.path.join(SAMPLES, file)) for file in sorted(os.listdir(SAMPLES)) if file.endswith('.fit')]
+    for count in hours:
+        path = os.path.join(tmp, f"synthetic_{count:g}h.fit")
+        write_fit(path, synthetic_records(count))
+        result.append((f"synthetic {count:g}h", path))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory of compacted parsed FIT frames")
+    parser.add_argument('--hours', type=float, nargs='*', default=[1, 6, 24], help="durations of the synthetic rides")
+    args = parser.parse_args()
+
+    profile = UserProfile()
+    print(f"{'activity':<28} {'frame':<8} {'rows':>7} {'before (MiB)':>13} {'after (MiB)':>12} {'saved':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, path in activities(tmp, args.hours):
+            before = legacy_frames(path)
+            after  = compact_frames(before)
+
+            for expected, actual in zip(metrics(before[0], profile), metrics(after[0], profile)):
+                pd.testing.assert_frame_equal(expected, actual, check_exact=True)
+
+            for frame, old, new in zip(h.FIT_MESSAGES, before, after):
+                saved = 1 - mib(new) / mib(old) if len(old) else np.nan
+                print(f"{name:<28} {frame:<8} {len(old):>7} {mib(old):>13.2f} {mib(new):>12.2f} {saved:>7.0%}")
+
+if __name__ == '__main__':
+    main()
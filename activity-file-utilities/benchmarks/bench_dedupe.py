@@ -0,0 +1,98 @@
+"""
+Duplicate detection on a large import: every ride shows up three times, as the device file,
+as a byte-identical copy (Garmin Connect "original" export) and as a re-encoded export with
+different bytes (Strava, with recomputed elevation). The reference decodes every file, as
+processor.py did before computing activity_id; with the dedupe index, each file is claimed
+(byte hash, then header key) and only the first copy of a ride is decoded.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_dedupe [--rides 20] [--hours 2]
+"""
+from benchmarks.synthetic import synthetic_records, write_fit
+from processor import SUMMARY_PROJECTION
+from src.dedupe import DedupeIndex
+from src.fit_reader import read_fit_columns, read_fit_header
+from time import perf_counter
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+
+
+def import_library(directory: str, rides: int, hours: float) -> list:
+    device, garmin, strava = (os.path.join(directory, name) for name in ('device', 'garmin_connect', 'strava'))
+    for path in (device, garmin, strava):
+        os.makedirs(path)
+
+    for i in range(rides):
+        records = synthetic_records(hours, seed=i, start=str(f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} {6 + i % 12:02d}:00:00"))
+        write_fit(os.path.join(device, f"ride_{i:04d}.fit"), records, serial_number=3444214741)
+        shutil.copy(os.path.join(device, f"ride_{i:04d}.fit"), os.path.join(garmin, f"{9000000 + i}_ACTIVITY.fit"))
+
+        export = records.copy()
+        export['enhanced_altitude'] = export['enhanced_altitude'] + 1.0
+        write_fit(os.path.join(strava, f"strava_{i:04d}.fit"), export, serial_number=3444214741)
+
+    return [path for folder in (device, garmin, strava) for path in sorted(glob.glob(os.path.join(folder, '*.fit')))]
+
+def legacy_import(paths: list) -> int:
+    for path in paths:
+        read_fit_columns(path, SUMMARY_PROJECTION)
+    return len(paths)
+
+def deduplicated_import(index: DedupeIndex, paths: list) -> tuple:
+    decoded, claim_time = 0, 0.0
+    for path in paths:
+        ts       = perf_counter()
+        original = index.claim(path)
+        claim_time += perf_counter() - ts
+        if original is None:
+            read_fit_columns(path, SUMMARY_PROJECTION)
+            decoded += 1
+    return decoded, claim_time
+
+def main(rides: int = 20, hours: float = 2.0):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = import_library(tmp, rides, hours)
+        size  = sum(os.path.getsize(path) for path in paths)
+        print(f"{len(paths)} files ({rides} rides x 3 copies, {hours:g}h each), {size / 1024**2:.1f} MiB")
+
+        ts = perf_counter()
+        legacy_import(paths)
+        legacy = perf_counter() - ts
+
+        index = DedupeIndex(os.path.join(tmp, 'dedupe.sqlite'))
+        ts    = perf_counter()
+        decoded, claim_time = deduplicated_import(index, paths)
+        dedup = perf_counter() - ts
+
+        # A rerun over the same files: fingerprints come from the index, nothing is read
+        ts = perf_counter()
+        duplicates = sum(index.claim(path) is not None for path in paths)
+        rerun = perf_counter() - ts
+
+        ts = perf_counter()
+        for path in paths:
+            read_fit_header(path)
+        header = perf_counter() - ts
+
+        groups = index.group(paths)
+        assert decoded == rides and duplicates == 2 * rides and len(groups) == rides
+
+        print(f"{'':<34} {'seconds':>8} {'decoded':>8}")
+        print(f"{'decode every file (legacy)':<34} {legacy:8.2f} {len(paths):8d}")
+        print(f"{'claim, decode first copies':<34} {dedup:8.2f} {decoded:8d}")
+        print(f"{'  of which claiming':<34} {claim_time:8.2f}")
+        print(f"{'claim again (rerun)':<34} {rerun:8.3f}")
+        print(f"header read per file: {header / len(paths) * 1000:.1f} ms (session written last, read to the end), "
+              f"full decode: {legacy / len(paths) * 1000:.0f} ms")
+        print(f"speedup: {legacy / dedup:.2f}x, {duplicates} duplicates found, {len(groups)} distinct rides")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rides', type=int, default=20)
+    parser.add_argument('--hours', type=float, default=2.0)
+    args = parser.parse_args()
+    main(args.rides, args.hours)
@@ -0,0 +1,74 @@
+"""
+FIT decoding benchmark: the previous dict-per-message parser vs. the columnar decoder, with and
+without the projection processor.py uses. Reports wall time and peak traced memory, and bypasses
+the parsed file cache.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_fit_parse
+"""
+from processor import SUMMARY_PROJECTION
+from time import perf_counter
+import fitparse
+import io
+import os
+import pandas as pd
+import src.utils as h
+import tracemalloc
+
+SAMPLES = './samples'
+
+
+# Reference implementation, as parse_fit_file used to work
+def legacy_parse(fit_file):
+    fitfile = fitparse.FitFile(fit_file)
+    rdata, edata, sdata = [], [], []
+
+    for message in fitfile:
+        data_dict = {field.name: field.value for field in message}
+
+        if message.name == "record":
+            rdata.append(data_dict)
+        elif message.name == "event":
+            edata.append(data_dict)
+        elif message.name == "session":
+            sdata.append(data_dict)
+
+    return pd.DataFrame(rdata), pd.DataFrame(edata), pd.DataFrame(sdata)
+
+def measure(func) -> tuple:
+    ts = perf_counter()
+    func()
+    elapsed = perf_counter() - ts
+
+    # Separate run, tracemalloc slows decoding down considerably
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024**2
+
+def main():
+    print(f"{'file':<28} {'parser':<10} {'time (s)':>9} {'peak (MiB)':>11}")
+    for file in sorted(os.listdir(SAMPLES)):
+        if not file.endswith('.fit'):
+            continue
+
+        with open(os.path.join(SAMPLES, file), 'rb') as fitfile:
+            data = fitfile.read()
+
+        expected = legacy_parse(io.BytesIO(data))
+        for name, frame, actual in zip(h.FIT_MESSAGES, expected, h.decode_fit(io.BytesIO(data))):
+            pd.testing.assert_frame_equal(h.compact_frame(frame, h.RECORD_DTYPES if name == 'record' else {}), actual)
+
+        cases = [
+            ('legacy',    lambda: legacy_parse(io.BytesIO(data))),
+            ('columnar',  lambda: h.decode_fit(io.BytesIO(data))),
+            ('projected', lambda: h.decode_fit(io.BytesIO(data), SUMMARY_PROJECTION)),
+        ]
+        for name, func in cases:
+            elapsed, peak = measure(func)
+            print(f"{file:<28} {name:<10} {elapsed:>9.2f} {peak:>11.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Reverse-geocoding cache benchmark, fully offline (StubGeocoder backend).
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_geocode_cache
+"""
+from src.geocoding import GeocodeCache, StubGeocoder
+from time import perf_counter
+import os
+import random
+import tempfile
+
+
+def main(lookups: int = 10000, places: int = 25):
+    random.seed(42)
+
+    # A handful of start/end places, with the usual GPS jitter around each of them
+    homes   = [(random.uniform(25, 49), random.uniform(-124, -67)) for _ in range(places)]
+    queries = []
+    for _ in range(lookups):
+        lat, lon = random.choice(homes)
+        queries.append((lat + random.uniform(-0.0002, 0.0002), lon + random.uniform(-0.0002, 0.0002)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path    = os.path.join(tmp, 'geocode_cache.sqlite')
+        backend = StubGeocoder()
+        cache   = GeocodeCache(path=path, precision=3)
+
+        ts = perf_counter()
+        for lat, lon in queries:
+            cache.lookup(backend, lat, lon)
+        warm = perf_counter() - ts
+
+        # A new process: nothing in memory, everything on disk
+        restarted = GeocodeCache(path=path, precision=3)
+        ts = perf_counter()
+        for lat, lon in queries:
+            restarted.lookup(backend, lat, lon)
+        cold = perf_counter() - ts
+
+        # Steady state: in-memory hits
+        ts = perf_counter()
+        for lat, lon in queries:
+            restarted.lookup(backend, lat, lon)
+        hot = perf_counter() - ts
+
+        print(f"lookups: {lookups}, backend calls: {backend.calls}, cache entries: {len(restarted)}")
+        print(f"first run (misses + hits): {warm / lookups * 1e6:8.1f} us/lookup")
+        print(f"after restart (disk hits): {cold / lookups * 1e6:8.1f} us/lookup")
+        print(f"in-memory hits:            {hot / lookups * 1e6:8.1f} us/lookup")
+
+        # TTL and size bound
+        small = GeocodeCache(path=os.path.join(tmp, 'small.sqlite'), max_entries=10, ttl_seconds=3600)
+        for lat, lon in homes:
+            small.lookup(backend, lat, lon)
+        print(f"size-bounded cache (max 10) holds {len(small)} entries")
+
+if __name__ == '__main__':
+    main()
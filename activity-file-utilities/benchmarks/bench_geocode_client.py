@@ -0,0 +1,76 @@
+"""
+Reverse geocoding throughput: serial lookups (as processor.py used to do them) against the
+concurrent, rate-limited GeocodingClient. Offline: requests go over HTTP to a local
+StubGeocodeServer answering like OpenCage, with a fixed latency and its own rate limit.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_geocode_client
+"""
+from src.geocoding import GeocodeCache, GeocodingClient, StubGeocodeServer, TokenBucket
+from time import perf_counter
+import logging
+import os
+import random
+import tempfile
+
+
+def legacy_lookups(backend, cache: GeocodeCache, coordinates: list) -> int:
+    # One blocking request after the other, errors lose the location (old get_location_details)
+    failed = 0
+    for lat, lon in coordinates:
+        try:
+            cache.lookup(backend, lat, lon)
+        except Exception:
+            failed += 1
+    return failed
+
+def activities(count: int, loops: float = 0.7) -> list:
+    # Start and end of each ride; most rides end where they started
+    random.seed(42)
+    coordinates = []
+    for _ in range(count):
+        start = (random.uniform(25, 49), random.uniform(-124, -67))
+        end   = start if random.random() < loops else (start[0] + random.uniform(0.05, 0.5), start[1] + random.uniform(0.05, 0.5))
+        coordinates += [start, (end[0] + 0.0001, end[1] + 0.0001)]
+    return coordinates
+
+def run(label: str, coordinates: list, tmp: str, concurrent: bool, limiter: TokenBucket = None, **server):
+    with StubGeocodeServer(**server) as stub:
+        cache = GeocodeCache(path=os.path.join(tmp, f"{label}.sqlite"))
+        ts    = perf_counter()
+        if concurrent:
+            client  = GeocodingClient(stub.backend(timeout=1.0), cache, limiter, workers=8, retries=3, backoff_seconds=0.5)
+            futures = [client.submit(lat, lon) for lat, lon in coordinates]
+            failed  = 0
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    failed += 1
+            client.close()
+            coalesced = client.coalesced
+        else:
+            failed    = legacy_lookups(stub.backend(timeout=1.0), cache, coordinates)
+            coalesced = 0
+        elapsed = perf_counter() - ts
+        rate    = (len(stub.times) - 1) / (stub.times[-1] - stub.times[0]) if len(stub.times) > 1 else 0
+        print(f"{label:<28} {elapsed:8.2f} {stub.requests:9d} {stub.throttled:9d} {coalesced:9d} {stub.peak:6d} {rate:8.1f} {failed:7d}")
+
+def main(rides: int = 40, latency: float = 0.2, quota: float = 10.0):
+    # Retries and adapter errors are logged by the client, keep the table readable
+    logging.disable(logging.ERROR)
+    coordinates = activities(rides)
+    print(f"{rides} rides, {len(coordinates)} lookups, {latency * 1000:.0f} ms per answer, quota {quota:g} req/s")
+    print(f"{'':<28} {'seconds':>8} {'requests':>9} {'throttled':>9} {'coalesced':>9} {'peak':>6} {'req/s':>8} {'failed':>7}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = {'latency': latency, 'rate': quota, 'burst': 2}
+        run('serial (legacy)', coordinates, tmp, False, **server)
+        run('concurrent, no rate limit', coordinates, tmp, True, **server)
+        run('concurrent, token bucket', coordinates, tmp, True, TokenBucket(quota, 1), **server)
+        # The first requests stall past the client timeout and are retried
+        run('token bucket, 3 timeouts', coordinates, tmp, True, TokenBucket(quota, 1), stall=3, stall_seconds=1.5, **server)
+
+if __name__ == '__main__':
+    main()
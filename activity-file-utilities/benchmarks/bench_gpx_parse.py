@@ -0,0 +1,126 @@
+"""
+GPX ingestion benchmark: the previous gpxpy per-point loop vs. the streaming reader, on a
+synthetic 1 Hz ride. Reports wall time and peak traced memory, and bypasses the parsed file cache.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_gpx_parse [--points 200000]
+"""
+from datetime import datetime, timedelta, timezone
+from math import radians, sin, cos, sqrt, atan2
+from time import perf_counter
+import argparse
+import gpxpy
+import numpy as np
+import os
+import pandas as pd
+import src.utils as h
+import tempfile
+import tracemalloc
+
+
+# Reference implementation, as gpx_to_dataframe used to work
+def legacy_gpx_to_dataframe(gpx_file) -> pd.DataFrame:
+    NAMESPACES = {'ns3': 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'}
+    gpx  = gpxpy.parse(gpx_file)
+    data = {name: [] for name in ('latitude', 'longitude', 'elevation', 'time', 'temperature', 'heart_rate', 'cadence', 'distance', 'speed', 'power')}
+
+    previous_point = None
+    previous_time  = None
+    for track in gpx.tracks:
+        for segment in track.segments:
+            for point in segment.points:
+                data['latitude'].append(point.latitude)
+                data['longitude'].append(point.longitude)
+                data['elevation'].append(point.elevation * 3.281)
+                data['time'].append(point.time)
+
+                hr, cad, pwr = None, None, None
+                if point.extensions:
+                    for ext in point.extensions:
+                        if ext.tag == 'power':
+                            pwr = int(ext.text)
+                        hr_el  = ext.find('ns3:hr', NAMESPACES)
+                        hr     = int(hr_el.text) if hr_el is not None else None
+                        cad_el = ext.find('ns3:cad', NAMESPACES)
+                        cad    = int(cad_el.text) if cad_el is not None else None
+
+                data['temperature'].append(0)
+                data['heart_rate'].append(hr)
+                data['cadence'].append(cad)
+                data['power'].append(pwr)
+
+                if previous_point is not None:
+                    lat1, lon1, lat2, lon2 = map(radians, [previous_point[0], previous_point[1], point.latitude, point.longitude])
+                    a         = sin((lat2 - lat1) / 2)**2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2)**2
+                    dist      = 6371.0 * 2 * atan2(sqrt(a), sqrt(1 - a)) * 1000
+                    time_diff = (point.time - previous_time).total_seconds()
+                    speed     = dist / time_diff * 2.237 if time_diff > 0 else 0
+                else:
+                    dist  = 0
+                    speed = 0
+
+                data['distance'].append(dist)
+                data['speed'].append(speed)
+                previous_point = (point.latitude, point.longitude)
+                previous_time  = point.time
+
+    return pd.DataFrame(data)
+
+def write_synthetic_gpx(path: str, points: int, seed: int = 0):
+    rng   = np.random.default_rng(seed)
+    start = datetime(2024, 9, 21, 13, 0, 0, tzinfo=timezone.utc)
+    lat   = 33.0 + np.cumsum(rng.normal(0, 0.00005, points))
+    lon   = -96.0 + np.cumsum(rng.normal(0, 0.00005, points))
+    ele   = 150 + np.cumsum(rng.normal(0, 0.1, points))
+    hr    = rng.integers(90, 180, points)
+    cad   = rng.integers(60, 100, points)
+    pwr   = rng.integers(0, 400, points)
+
+    with open(path, 'w') as gpx:
+        gpx.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        gpx.write('<gpx creator="bench" version="1.1" xmlns="http://www.topografix.com/GPX/1/1" '
+                  'xmlns:ns3="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">\n<trk><name>bench</name><trkseg>\n')
+        for i in range(points):
+            time = (start + timedelta(seconds=i)).strftime('%Y-%m-%dT%H:%M:%SZ')
+            gpx.write(f'<trkpt lat="{lat[i]:.7f}" lon="{lon[i]:.7f}"><ele>{ele[i]:.1f}</ele><time>{time}</time>'
+                      f'<extensions><power>{pwr[i]}</power><ns3:TrackPointExtension><ns3:hr>{hr[i]}</ns3:hr>'
+                      f'<ns3:cad>{cad[i]}</ns3:cad></ns3:TrackPointExtension></extensions></trkpt>\n')
+        gpx.write('</trkseg></trk></gpx>\n')
+
+def measure(func) -> tuple:
+    ts = perf_counter()
+    result = func()
+    elapsed = perf_counter() - ts
+    del result
+
+    # Separate run, tracemalloc slows parsing down considerably
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024**2
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GPX ingestion")
+    parser.add_argument('--points', type=int, default=200000, help="number of track points in the synthetic ride")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.gpx')
+        write_synthetic_gpx(path, args.points)
+        size = os.path.getsize(path) / 1024**2
+
+        with open(path) as gpx_file:
+            expected = legacy_gpx_to_dataframe(gpx_file)
+        pd.testing.assert_frame_equal(expected, h.decode_gpx(path), check_exact=False, rtol=1e-12)
+        del expected
+
+        print(f"{args.points} points, {size:.1f} MiB")
+        print(f"{'reader':<10} {'time (s)':>9} {'peak (MiB)':>11}")
+        for name, func in [('gpxpy', lambda: legacy_gpx_to_dataframe(open(path))), ('streaming', lambda: h.decode_gpx(path))]:
+            elapsed, peak = measure(func)
+            print(f"{name:<10} {elapsed:>9.2f} {peak:>11.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Ingestion benchmark: how long a new activity file takes to be picked up. The reference is
+processor.py's batch listing (every file, plus a summary lookup per file), which a cron-style
+rerun pays on every pass; the watch service is measured end to end (file written -> result
+recorded) with inotify and with polling, in a directory of several thousand processed files.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_ingest [--files 5000] [--new 20]
+"""
+from processor import pending_activities
+from src.ingest import IngestService, InotifyWatcher, PollingWatcher
+from time import monotonic, perf_counter, sleep
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+
+SETTLE = 0.5
+
+
+def file_size(path: str) -> int:
+    # Stand-in for process_activity, so only the ingestion overhead is measured
+    return os.path.getsize(path)
+
+def library(directory: str, count: int):
+    for i in range(count):
+        for name in (f"{i:06d}.fit", f"summary_{i:06d}.fit.json"):
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(b'\0' * 64)
+
+def write_slowly(path: str, chunks: int = 5, pause: float = 0.1):
+    # A file arriving over a sync client: several writes, not yet complete in between
+    with open(path, 'wb') as f:
+        for _ in range(chunks):
+            f.write(b'\1' * 4096)
+            f.flush()
+            sleep(pause)
+
+def ingest_latency(directory: str, watcher, new: int) -> list:
+    """Seconds from each new file's last write to its result being recorded, minus the settle time."""
+    written, latencies, done = {}, [], threading.Event()
+    def record(path, result, error):
+        assert error is None and result == 5 * 4096, (path, result, error)
+        latencies.append(monotonic() - written[path] - SETTLE)
+        if len(latencies) == new:
+            done.set()
+
+    service = IngestService([directory], file_size, extensions=('.fit',), workers=2, settle_seconds=SETTLE,
+                            on_result=record, watcher=watcher, status_file=None, report_seconds=3600)
+    thread  = threading.Thread(target=service.run, kwargs={'poll_seconds': 0.05})
+    thread.start()
+    try:
+        for i in range(new):
+            path = os.path.join(os.path.abspath(directory), f"new_{watcher.__class__.__name__}_{i:03d}.fit")
+            write_slowly(path)
+            written[path] = monotonic()
+        done.wait(60)
+    finally:
+        service.stop()
+        thread.join()
+    assert len(latencies) == new, f"{len(latencies)} of {new} files ingested"
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the watch-folder ingestion")
+    parser.add_argument('--files', type=int, default=5000, help="processed activities already in the directory")
+    parser.add_argument('--new', type=int, default=20, help="new files written while watching")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        library(tmp, args.files)
+        manifest = {'completed': {}, 'failed': {}}
+        ts       = perf_counter()
+        assert pending_activities(tmp, 'fit', manifest) == []
+        listing  = perf_counter() - ts
+
+        print(f"{args.files} processed activities, {args.new} new files written in 5 chunks over 0.5s each")
+        idle = PollingWatcher([tmp], ('.fit',), interval=0)
+        ts   = perf_counter()
+        for _ in range(1000):
+            idle.changes(0)
+        poll = (perf_counter() - ts) / 1000
+
+        print(f"batch listing (per rerun): {listing * 1e3:.1f} ms, idle poll: {poll * 1e6:.0f} us")
+        print(f"{'watcher':<16} {'p50 (ms)':>9} {'max (ms)':>9}   (after the {SETTLE}s settle time)")
+        for open_watcher in (lambda: InotifyWatcher([tmp], ('.fit',)), lambda: PollingWatcher([tmp], ('.fit',), interval=0.25)):
+            watcher   = open_watcher()
+            latencies = ingest_latency(tmp, watcher, args.new)
+            print(f"{type(watcher).__name__:<16} {statistics.median(latencies) * 1e3:>9.0f} {max(latencies) * 1e3:>9.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+File list of the FIT/GPX browser on a large folder: date, sport, duration and distance of every
+file. The reference decodes each file (the summary projection processor.py reads), timed on a
+subset and extrapolated to the folder; the quick scan reads headers only (see scan_fit_file()),
+cold and then from the scan cache, as on every rerun of the page.
+
+The synthetic FIT files write their session message last, so their scan reads past the records;
+the Garmin samples have it near the start and are reported separately.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_quick_scan [--files 300] [--hours 1] [--subset 10]
+"""
+from benchmarks.synthetic import synthetic_records, write_fit, write_gpx
+from processor import SUMMARY_PROJECTION
+from src.file_scan import ScanCache
+from src.fit_reader import read_fit_columns, scan_fit_file
+from time import perf_counter
+import argparse
+import glob
+import os
+import tempfile
+
+
+def library(directory: str, files: int, hours: float) -> list:
+    # One GPX file in ten, as exported by apps without FIT support
+    for i in range(files):
+        records = synthetic_records(hours, seed=i, start=str(f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} {6 + i % 12:02d}:00:00"))
+        if i % 10 == 9:
+            write_gpx(os.path.join(directory, f"ride_{i:04d}.gpx"), records)
+        else:
+            write_fit(os.path.join(directory, f"ride_{i:04d}.fit"), records)
+    return sorted(os.listdir(directory))
+
+def legacy_listing(directory: str, files: list) -> int:
+    for file in files:
+        read_fit_columns(os.path.join(directory, file), SUMMARY_PROJECTION)
+    return len(files)
+
+def main(files: int = 300, hours: float = 1.0, subset: int = 10):
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, 'activities')
+        os.makedirs(folder)
+        names = library(folder, files, hours)
+        size  = sum(os.path.getsize(os.path.join(folder, name)) for name in names)
+        print(f"{len(names)} files ({hours:g}h each, 1 in 10 GPX), {size / 1024**2:.1f} MiB")
+
+        sample = [name for name in names if name.endswith('.fit')][:subset]
+        ts     = perf_counter()
+        legacy_listing(folder, sample)
+        legacy = (perf_counter() - ts) / len(sample) * len(names)
+
+        cache = ScanCache(os.path.join(tmp, 'scan_cache.sqlite'))
+        ts    = perf_counter()
+        cold  = cache.scan(folder)
+        cold_time = perf_counter() - ts
+
+        ts   = perf_counter()
+        warm = cache.scan(folder)
+        warm_time = perf_counter() - ts
+
+        # A new ride in the folder: only that file is read
+        write_fit(os.path.join(folder, 'ride_new.fit'), synthetic_records(hours, seed=files))
+        ts  = perf_counter()
+        new = cache.scan(folder)
+        new_time = perf_counter() - ts
+
+        assert warm.equals(cold) and len(new) == len(names) + 1
+        assert cold['error'].isna().all() and cold['start_time'].notna().all()
+
+        print(f"{'':<36} {'seconds':>8} {'per file ms':>12}")
+        print(f"{'decode every file (legacy, est.)':<36} {legacy:8.2f} {legacy / len(names) * 1000:12.1f}")
+        print(f"{'quick scan, cold':<36} {cold_time:8.2f} {cold_time / len(names) * 1000:12.1f}")
+        print(f"{'quick scan, cached (page rerun)':<36} {warm_time:8.3f} {warm_time / len(names) * 1000:12.2f}")
+        print(f"{'quick scan, cached + 1 new file':<36} {new_time:8.3f}")
+
+    garmin = sorted(glob.glob('./samples/*.fit'))
+    if garmin:
+        ts = perf_counter()
+        for path in garmin:
+            scan_fit_file(path)
+        scan = (perf_counter() - ts) / len(garmin)
+        ts = perf_counter()
+        legacy_listing('.', garmin)
+        full = (perf_counter() - ts) / len(garmin)
+        print(f"Garmin samples: scan {scan * 1000:.1f} ms per file, full decode {full * 1000:.0f} ms")
+    print(f"speedup: cold {legacy / cold_time:.1f}x, cached {legacy / warm_time:.0f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=300)
+    parser.add_argument('--hours', type=float, default=1.0)
+    parser.add_argument('--subset', type=int, default=10, help="files decoded by the reference")
+    args = parser.parse_args()
+    main(args.files, args.hours, args.subset)
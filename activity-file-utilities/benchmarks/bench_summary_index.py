@@ -0,0 +1,80 @@
+"""
+Summary index benchmark: loading the JSON summary viewer data by opening every summary_*.json
+file (as load_json_files used to work) vs. reading the consolidated SQLite index, in full and
+with the viewer's column projection and a one-year date range, over synthetic summaries.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_summary_index [--activities 3000]
+"""
+from src.summary_index import SummaryIndex
+from time import perf_counter
+import argparse
+import json
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+
+VIEWER_COLUMNS = ['activity_id', 'activity_date', 'activity_distance', 'time_total', 'training_stress_score',
+                  'te_aerobic', 'te_anaerobic'] + [f"power_time_in_zone_{z}" for z in range(1, 8)] + [f"hr_time_in_zone_{z}" for z in range(1, 6)]
+
+
+# Reference implementation, as load_json_files used to work
+def legacy_load(directory):
+    data = []
+    for filename in os.listdir(directory):
+        if filename.endswith('.json'):
+            with open(os.path.join(directory, filename), 'r') as file:
+                for key, value in json.load(file).items():
+                    data.append({"activity_id": key, **value})
+    return pd.DataFrame(data)
+
+def synthetic_summaries(directory: str, count: int, seed: int = 0):
+    # Roughly the 90 fields processor.py writes per activity, spread over five years
+    rng    = np.random.default_rng(seed)
+    starts = pd.Timestamp('2020-01-01 07:00') + pd.to_timedelta(np.sort(rng.integers(0, 5 * 365 * 86400, count)), unit='s')
+    for i, start in enumerate(starts):
+        summary = {
+            'activity_type':       'cycling',
+            'activity_sub_type':   'road',
+            'activity_start_time': start.tz_localize('US/Central', ambiguous=False, nonexistent='shift_forward').isoformat(),
+            'activity_start_city': 'Dallas',
+            'activity_start_zip':  '75201',
+        }
+        summary.update({f"metric_{m}": round(float(v), 2) for m, v in enumerate(rng.normal(100, 20, 85))})
+        summary.update({c: int(v) for c, v in zip(VIEWER_COLUMNS[2:], rng.integers(0, 3600, len(VIEWER_COLUMNS) - 2))})
+        with open(os.path.join(directory, f"summary_{i}_ACTIVITY.fit.json"), 'w') as f:
+            json.dump({f"{i:064x}": summary}, f, indent=4)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the summary index against JSON scans")
+    parser.add_argument('--activities', type=int, default=3000, help="number of synthetic activity summaries")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic_summaries(tmp, args.activities)
+        index = SummaryIndex(os.path.join(tmp, 'activity_index.sqlite'))
+
+        ts = perf_counter()
+        index.import_json_files(tmp)
+        migration = perf_counter() - ts
+
+        results = []
+        for name, load in [
+            ('json scan',          lambda: legacy_load(tmp)),
+            ('index, all columns', lambda: index.load()),
+            ('index, projected',   lambda: index.load(columns=VIEWER_COLUMNS)),
+            ('index, 1 year',      lambda: index.load(columns=VIEWER_COLUMNS, start='2023-01-01', end='2023-12-31')),
+        ]:
+            ts = perf_counter()
+            df = load()
+            results.append((name, perf_counter() - ts, df.shape))
+
+    print(f"{args.activities} summaries, one-time migration {migration:.2f}s")
+    print(f"{'load':<20} {'time (s)':>9} {'rows':>6} {'columns':>8}")
+    for name, elapsed, (rows, columns) in results:
+        print(f"{name:<20} {elapsed:>9.3f} {rows:>6} {columns:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Time zone benchmark: a TimezoneFinder polygon lookup per activity (as localize_time used to
+work) vs. the grid-memoized resolver, per activity and for a whole column at once, over
+synthetic activity starts clustered around a few home areas.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_timezones [--activities 5000]
+"""
+from src.timezones import TimezoneResolver
+from time import perf_counter
+from timezonefinder import TimezoneFinder
+import argparse
+import numpy as np
+import pandas as pd
+import pytz
+
+# Home areas most rides start from: Dallas, Austin, Denver, Phoenix, Boston
+HOMES = [(32.78, -96.80), (30.27, -97.74), (39.74, -104.99), (33.45, -112.07), (42.36, -71.06)]
+
+
+# Reference implementation, as localize_time used to work
+def legacy_localize(finder, timestamp, lat, lon):
+    timezone_str = finder.timezone_at(lng=lon, lat=lat)
+    local_tz     = pytz.timezone(timezone_str) if timezone_str else pytz.timezone('US/Central')
+    return pytz.utc.localize(timestamp).astimezone(local_tz)
+
+def synthetic_starts(count: int, seed: int = 0) -> pd.DataFrame:
+    rng    = np.random.default_rng(seed)
+    homes  = np.array(HOMES)[rng.integers(0, len(HOMES), count)]
+    jitter = rng.normal(0, 0.002, (count, 2))
+
+    # One start in ten is a trip somewhere in the continental US
+    travel        = rng.random(count) < 0.1
+    homes[travel] = np.column_stack((rng.uniform(30, 47, travel.sum()), rng.uniform(-120, -75, travel.sum())))
+
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, count), unit='s'),
+        'latitude':  homes[:, 0] + jitter[:, 0],
+        'longitude': homes[:, 1] + jitter[:, 1],
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark time zone resolution")
+    parser.add_argument('--activities', type=int, default=5000, help="number of synthetic activity starts")
+    args = parser.parse_args()
+
+    starts = synthetic_starts(args.activities)
+    finder = TimezoneFinder()
+    rows   = list(starts.itertuples(index=False))
+
+    ts       = perf_counter()
+    expected = [legacy_localize(finder, row.timestamp, row.latitude, row.longitude) for row in rows]
+    legacy   = perf_counter() - ts
+
+    resolver = TimezoneResolver(finder=finder)
+    ts       = perf_counter()
+    scalar   = [resolver.localize(row.timestamp, row.latitude, row.longitude) for row in rows]
+    memo     = perf_counter() - ts
+
+    resolver = TimezoneResolver(finder=finder)
+    ts       = perf_counter()
+    column   = resolver.localize_column(starts['timestamp'], starts['latitude'], starts['longitude'])
+    vector   = perf_counter() - ts
+
+    # Quantizing can move a start lying right on a time zone border to the neighbouring zone
+    differ = sum(str(a.tzinfo) != str(b.tzinfo) for a, b in zip(expected, scalar))
+    assert all(a == b for a, b in zip(scalar, column))
+
+    print(f"{args.activities} activity starts, {len(resolver._cells)} grid cells, {differ} resolved to a different zone")
+    print(f"{'resolver':<16} {'time (s)':>9} {'per activity (us)':>18}")
+    for name, elapsed in [('per-call lookup', legacy), ('memoized', memo), ('column', vector)]:
+        print(f"{name:<16} {elapsed:>9.3f} {elapsed / args.activities * 1e6:>18.1f}")
+
+if __name__ == '__main__':
+    main()
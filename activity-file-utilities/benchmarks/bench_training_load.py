@@ -0,0 +1,81 @@
+"""
+Training load benchmark: recomputing CTL/ATL/TSB over the whole history on every view (loading
+every activity's TSS) vs. the incremental engine, for an unchanged library, a new activity, a
+back-filled activity a year ago, and reading the stored series, over a synthetic library.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_training_load [--years 10]
+"""
+from src.summary_index import SummaryIndex
+from src.training_load import CTL_DAYS, ATL_DAYS, TrainingLoad
+from time import perf_counter
+import argparse
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+
+TODAY = '2025-01-01'
+
+
+# Reference implementation: the whole history recomputed from the activities on every view
+def full_recompute(index: SummaryIndex) -> pd.DataFrame:
+    df    = index.load(columns=['activity_date', 'training_stress_score'])
+    daily = df.groupby('activity_date')['training_stress_score'].sum()
+    days  = pd.date_range(daily.index.min(), TODAY, freq='D').strftime('%Y-%m-%d')
+    ctl_decay, atl_decay = np.exp(-1 / CTL_DAYS), np.exp(-1 / ATL_DAYS)
+
+    ctl = atl = 0.0
+    rows = []
+    for value in daily.reindex(days, fill_value=0).to_numpy(dtype=float):
+        tsb = ctl - atl
+        ctl = ctl * ctl_decay + value * (1 - ctl_decay)
+        atl = atl * atl_decay + value * (1 - atl_decay)
+        rows.append((ctl, atl, tsb))
+    return pd.DataFrame(rows, columns=['ctl', 'atl', 'tsb'], index=days)
+
+def synthetic_library(index: SummaryIndex, years: int, seed: int = 0):
+    rng  = np.random.default_rng(seed)
+    days = pd.date_range(pd.Timestamp(TODAY) - pd.DateOffset(years=years), TODAY, freq='D', inclusive='left')
+    days = days[rng.random(len(days)) < 0.8]
+    index.add({f"{i:064x}": {'activity_start_time': day.strftime('%Y-%m-%dT07:30:00-05:00'),
+                             'training_stress_score': int(rng.integers(20, 250))} for i, day in enumerate(days)})
+
+def timed(func) -> tuple:
+    ts     = perf_counter()
+    result = func()
+    return perf_counter() - ts, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the incremental training load engine")
+    parser.add_argument('--years', type=int, default=10, help="years of synthetic activities")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SummaryIndex(os.path.join(tmp, 'activity_index.sqlite'))
+        synthetic_library(index, args.years)
+        load  = TrainingLoad(index.path)
+
+        results = [('full recompute', *timed(lambda: len(full_recompute(index))))]
+        results.append(('first refresh', *timed(lambda: load.refresh(today=TODAY))))
+        results.append(('unchanged', *timed(lambda: load.refresh(today=TODAY))))
+
+        index.add({'new': {'activity_start_time': f"{TODAY}T07:30:00-06:00", 'training_stress_score': 120}})
+        results.append(('new activity', *timed(lambda: load.refresh(today=TODAY))))
+
+        back_filled = (pd.Timestamp(TODAY) - pd.DateOffset(years=1)).strftime('%Y-%m-%d')
+        index.add({'back-filled': {'activity_start_time': f"{back_filled}T18:00:00-05:00", 'training_stress_score': 300}})
+        results.append(('back-filled (1y)', *timed(lambda: load.refresh(today=TODAY))))
+        results.append(('read series', *timed(lambda: len(load.series()))))
+
+        stored = load.series().set_index(load.series()['day'].dt.strftime('%Y-%m-%d'))[['ctl', 'atl', 'tsb']]
+        assert np.allclose(stored.to_numpy(), full_recompute(index).to_numpy())
+
+    print(f"{len(index)} activities over {args.years} years")
+    print(f"{'view':<18} {'time (ms)':>10} {'days computed':>14}")
+    for name, elapsed, days in results:
+        print(f"{name:<18} {elapsed * 1e3:>10.1f} {days:>14}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Time-in-zone benchmark: row-by-row reference loop vs. the vectorized zone engine.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.bench_zone_time
+"""
+from src.core import UserProfile
+from time import perf_counter
+import os
+import pandas as pd
+import src.utils as h
+
+SAMPLES = './samples'
+
+
+# Reference implementation, as calculate_hr_zone_time / calculate_power_zone_time used to work
+def legacy_zone_time(df: pd.DataFrame, zones: pd.Series, channel: str, low_key: str, max_key: str) -> pd.DataFrame:
+    df = df.copy()
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['time_diff'] = df['timestamp'].diff().dt.total_seconds().fillna(0)
+
+    zone_numbers  = list(set([int(row.split('.')[1]) for row in zones.index if 'zone.' in row]))
+    time_in_zones = {f'zone{i+1}': 0 for i in range(len(zone_numbers))}
+
+    for i in range(1, len(df)):
+        value         = df.iloc[i][channel]
+        time_interval = df.iloc[i]['time_diff']
+
+        for zone_num in zone_numbers:
+            low_row = f'zone.{zone_num}.{low_key}'
+            max_row = f'zone.{zone_num}.{max_key}'
+
+            if low_row in zones.index and max_row in zones.index:
+                if zones.loc[low_row] <= value <= zones.loc[max_row]:
+                    time_in_zones[f'zone{zone_num}'] += time_interval
+                    break
+
+    return pd.DataFrame({
+        'zone': list(time_in_zones.keys()),
+        'time_in_seconds': list(time_in_zones.values())
+    })
+
+def best_of(func, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        ts = perf_counter()
+        func()
+        timings.append(perf_counter() - ts)
+    return min(timings)
+
+def main():
+    profile = UserProfile()
+    cases   = [
+        ('heart_rate', profile.get_hr_zones(),    'low_hr',  'max_hr'),
+        ('power',      profile.get_power_zones(), 'low_pwr', 'max_pwr'),
+    ]
+
+    print(f"{'file':<28} {'channel':<12} {'rows':>7} {'legacy (s)':>11} {'vector (s)':>11} {'speedup':>9}")
+    for file in sorted(os.listdir(SAMPLES)):
+        if not file.endswith('.fit'):
+            continue
+
+        with open(os.path.join(SAMPLES, file), 'rb') as fitfile:
+            records = h.parse_fit_file(fitfile)[0]
+
+        for channel, zones, low_key, max_key in cases:
+            expected = legacy_zone_time(records, zones, channel, low_key, max_key)
+            actual   = h.calculate_zone_time(records, zones, channel, low_key, max_key)
+            pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+
+            legacy = best_of(lambda: legacy_zone_time(records, zones, channel, low_key, max_key), repeat=1)
+            vector = best_of(lambda: h.calculate_zone_time(records, zones, channel, low_key, max_key))
+            print(f"{file:<28} {channel:<12} {len(records):>7} {legacy:>11.3f} {vector:>11.4f} {legacy / vector:>8.0f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark suite for the src/utils.py analytics hot paths: time and peak memory per function, on
+the bundled sample FIT files and synthetic 1h/6h/24h rides, saved as JSON so runs can be compared.
+
+Parsing is measured twice: decoding (parse cache empty) and loading from a warm parse cache.
+Peak memory is what tracemalloc sees allocated on top of the inputs during one call.
+
+Run from the activity-file-utilities folder:
+
+    python -m benchmarks.suite [--output suite.json] [--compare previous.json] [--hours 1 6 24] [--repeat 3]
+
+When no aerobic training effect model is available, an untrained stand-in network is used
+(see bench_aerobic_te); its timings are representative, its predictions are not.
+"""
+from benchmarks.synthetic import synthetic_records, write_fit, write_gpx
+from datetime import datetime
+from src.core import UserProfile
+from src.parse_cache import ParsedFileCache
+from time import perf_counter
+import argparse
+import json
+import logging
+import os
+import pandas as pd
+import platform
+import src.inference as inference
+import src.utils as h
+import statistics
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+SAMPLES = './samples'
+FTP     = 250
+
+
+def measure(func, repeat: int) -> dict:
+    func()  # warm-up: imports, lazily built objects, and the parse cache for the cached variants
+    times = []
+    for _ in range(repeat):
+        ts = perf_counter()
+        func()
+        times.append(perf_counter() - ts)
+
+    # Separate run, tracemalloc slows the measured code down considerably
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'time_min_s': min(times), 'time_median_s': statistics.median(times), 'peak_mib': peak / 1024**2}
+
+def prepare_model(tmp: str) -> str:
+    # Make sure predict_aerobic_training_effect has a model to load, and say which one
+    try:
+        h.get_aerobic_te_model()
+        return 'exported' if os.path.isfile(inference.EXPORTED_FILE) else 'keras'
+    except Exception:
+        from benchmarks.bench_aerobic_te import stand_in_model
+        model_file = os.path.join(tmp, 'stand_in_model.keras')
+        stand_in_model(model_file)
+        inference.REGISTRY.clear()
+        inference.REGISTRY.get('aerobic_training_effect', lambda: inference.AerobicTrainingEffectModel(model_file, inference.SCALER_FILE))
+        return 'stand-in'
+
+def activities(tmp: str, hours: list) -> list:
+    """Returns (name, fit path, gpx path) per benchmarked activity, writing the GPX (and synthetic FIT) files to tmp."""
+    result = []
+    for file in sorted(os.listdir(SAMPLES)):
+        if file.endswith('.fit'):
+            path    = os.path.join(SAMPLES, file)
+            records = h.parse_fit_file(path)[0]
+            gpx     = os.path.join(tmp, f"{file}.gpx")
+            write_gpx(gpx, records)
+            result.append((file, path, gpx))
+
+    for count in hours:
+        records = synthetic_records(count)
+        fit     = os.path.join(tmp, f"synthetic_{count:g}h.fit")
+        gpx     = os.path.join(tmp, f"synthetic_{count:g}h.gpx")
+        write_fit(fit, records)
+        write_gpx(gpx, records)
+        result.append((f"synthetic {count:g}h", fit, gpx))
+    return result
+
+def cases(fit: str, gpx: str, profile: UserProfile) -> tuple:
+    df           = h.parse_fit_file(fit)[0]
+    hr_zones     = profile.get_hr_zones()
+    power_zones  = profile.get_power_zones()
+    summary      = h.get_summary(df, FTP, format="fit")
+    features     = h.get_aerobic_te_features(summary, h.calculate_hr_zone_time(df, hr_zones))
+
+    return len(df), [
+        ('parse_fit_file',                   lambda: h.decode_fit(fit)),
+        ('parse_fit_file (cached)',          lambda: h.parse_fit_file(fit)),
+        ('gpx_to_dataframe',                 lambda: h.decode_gpx(gpx)),
+        ('gpx_to_dataframe (cached)',        lambda: h.gpx_to_dataframe(gpx)),
+        ('get_summary',                      lambda: h.get_summary(df, FTP, format="fit")),
+        ('calculate_hr_zone_time',           lambda: h.calculate_hr_zone_time(df, hr_zones)),
+        ('calculate_power_zone_time',        lambda: h.calculate_power_zone_time(df, power_zones)),
+        ('get_normalized_power',             lambda: h.get_normalized_power(df)),
+        ('plot_map',                         lambda: h.plot_map(df)),
+        ('predict_aerobic_training_effect',  lambda: h.predict_aerobic_training_effect(features)),
+    ]
+
+def metadata(args, model: str) -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created':  datetime.now().isoformat(timespec='seconds'),
+        'commit':   commit,
+        'python':   sys.version.split()[0],
+        'platform': platform.platform(),
+        'pandas':   pd.__version__,
+        'numpy':    __import__('numpy').__version__,
+        'repeat':   args.repeat,
+        'model':    model,
+    }
+
+def compare(results: list, baseline_file: str):
+    with open(baseline_file, 'r') as f:
+        baseline = {(r['activity'], r['function']): r for r in json.load(f)['results']}
+
+    print(f"\nCompared with {baseline_file} (ratio = this run / baseline, below 1 is faster / smaller)")
+    print(f"{'activity':<28} {'function':<34} {'time ratio':>11} {'peak ratio':>11}")
+    for r in results:
+        old = baseline.get((r['activity'], r['function']))
+        if old is None:
+            continue
+        time_ratio = r['time_min_s'] / old['time_min_s'] if old['time_min_s'] else float('nan')
+        peak_ratio = r['peak_mib'] / old['peak_mib'] if old['peak_mib'] else float('nan')
+        print(f"{r['activity']:<28} {r['function']:<34} {time_ratio:>11.2f} {peak_ratio:>11.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the src/utils.py analytics hot paths")
+    parser.add_argument('--output', default='suite_results.json', help="JSON file the results are written to")
+    parser.add_argument('--compare', help="results file of a previous run to compare with")
+    parser.add_argument('--hours', type=float, nargs='*', default=[1, 6, 24], help="durations of the synthetic rides")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per function (the fastest is reported)")
+    parser.add_argument('--only', nargs='*', help="only run these functions")
+    args = parser.parse_args()
+
+    # Slow call log lines (when ACTIVITY_PROFILING is set) would drown the table
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        model   = prepare_model(tmp)
+        profile = UserProfile()
+        # A private, initially empty parse cache
+        h.PARSED_CACHE = ParsedFileCache(os.path.join(tmp, 'parsed_cache'))
+
+        print(f"{'activity':<28} {'rows':>7} {'function':<34} {'min (s)':>9} {'median (s)':>11} {'peak (MiB)':>11}")
+        for name, fit, gpx in activities(tmp, args.hours):
+            rows, functions = cases(fit, gpx, profile)
+            for function, func in functions:
+                if args.only and function not in args.only:
+                    continue
+                result = {'activity': name, 'rows': rows, 'function': function, **measure(func, args.repeat)}
+                results.append(result)
+                print(f"{name:<28} {rows:>7} {function:<34} {result['time_min_s']:>9.4f} {result['time_median_s']:>11.4f} {result['peak_mib']:>11.1f}")
+
+    with open(args.output, 'w') as f:
+        json.dump({'meta': metadata(args, model), 'results': results}, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
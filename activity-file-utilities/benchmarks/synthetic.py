@@ -0,0 +1,137 @@
+"""
+Synthetic activities for the benchmarks: 1 Hz rides as parsed record frames, written out as
+FIT files (a minimal encoder: file_id, record, event and session messages) or as GPX files.
+"""
+import numpy as np
+import pandas as pd
+import struct
+
+FIT_EPOCH  = pd.Timestamp('1989-12-31')
+SEMICIRCLE = 2**31 / 180
+
+# FIT base types
+ENUM, SINT8, UINT8, UINT16, SINT32, UINT32, UINT32Z = 0x00, 0x01, 0x02, 0x84, 0x85, 0x86, 0x8C
+
+# Global message number and (field number, base type, numpy type) per field, in message order
+FILE_ID = (0,  [('type', 0, ENUM, 'u1'), ('manufacturer', 1, UINT16, '<u2'), ('product', 2, UINT16, '<u2'),
+                ('serial_number', 3, UINT32Z, '<u4'), ('time_created', 4, UINT32, '<u4')])
+RECORD  = (20, [('timestamp', 253, UINT32, '<u4'), ('position_lat', 0, SINT32, '<i4'), ('position_long', 1, SINT32, '<i4'),
+                ('heart_rate', 3, UINT8, 'u1'), ('cadence', 4, UINT8, 'u1'), ('distance', 5, UINT32, '<u4'),
+                ('power', 7, UINT16, '<u2'), ('temperature', 13, SINT8, 'i1'), ('enhanced_speed', 73, UINT32, '<u4'),
+                ('enhanced_altitude', 78, UINT32, '<u4')])
+EVENT   = (21, [('timestamp', 253, UINT32, '<u4'), ('event', 0, ENUM, 'u1'), ('event_type', 1, ENUM, 'u1')])
+SESSION = (18, [('timestamp', 253, UINT32, '<u4'), ('start_time', 2, UINT32, '<u4'), ('sport', 5, ENUM, 'u1'),
+                ('sub_sport', 6, ENUM, 'u1'), ('total_elapsed_time', 7, UINT32, '<u4'), ('total_distance', 9, UINT32, '<u4')])
+
+CRC_TABLE = [0x0000, 0xCC01, 0xD801, 0x1400, 0xF001, 0x3C00, 0x2800, 0xE401,
+             0xA001, 0x6C00, 0x7800, 0xB401, 0x5000, 0x9C01, 0x8801, 0x4400]
+
+
+def synthetic_records(hours: float, seed: int = 0, start: str = '2024-09-21 13:00:00') -> pd.DataFrame:
+    """
+    A 1 Hz outdoor ride as parse_fit_file returns its records: random-walk speed, power, heart rate
+    and elevation along a wandering route, with a few stops.
+    """
+    rng   = np.random.default_rng(seed)
+    count = int(hours * 3600)
+
+    moving  = np.repeat(rng.random(count // 60 + 1) > 0.03, 60)[:count]
+    speed   = np.where(moving, np.clip(6 + np.cumsum(rng.normal(0, 0.05, count)) % 4 + rng.normal(0, 0.3, count), 0, None), 0)
+    power   = np.where(moving, np.clip(200 + 60 * np.sin(np.arange(count) / 600) + rng.normal(0, 40, count), 0, None), 0)
+    heading = np.cumsum(rng.normal(0, 0.02, count))
+    lat     = 33.0 + np.cumsum(speed * np.cos(heading)) / 111_320
+    lon     = -96.8 + np.cumsum(speed * np.sin(heading)) / (111_320 * np.cos(np.radians(33.0)))
+
+    return pd.DataFrame({
+        'distance':          np.round(np.cumsum(speed), 2),
+        'enhanced_altitude': np.round(np.clip(160 + np.cumsum(rng.normal(0, 0.2, count)), 0, 4000) * 5) / 5,
+        'enhanced_speed':    np.round(speed, 3),
+        'heart_rate':        np.clip(130 + power / 10 + rng.normal(0, 3, count), 60, 200).round(),
+        'position_lat':      np.round(lat * SEMICIRCLE).astype(np.int64),
+        'position_long':     np.round(lon * SEMICIRCLE).astype(np.int64),
+        'power':             power.round().astype(np.int64),
+        'temperature':       np.full(count, 25, dtype=np.int64),
+        'timestamp':         pd.date_range(start, periods=count, freq='s'),
+        'cadence':           np.where(power > 0, np.clip(85 + rng.normal(0, 5, count), 0, 200), 0).round(),
+    })
+
+def fit_crc(data: bytes, crc: int = 0) -> int:
+    for byte in data:
+        tmp = CRC_TABLE[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ CRC_TABLE[byte & 0xF]
+        tmp = CRC_TABLE[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ CRC_TABLE[(byte >> 4) & 0xF]
+    return crc
+
+def definition(local: int, message: tuple) -> bytes:
+    number, fields = message
+    header = struct.pack('<BBBHB', 0x40 | local, 0, 0, number, len(fields))
+    return header + b''.join(struct.pack('<BBB', field, np.dtype(kind).itemsize, base) for _, field, base, kind in fields)
+
+def data_messages(local: int, message: tuple, columns: dict) -> bytes:
+    _, fields = message
+    count     = len(next(iter(columns.values())))
+    rows      = np.zeros(count, dtype=[('header', 'u1')] + [(name, kind) for name, _, _, kind in fields])
+    rows['header'] = local
+    for name, _, _, _ in fields:
+        rows[name] = columns[name]
+    return rows.tobytes()
+
+def fit_time(timestamps) -> np.ndarray:
+    return ((pd.to_datetime(pd.Series(timestamps)) - FIT_EPOCH).dt.total_seconds()).to_numpy(dtype=np.uint32)
+
+def write_fit(path: str, records: pd.DataFrame, serial_number: int = 12345):
+    """Writes a record frame (as returned by synthetic_records) as a FIT activity file."""
+    times = fit_time(records['timestamp'])
+    body  = [
+        definition(0, FILE_ID),
+        data_messages(0, FILE_ID, {'type': [4], 'manufacturer': [255], 'product': [0], 'serial_number': [serial_number], 'time_created': times[:1]}),
+        definition(1, EVENT),
+        data_messages(1, EVENT, {'timestamp': times[:1], 'event': [0], 'event_type': [0]}),
+        definition(2, RECORD),
+        data_messages(2, RECORD, {
+            'timestamp':         times,
+            'position_lat':      records['position_lat'],
+            'position_long':     records['position_long'],
+            'heart_rate':        records['heart_rate'].fillna(0xFF),
+            'cadence':           records['cadence'].fillna(0xFF),
+            'distance':          np.round(records['distance'] * 100),
+            'power':             records['power'],
+            'temperature':       records['temperature'],
+            'enhanced_speed':    np.round(records['enhanced_speed'] * 1000),
+            'enhanced_altitude': np.round((records['enhanced_altitude'] + 500) * 5),
+        }),
+        data_messages(1, EVENT, {'timestamp': times[-1:], 'event': [0], 'event_type': [4]}),
+        definition(3, SESSION),
+        data_messages(3, SESSION, {'timestamp': times[-1:], 'start_time': times[:1], 'sport': [2], 'sub_sport': [7],
+                                   'total_elapsed_time': [(times[-1] - times[0]) * 1000],
+                                   'total_distance': [round(records['distance'].iloc[-1] * 100)]}),
+    ]
+    data   = b''.join(body)
+    header = struct.pack('<BBHI4s', 14, 0x20, 2132, len(data), b'.FIT')
+    header = header + struct.pack('<H', fit_crc(header))
+    with open(path, 'wb') as f:
+        f.write(header + data + struct.pack('<H', fit_crc(data, fit_crc(header))))
+
+def write_gpx(path: str, records: pd.DataFrame):
+    """Writes a record frame (positions in semicircles) as a GPX track with Garmin extensions."""
+    points = records.dropna(subset=['position_lat', 'position_long'])
+    lat    = points['position_lat'].to_numpy() / SEMICIRCLE
+    lon    = points['position_long'].to_numpy() / SEMICIRCLE
+    ele    = points['enhanced_altitude'].fillna(0).to_numpy() if 'enhanced_altitude' in points else np.zeros(len(points))
+    hr     = points['heart_rate'].fillna(0).astype(int).to_numpy()
+    cad    = points['cadence'].fillna(0).astype(int).to_numpy() if 'cadence' in points else np.zeros(len(points), dtype=int)
+    pwr    = points['power'].fillna(0).astype(int).to_numpy()
+    times  = pd.to_datetime(points['timestamp']).dt.strftime('%Y-%m-%dT%H:%M:%SZ').to_numpy()
+
+    with open(path, 'w') as gpx:
+        gpx.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        gpx.write('<gpx creator="bench" version="1.1" xmlns="http://www.topografix.com/GPX/1/1" '
+                  'xmlns:ns3="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">\n<trk><name>bench</name><trkseg>\n')
+        for i in range(len(points)):
+            gpx.write(f'<trkpt lat="{lat[i]:.7f}" lon="{lon[i]:.7f}"><ele>{ele[i]:.1f}</ele><time>{times[i]}</time>'
+                      f'<extensions><power>{pwr[i]}</power><ns3:TrackPointExtension><ns3:hr>{hr[i]}</ns3:hr>'
+                      f'<ns3:cad>{cad[i]}</ns3:cad></ns3:TrackPointExtension></extensions></trkpt>\n')
+        gpx.write('</trkseg></trk></gpx>\n')
@@ -0,0 +1,42 @@
+"""
+Exports the aerobic training effect Keras model and its scaler to ./models/aerobic_training_effect_model.npz,
+so the app can predict with NumPy only and never import TensorFlow.
+
+Run from the activity-file-utilities folder (requires TensorFlow):
+
+    python export_model.py
+"""
+from src.inference import AEROBIC_TE_FEATURES, EXPORTED_FILE, MODEL_FILE, SCALER_FILE, AerobicTrainingEffectModel, NumpyAerobicTrainingEffectModel, export_aerobic_te_model
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+
+logging.basicConfig(format='%(asctime)s [%(levelname)s] [%(module)s.%(funcName)s] [%(threadName)s] - %(message)s', level=logging.INFO)
+
+def verify(model_file: str, scaler_file: str, exported_file: str, samples: int = 10000) -> float:
+    keras_model = AerobicTrainingEffectModel(model_file, scaler_file)
+    numpy_model = NumpyAerobicTrainingEffectModel(exported_file)
+
+    # Random activities spread over the range the scaler was fitted on
+    rng    = np.random.default_rng(0)
+    low    = getattr(keras_model.scaler, 'data_min_', np.zeros(len(AEROBIC_TE_FEATURES)))
+    high   = getattr(keras_model.scaler, 'data_max_', np.ones(len(AEROBIC_TE_FEATURES)))
+    inputs = pd.DataFrame(rng.uniform(low, high, size=(samples, len(AEROBIC_TE_FEATURES))), columns=AEROBIC_TE_FEATURES)
+
+    difference = np.abs(keras_model.predict_raw(inputs) - numpy_model.predict_raw(inputs)).max()
+    mismatched = (keras_model.predict(inputs) != numpy_model.predict(inputs)).sum()
+    logging.info(f"Max absolute difference over {samples} samples: {difference:.2e} ({mismatched} rounded predictions differ)")
+    return difference
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the aerobic TE model for TensorFlow-free inference")
+    parser.add_argument('--model', default=MODEL_FILE)
+    parser.add_argument('--scaler', default=SCALER_FILE)
+    parser.add_argument('--output', default=EXPORTED_FILE)
+    args = parser.parse_args()
+
+    exported_file = export_aerobic_te_model(args.model, args.scaler, args.output)
+    logging.info(f"Exported {args.model} and {args.scaler} to {exported_file}")
+    verify(args.model, args.scaler, exported_file)
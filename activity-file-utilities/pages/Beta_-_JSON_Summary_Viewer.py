@@ -1,58 +1,51 @@
-import os
-import json
+import datetime
 import pandas as pd
 import streamlit as st
 from src import utils as h
+from src.summary_index import open_index
+from src.training_load import TrainingLoad
 
+CHART_COLUMNS = [
+    'activity_distance',
+    'time_stopped',
+    'time_coasting',
+    'time_moving',
+    'time_working',
+    'time_total',
+    'power_time_in_zone_1',
+    'power_time_in_zone_2',
+    'power_time_in_zone_3',
+    'power_time_in_zone_4',
+    'power_time_in_zone_5',
+    'power_time_in_zone_6',
+    'power_time_in_zone_7',
+    'hr_time_in_zone_1',
+    'hr_time_in_zone_2',
+    'hr_time_in_zone_3',
+    'hr_time_in_zone_4',
+    'hr_time_in_zone_5',
+    'te_aerobic',
+    'te_anaerobic',
+    'training_stress_score'
+]
 
+# Loads the charted columns of the activities in a date range from the directory's summary index
+# (built from the JSON files on first use, then kept up to date by processor.py)
+def load_json_files(directory, start=None, end=None):
+    index   = open_index(directory)
+    columns = ['activity_id', 'activity_date'] + [c for c in CHART_COLUMNS if c in index.columns()]
+    return index.load(columns=columns, start=start, end=end)
 
-# Function to process and load JSON files from a directory
-def load_json_files(directory):
-    data = []
-    
-    # Loop through all files in the directory
-    for filename in os.listdir(directory):
-        if filename.endswith('.json'):
-            file_path = os.path.join(directory, filename)
-            # Load the JSON data from each file
-            with open(file_path, 'r') as file:
-                json_data = json.load(file)
-                
-                # Flatten the JSON and add to list
-                for key, value in json_data.items():
-                    flat_record = {"activity_id": key, **value}  # Add the activity ID as a column
-                    data.append(flat_record)
-
-    # Convert the list of records to a DataFrame
-    df = pd.DataFrame(data)
-    return df
+# Fitness (CTL), fatigue (ATL) and form (TSB) per day; only days affected by new activities are recomputed
+def load_training_load(directory, start=None, end=None):
+    load = TrainingLoad(open_index(directory).path)
+    load.refresh()
+    return load.series(start, end)
 
 def chart(df: pd.DataFrame):
-    df['date'] = pd.to_datetime(df['activity_start_time'])
-    filtered_df = df[df['date'] > '2024-01-01']
-    grouped = filtered_df.groupby(filtered_df['date'].dt.to_period('D'))[[
-        'activity_distance',
-        'time_stopped',
-        'time_coasting',
-        'time_moving',
-        'time_working',
-        'time_total',
-        'power_time_in_zone_1',
-        'power_time_in_zone_2',
-        'power_time_in_zone_3',
-        'power_time_in_zone_4',
-        'power_time_in_zone_5',
-        'power_time_in_zone_6',
-        'power_time_in_zone_7',
-        'hr_time_in_zone_1',
-        'hr_time_in_zone_2',
-        'hr_time_in_zone_3',
-        'hr_time_in_zone_4',
-        'hr_time_in_zone_5',
-        'te_aerobic',
-        'te_anaerobic',
-        'training_stress_score'
-    ]].sum(numeric_only=True)
+    # Local calendar date of each activity, the date range is already applied by the index
+    df['date'] = pd.to_datetime(df['activity_date'])
+    grouped = df.groupby(df['date'].dt.to_period('D'))[[c for c in CHART_COLUMNS if c in df.columns]].sum(numeric_only=True)
     return grouped
 
 
@@ -61,11 +54,13 @@ st.title("Local Directory JSON Loader")
 
 # Text input for directory selection
 directory = st.text_input("Enter the directory path containing JSON files:")
+start     = st.date_input("From", value=datetime.date(2024, 1, 1))
+end       = st.date_input("To", value=datetime.date.today())
 
 # Load data if a directory is provided
 if directory:
     try:
-        df = load_json_files(directory)
+        df = load_json_files(directory, start, end)
         
         if not df.empty:
             # # Show the DataFrame in Streamlit
@@ -82,6 +77,14 @@ if directory:
                 'time_total'
             ]],
                              size='time_total')
+
+            st.subheader("Training Load")
+            training_load = load_training_load(directory, start, end)
+            st.line_chart(training_load.set_index('day')[['ctl', 'atl', 'tsb']].rename(columns={
+                'ctl': 'Fitness (CTL)',
+                'atl': 'Fatigue (ATL)',
+                'tsb': 'Form (TSB)',
+            }))
             
         else:
             st.write("No JSON files found in the provided directory.")
@@ -29,54 +29,54 @@ if uploaded_file1 is not None and uploaded_file2 is not None:
     st.subheader("Comparison Charts")
     # Speed Comparison
     if not agg_df1['mean_speed'].isnull().all() and not agg_df2['mean_speed'].isnull().all():
-        combined_speed_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_speed', 'Speed Comparison', 'Speed (mph)')
+        combined_speed_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_speed', 'Speed Comparison', 'Speed (mph)')
         st.altair_chart(combined_speed_chart, use_container_width=True)
     if display_median:
         if not agg_df1['median_speed'].isnull().all() and not agg_df2['median_speed'].isnull().all():
-            combined_speed_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_speed', 'Speed Comparison', 'Speed (mph)')
+            combined_speed_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_speed', 'Speed Comparison', 'Speed (mph)')
             st.altair_chart(combined_speed_chart, use_container_width=True)
 
     # Power Comparison
     if not agg_df1['mean_power'].isnull().all() and not agg_df2['mean_power'].isnull().all():
-        combined_power_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_power', 'Power Comparison', 'Power (W)')
+        combined_power_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_power', 'Power Comparison', 'Power (W)')
         st.altair_chart(combined_power_chart, use_container_width=True)
     if display_median:
         if not agg_df1['median_power'].isnull().all() and not agg_df2['median_power'].isnull().all():
-            combined_power_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_power', 'Power Comparison', 'Power (W)')
+            combined_power_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_power', 'Power Comparison', 'Power (W)')
             st.altair_chart(combined_power_chart, use_container_width=True)
         
     # Heart Rate Comparison
     if not agg_df1['mean_heart_rate'].isnull().all() and not agg_df2['mean_heart_rate'].isnull().all():
-        combined_hr_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_heart_rate', 'Heart Rate Comparison', 'Heart Rate (bpm)')
+        combined_hr_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_heart_rate', 'Heart Rate Comparison', 'Heart Rate (bpm)')
         st.altair_chart(combined_hr_chart, use_container_width=True)
     if display_median:
         if not agg_df1['median_heart_rate'].isnull().all() and not agg_df2['median_heart_rate'].isnull().all():
-            combined_hr_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_heart_rate', 'Heart Rate Comparison', 'Heart Rate (bpm)')
+            combined_hr_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_heart_rate', 'Heart Rate Comparison', 'Heart Rate (bpm)')
             st.altair_chart(combined_hr_chart, use_container_width=True)
         
     # Temperature Comparison
     if not agg_df1['mean_temperature'].isnull().all() and not agg_df2['mean_temperature'].isnull().all():
-        combined_temp_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_temperature', 'Temperature Comparison', 'Temperature (℉)')
+        combined_temp_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_temperature', 'Temperature Comparison', 'Temperature (℉)')
         st.altair_chart(combined_temp_chart, use_container_width=True)
     if display_median:
         if not agg_df1['median_temperature'].isnull().all() and not agg_df2['median_temperature'].isnull().all():
-            combined_temp_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_temperature', 'Temperature Comparison', 'Temperature (℉)')
+            combined_temp_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_temperature', 'Temperature Comparison', 'Temperature (℉)')
             st.altair_chart(combined_temp_chart, use_container_width=True)
         
     # Elevation Comparison
     if not agg_df1['mean_elevation'].isnull().all() and not agg_df2['mean_elevation'].isnull().all():
-        combined_elev_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_elevation', 'Elevation Comparison', 'Elevation (ft)')
+        combined_elev_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_elevation', 'Elevation Comparison', 'Elevation (ft)')
         st.altair_chart(combined_elev_chart, use_container_width=True)
     if display_median:
         if not agg_df1['median_elevation'].isnull().all() and not agg_df2['median_elevation'].isnull().all():
-            combined_elev_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_elevation', 'Elevation Comparison', 'Elevation (ft)')
+            combined_elev_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_elevation', 'Elevation Comparison', 'Elevation (ft)')
             st.altair_chart(combined_elev_chart, use_container_width=True)
         
     # Cadence Comparison
     if not agg_df1['mean_cadence'].isnull().all() and not agg_df2['mean_cadence'].isnull().all():
-        combined_elev_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_cadence', 'Cadence Comparison', 'rpm')
+        combined_elev_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'mean_cadence', 'Cadence Comparison', 'rpm')
         st.altair_chart(combined_elev_chart, use_container_width=True)
     if display_median:
         if not agg_df1['median_cadence'].isnull().all() and not agg_df2['median_cadence'].isnull().all():
-            combined_elev_chart = h.create_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_cadence', 'Cadence Comparison', 'rpm')
+            combined_elev_chart = h.create_dual_chart(uploaded_file1.name, uploaded_file2.name, agg_df1, agg_df2, 'median_cadence', 'Cadence Comparison', 'rpm')
             st.altair_chart(combined_elev_chart, use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,105 @@
+from src.ingest import STATUS_FILE
+from src.profiling import PROFILER, PROFILE_DIR, capture_summary, list_captures
+import json
+import os
+import pandas as pd
+import streamlit as st
+
+
+st.set_page_config(
+    page_title="Diagnostics",
+    layout="wide",
+    page_icon="⏱️"
+)
+
+st.title("Diagnostics")
+
+# Function stats
+st.subheader("Function timings")
+enabled = st.toggle("Record function timings", value=PROFILER.enabled)
+if enabled and not PROFILER.enabled:
+    PROFILER.enable()
+elif not enabled and PROFILER.enabled:
+    PROFILER.disable()
+
+report = PROFILER.report()
+if report:
+    table = pd.DataFrame([{
+        'function':  row['function'],
+        'calls':     row['calls'],
+        'total (s)': round(row['total_s'], 3),
+        'mean (ms)': round(row['mean_s'] * 1e3, 3),
+        'p50 (ms)':  round(row['p50_s'] * 1e3, 3),
+        'p95 (ms)':  round(row['p95_s'] * 1e3, 3),
+        'p99 (ms)':  round(row['p99_s'] * 1e3, 3),
+        'max (ms)':  round(row['max_s'] * 1e3, 3),
+    } for row in report])
+    st.dataframe(table, hide_index=True, use_container_width=True)
+
+    selected = st.selectbox("Latency histogram of:", [row['function'] for row in report])
+    buckets  = next(row['histogram'] for row in report if row['function'] == selected)
+    st.bar_chart(pd.DataFrame({
+        'up to (ms)': [f"{bucket['le_s'] * 1e3:.3g}" for bucket in buckets],
+        'calls':      [bucket['count'] for bucket in buckets],
+    }).set_index('up to (ms)'))
+
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        st.download_button("Download as JSON", json.dumps({'functions': report}, indent=2),
+                           file_name="function_timings.json", mime="application/json")
+    with col2:
+        if st.button("Reset"):
+            PROFILER.reset()
+            st.rerun()
+elif PROFILER.enabled:
+    st.info("No calls recorded yet, open another page to collect timings.")
+else:
+    st.info("Function timings are off. Turn them on, or start the app with ACTIVITY_PROFILING=1.")
+
+# cProfile captures
+st.subheader("cProfile captures")
+st.write(f"""
+         The next run of the FIT/GPX File Browser or Parser page can be recorded with cProfile.
+         Captures of processor.py batches run with --profile are listed here too ({PROFILE_DIR}).
+         """)
+if PROFILER.page_capture_armed:
+    st.warning("Waiting for the next FIT/GPX page run to capture.")
+elif st.button("Capture the next page run"):
+    PROFILER.arm_page_capture()
+    st.rerun()
+
+captures = list_captures()
+if captures:
+    selected = st.selectbox("Capture:", captures)
+    path     = os.path.join(PROFILE_DIR, selected)
+    sort     = st.radio("Sort by:", ['cumulative', 'tottime', 'ncalls'], horizontal=True)
+    st.code(capture_summary(path, sort=sort))
+    with open(path, 'rb') as f:
+        st.download_button("Download capture (.prof)", f.read(), file_name=selected)
+
+# Watch-folder ingestion, see processor.py --watch
+st.subheader("Ingestion")
+if os.path.isfile(STATUS_FILE):
+    with open(STATUS_FILE, 'r') as f:
+        status = json.load(f)
+    st.write(f"Last report {status['updated']} from {status['watcher']} on {', '.join(status['directories'])}")
+
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
+    col1.metric("Settling",  status['settling'])
+    col2.metric("Queued",    f"{status['queue_depth']}/{status['queue_capacity']}")
+    col3.metric("In flight", status['in_flight'])
+    col4.metric("Processed", status['processed'])
+    col5.metric("Failed",    status['failed'])
+    col6.metric("Duplicates skipped", status.get('skipped', 0))
+
+    st.dataframe(pd.DataFrame([{
+        'stage':     stage,
+        'files':     stats['count'],
+        'mean (s)':  round(stats.get('mean_s', 0), 2),
+        'p50 (s)':   round(stats.get('p50_s', 0), 2),
+        'p95 (s)':   round(stats.get('p95_s', 0), 2),
+        'max (s)':   round(stats.get('max_s', 0), 2),
+    } for stage, stats in [('queue wait', status['queue_wait']), ('processing', status['processing']),
+                           ('written to processed', status['latency'])]]), hide_index=True, use_container_width=True)
+else:
+    st.info("No ingestion service has reported yet, start one with `python processor.py --watch`.")
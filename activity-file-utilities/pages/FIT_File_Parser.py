@@ -1,8 +1,12 @@
+from src.activity_cache import get_activity_analysis
 from src.core import UserProfile
+from src.profiling import begin_page_capture, end_page_capture
 from streamlit_folium import st_folium
 import src.utils as h
 import streamlit as st
-import pandas as pd
+
+# cProfile capture of this run, when requested from the Diagnostics page
+page_capture = begin_page_capture('FIT_File_Parser')
 
 profile = UserProfile()
 st.set_page_config(
@@ -38,56 +42,26 @@ uploaded_file = st.file_uploader("Choose a FIT/GPX file", type=["fit", "gpx"])
 if uploaded_file is not None:
     try:
         if uploaded_file.type == "application/fits":
-            parsed_fit      = h.parse_fit_file(uploaded_file)
-            activity        = parsed_fit[0]
-            event_data      = parsed_fit[1]
-            event_time      = parsed_fit[1]['timestamp'].iloc[0] if parsed_fit[1]['timestamp'].iloc[0] else None
-            sport           = parsed_fit[2]['sport'].iloc[-1]
-            summary         = h.get_summary(activity,
-                                            profile.get_ftp(),
-                                            format="fit"
-                                            )
-            try:
-                starting_loc = h.get_location_details(api_key=profile.get_api_key(),
-                                                      latitude=activity['position_lat'].iloc[0]*(180 / 2**31),
-                                                      longitude=activity['position_long'].iloc[0]* (180 / 2**31)
-                                                      )
-                
-                starting_city   = starting_loc['city']
-                starting_state  = starting_loc['state']
-                starting_zip    = starting_loc['postal_code']
-                starting_ctry   = starting_loc['country']
-            except Exception:
-                starting_city   = None
-                starting_state  = None
-                starting_zip    = None
-                starting_ctry   = None
-            
-            hr_zone_time    = h.calculate_hr_zone_time(activity, profile.get_hr_zones())           
-            activity_te     = h.calculate_training_effect(hr_zone_time, float(summary['intensity_factor'].iloc[0]))
-            
-            # Need to move this to utils.py
-            model_dic = dict()
-            model_dic['hr_time_in_zone_1']     = hr_zone_time.set_index('zone').transpose()['zone1'].values
-            model_dic['hr_time_in_zone_2']     = hr_zone_time.set_index('zone').transpose()['zone2'].values
-            model_dic['hr_time_in_zone_3']     = hr_zone_time.set_index('zone').transpose()['zone3'].values
-            model_dic['hr_time_in_zone_4']     = hr_zone_time.set_index('zone').transpose()['zone4'].values
-            model_dic['hr_time_in_zone_5']     = hr_zone_time.set_index('zone').transpose()['zone5'].values
-            model_dic['training_stress_score'] = summary['tss']
-            model_dic['activity_distance']     = summary['distance_total']
-            model_dic['hr_average']            = summary['hr_avg']
-            model_dic['hr_max']                = summary['hr_max']
-            model_dic['time_total']            = summary['time_total_seconds']
-            model_dic['intensity_factor']      = summary['intensity_factor']
-            
-            model_df   = pd.DataFrame(model_dic)
-            aerobic_te = h.predict_aerobic_training_effect(model_df)
-            
-            power_zone_time = h.calculate_power_zone_time(activity, profile.get_power_zones())
+            analysis        = get_activity_analysis(uploaded_file, 'fit', profile)
+            activity        = analysis['activity']
+            event_data      = analysis['events']
+            event_time      = analysis['event_time']
+            sport           = analysis['sport']
+            summary         = analysis['summary']
+            starting_loc    = analysis['starting_location']
+            starting_city   = starting_loc.get('city')
+            starting_state  = starting_loc.get('state')
+            starting_zip    = starting_loc.get('postal_code')
+            starting_ctry   = starting_loc.get('country')
+            hr_zone_time    = analysis['hr_zone_time']
+            activity_te     = analysis['activity_te']
+            aerobic_te      = analysis['aerobic_te']
+            power_zone_time = analysis['power_zone_time']
             
         elif uploaded_file.type == "application/gpx+xml":
-            activity = h.gpx_to_dataframe(uploaded_file)
-            summary  = h.get_summary(activity, profile.get_ftp(), format="gpx")
+            analysis = get_activity_analysis(uploaded_file, 'gpx', profile)
+            activity = analysis['activity']
+            summary  = analysis['summary']
         
     except Exception as e:
         st.error(e)
@@ -104,66 +78,66 @@ if uploaded_file is not None:
         col1, col2, col3, col4, col5 = st.columns([1,1,1,1,4], vertical_alignment='top', gap='small')
         with col1:
             st.subheader("Time")
-            st.metric(label='Coasting 🕰️',  value=summary['time_coasting_string'].iloc[0])
-            st.metric(label='Stopped 🕰️',   value=summary['time_stopped_string'].iloc[0])
-            st.metric(label='Moving 🕰️',    value=summary['time_moving_string'].iloc[0])
-            st.metric(label='Working 🕰️',   value=summary['time_working_string'].iloc[0])
-            st.metric(label='Total 🕰️',     value=summary['time_total_string'].iloc[0])
+            st.metric(label='Coasting 🕰️',  value=summary.time_coasting_string)
+            st.metric(label='Stopped 🕰️',   value=summary.time_stopped_string)
+            st.metric(label='Moving 🕰️',    value=summary.time_moving_string)
+            st.metric(label='Working 🕰️',   value=summary.time_working_string)
+            st.metric(label='Total 🕰️',     value=summary.time_total_string)
             
-            if summary['temp_avg'].iloc[0] != 0:
+            if summary.temp_avg != 0:
                 st.divider()
                 st.subheader("Temps")
                 if metric_display:
-                    st.metric(label='Avg ℃ 🌡️', value=summary['temp_avg'])
-                    st.metric(label='Max ℃ 🌡️', value=summary['temp_max'])
+                    st.metric(label='Avg ℃ 🌡️', value=summary.temp_avg)
+                    st.metric(label='Max ℃ 🌡️', value=summary.temp_max)
                 else:
-                    st.metric(label='Avg ℉ 🌡️', value=h.convert(summary['temp_avg'], from_to='celsius_fahrenheit'))
-                    st.metric(label='Max ℉ 🌡️', value=h.convert(summary['temp_max'], from_to='celsius_fahrenheit'))
+                    st.metric(label='Avg ℉ 🌡️', value=h.convert(summary.temp_avg, from_to='celsius_fahrenheit'))
+                    st.metric(label='Max ℉ 🌡️', value=h.convert(summary.temp_max, from_to='celsius_fahrenheit'))
             
         with col2:
             st.subheader("Power")
-            st.metric(label='Avg W ⚡', value=summary['power_avg'])
-            st.metric(label='Max W ⚡', value=summary['power_max'])
+            st.metric(label='Avg W ⚡', value=summary.power_avg)
+            st.metric(label='Max W ⚡', value=summary.power_max)
             st.divider()
             
             st.subheader("Intensity")
-            st.metric(label='NP® W ⚡', value=summary['power_normalized'])
-            st.metric(label='IF®',      value=summary['intensity_factor'])
-            st.metric(label='TSS®',     value=summary['tss'])
+            st.metric(label='NP® W ⚡', value=summary.power_normalized)
+            st.metric(label='IF®',      value=summary.intensity_factor)
+            st.metric(label='TSS®',     value=summary.tss)
         
         with col3:
             st.subheader("Power Avgs")
-            st.metric(label='Max W 30s ⚡', value=summary['power_max_avg_30s'])
-            st.metric(label='Max W 5m ⚡',  value=summary['power_max_avg_5m'])
-            if summary['power_max_avg_10m'].iloc[0] != 0:
-                st.metric(label='Max W 10m ⚡', value=summary['power_max_avg_10m'])
-            if summary['power_max_avg_20m'].iloc[0] != 0:
-                st.metric(label='Max W 20m ⚡', value=summary['power_max_avg_20m'])
-            if summary['power_max_avg_60m'].iloc[0] != 0:
-                st.metric(label='Max W 60m ⚡', value=summary['power_max_avg_60m'])
+            st.metric(label='Max W 30s ⚡', value=summary.power_max_avg_30s)
+            st.metric(label='Max W 5m ⚡',  value=summary.power_max_avg_5m)
+            if summary.power_max_avg_10m != 0:
+                st.metric(label='Max W 10m ⚡', value=summary.power_max_avg_10m)
+            if summary.power_max_avg_20m != 0:
+                st.metric(label='Max W 20m ⚡', value=summary.power_max_avg_20m)
+            if summary.power_max_avg_60m != 0:
+                st.metric(label='Max W 60m ⚡', value=summary.power_max_avg_60m)
             st.divider()
             
             st.subheader("Speed")
             if metric_display:
-                st.metric(label='Avg kmh 🚴',        value=summary['speed_avg'])
-                st.metric(label='Avg moving kmh 🚴', value=summary['speed_moving_avg'])
-                st.metric(label='Max kmh 🚴',        value=summary['speed_max'])
-                st.metric(label='Dist km 📏',        value=summary['distance_total'])
+                st.metric(label='Avg kmh 🚴',        value=summary.speed_avg)
+                st.metric(label='Avg moving kmh 🚴', value=summary.speed_moving_avg)
+                st.metric(label='Max kmh 🚴',        value=summary.speed_max)
+                st.metric(label='Dist km 📏',        value=summary.distance_total)
             else:
-                st.metric(label='Avg mph 🚴',        value=h.convert(summary['speed_avg'], from_to='kmh_mph'))
-                st.metric(label='Avg moving mph 🚴', value=h.convert(summary['speed_moving_avg'], from_to='kmh_mph'))
-                st.metric(label='Max mph 🚴',        value=h.convert(summary['speed_max'], from_to='kmh_mph'))
-                st.metric(label='Dist miles 📏',     value=h.convert(summary['distance_total'], from_to='km_miles'))
+                st.metric(label='Avg mph 🚴',        value=h.convert(summary.speed_avg, from_to='kmh_mph'))
+                st.metric(label='Avg moving mph 🚴', value=h.convert(summary.speed_moving_avg, from_to='kmh_mph'))
+                st.metric(label='Max mph 🚴',        value=h.convert(summary.speed_max, from_to='kmh_mph'))
+                st.metric(label='Dist miles 📏',     value=h.convert(summary.distance_total, from_to='km_miles'))
             
         with col4:
             st.subheader("Cadence")
-            st.metric(label='Avg RPM 🌪️',   value=summary['cadence_avg'])
-            st.metric(label='Max RPM 🌪️',   value=summary['cadence_max'])
+            st.metric(label='Avg RPM 🌪️',   value=summary.cadence_avg)
+            st.metric(label='Max RPM 🌪️',   value=summary.cadence_max)
             st.divider()
             
             st.subheader("Heart Rate")
-            st.metric(label='Avg BPM ❤️',   value=summary['hr_avg'])
-            st.metric(label='Max BPM ❤️',   value=summary['hr_max'])
+            st.metric(label='Avg BPM ❤️',   value=summary.hr_avg)
+            st.metric(label='Max BPM ❤️',   value=summary.hr_max)
             st.divider()
 
             st.subheader("Training Effect")
@@ -185,7 +159,7 @@ if uploaded_file is not None:
         st.subheader("Activity")
         st.dataframe(activity)
         st.subheader("Basic Summary")
-        st.dataframe(summary.transpose())
+        st.dataframe(summary.to_frame().transpose())
         col1, col2= st.columns([1, 1])
         with col1:
             st.subheader("HR Zone Time")
@@ -198,3 +172,5 @@ if uploaded_file is not None:
         
 else:
     st.info("Please upload a FIT or GPX file to inspect.")
+
+end_page_capture(page_capture)
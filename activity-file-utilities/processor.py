@@ -1,5 +1,16 @@
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
 from datetime import datetime
 from src.core import UserProfile
+from src.dedupe import DEDUPE_INDEX, DuplicateActivity
+from src.geocoding import OPENCAGE_BURST, OPENCAGE_RATE, TokenBucket
+from src.ingest import STATUS_FILE, IngestService, open_watcher
+from src.profiling import PROFILER, capture, capture_path
+from src.summary_index import open_index
+from src.timezones import RESOLVER
+from src.training_load import TrainingLoad
+from time import perf_counter
+import argparse
 import hashlib as hash
 import json
 import os
@@ -7,34 +18,14 @@ import pandas as pd
 import src.utils as h
 import logging
 import pytz
-from timezonefinder import TimezoneFinder
 
 
 logging.basicConfig(format='%(asctime)s [%(levelname)s] [%(module)s.%(funcName)s] [%(threadName)s] - %(message)s', level=logging.INFO)
 
-tf = TimezoneFinder()
-
 # Function to convert time to the appropriate timezone
 def localize_time(timestamp, lat=None, lon=None):
-    if lat is not None and lon is not None:
-        try:
-            timezone_str = tf.timezone_at(lng=lon, lat=lat)
-            if timezone_str:
-                local_tz = pytz.timezone(timezone_str)
-            else:
-                # Fallback to Central Time if timezone not found
-                local_tz = pytz.timezone('US/Central')
-        except Exception as e:
-            logging.error(f"Error determining timezone: {e}")
-            local_tz = pytz.timezone('US/Central')
-    else:
-        # Fallback to Central Time for indoor activities
-        local_tz = pytz.timezone('US/Central')
-
-    utc_tz = pytz.utc
-    utc_time = utc_tz.localize(timestamp)
-    local_time = utc_time.astimezone(local_tz)
-    return local_time
+    # Time zones are memoized per ~1km cell, so a batch resolves each area once
+    return RESOLVER.localize(timestamp, lat, lon)
 
 def check_activity(file_path):
     return os.path.isfile(file_path)
@@ -49,23 +40,9 @@ def json_serializer(obj):
     return convert_timestamp_to_serializable(obj)
 
 def combine_json_to_csv(directory_path, output_csv_file):
-    combined_data = []  # List to hold the data from all JSON files
-    
-    # Iterate over all JSON files in the directory
-    for file_name in os.listdir(directory_path):
-        if file_name.endswith('.json'):
-            file_path = os.path.join(directory_path, file_name)
-            
-            # Load JSON data
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                
-                # Extract the data inside the nested dictionary (e.g., inside the unique hash key)
-                for key, activity_data in data.items():
-                    combined_data.append(activity_data)  # Append the activity data
-                
-    # Convert combined data into a DataFrame
-    df = pd.DataFrame(combined_data)
+    # Read from the consolidated index rather than opening every summary JSON file
+    df = open_index(directory_path).load()
+    df = df.drop(columns=['activity_id'])
     
     # Save the DataFrame to a CSV file
     df.to_csv(output_csv_file, index=False)
@@ -76,296 +53,566 @@ BIO_HR_MAX          = profile.get_max_hr()
 BIO_HR_RESTING      = profile.get_resting_hr()
 API_KEY             = profile.get_api_key()
 
-EXT_FILTER  = 'fit'
-ROOT        = './samples'
-FILES       = os.listdir(ROOT)
+EXT_FILTER    = 'fit'
+ROOT          = './samples'
+MANIFEST_FILE = '.processor_manifest.jsonl'
 
-for file in FILES:
-    if file.endswith(EXT_FILTER):
-        full_path = f"{ROOT}/{file}"
-        summary_file_name = f"{ROOT}/summary_{file}.json"
-        logging.debug(f"Check to see if {summary_file_name} needs to be processed")
-        if not check_activity(summary_file_name):
-            logging.info(f"Processing {full_path} --> {summary_file_name}")
-            with open(full_path, 'rb') as fitfile:
-                fitfile        = h.parse_fit_file(fitfile)
-                fit_records_df = fitfile[0]
-                fit_events_df  = fitfile[1]
-                fit_session_df = fitfile[2]
-                
-                activity_type       = fit_session_df['sport'].iloc[-1]
-                activity_sub_type   = fit_session_df['sub_sport'].iloc[-1]
-                activity_start_time = fit_events_df['timestamp'].iloc[0] if fit_events_df['timestamp'].iloc[0] else None
-                activity_end_time   = fit_events_df['timestamp'].iloc[-1] if fit_events_df['timestamp'].iloc[0] else None
-
-                ftp_                 = profile.get_ftp(activity_start_time.to_pydatetime().astimezone(pytz.UTC).replace(tzinfo=None))
-                summary_df           = h.get_summary(fit_records_df, ftp = ftp_, format=EXT_FILTER)
-                activity_distance    = summary_df['distance_total'].iloc[0]
-                speed_average        = summary_df['speed_avg'].iloc[0]
-                speed_moving_average = summary_df['speed_moving_avg'].iloc[0]
-                speed_max            = summary_df['speed_max'].iloc[0]
-                
-                if 'indoor_cycling' not in activity_sub_type:
-                    try:
-                        activity_start_latitude  = fit_records_df['position_lat'].iloc[0]*(180 / 2**31)
-                        activity_start_longitude = fit_records_df['position_long'].iloc[0]*(180 / 2**31)
-
-                        rgeo_start = h.get_location_details(api_key=API_KEY,
-                                                            latitude=activity_start_latitude,
-                                                            longitude=activity_start_longitude)
-
-                        activity_start_city     = rgeo_start['city']
-                        activity_start_state    = rgeo_start['state']
-                        activity_start_zip      = rgeo_start['postal_code']
-                        activity_start_country  = rgeo_start['country']
-                        
-                    except Exception as e:
-                        logging.error(e)
-                        activity_start_latitude  = None
-                        activity_start_longitude = None
-                        activity_start_city      = '-'
-                        activity_start_state     = '-'
-                        activity_start_zip       = '-'
-                        activity_start_country   = '-'
-                
-                    try:
-                        activity_end_latitude  = fit_records_df['position_lat'].iloc[-1]*(180 / 2**31)
-                        activity_end_longitude = fit_records_df['position_long'].iloc[-1]*(180 / 2**31)
-                    
-                        rgeo_end = h.get_location_details(api_key=API_KEY,
-                                                        latitude=activity_end_latitude,
-                                                        longitude=activity_end_longitude)
-                        
-                        activity_end_city     = rgeo_end['city']
-                        activity_end_state    = rgeo_end['state']
-                        activity_end_zip      = rgeo_end['postal_code']
-                        activity_end_country  = rgeo_end['country']
-                        
-                    except Exception as e:
-                        logging.error(e)
-                        activity_end_latitude  = None
-                        activity_end_longitude = None
-                        activity_end_city      = '-'
-                        activity_end_state     = '-'
-                        activity_end_zip       = '-'
-                        activity_end_country   = '-'
-
-                elif 'indoor_cycling' in activity_sub_type:
-                    activity_start_latitude  = None
-                    activity_start_longitude = None
-                    activity_end_latitude    = None
-                    activity_end_longitude   = None
-                    activity_start_city      = '-'
-                    activity_start_state     = '-'
-                    activity_start_zip       = '-'
-                    activity_start_country   = '-'
-                    activity_end_city        = '-'
-                    activity_end_state       = '-'
-                    activity_end_zip         = '-'
-                    activity_end_country     = '-'
-                        
-                # Localize start and end times based on the start latitude/longitude
-                activity_start_time = localize_time(activity_start_time, activity_start_latitude, activity_start_longitude)
-                activity_end_time   = localize_time(activity_end_time, activity_start_latitude, activity_start_longitude)
-
-                activity_id = hash.sha256(f"{activity_type} {activity_sub_type} {activity_start_time}".encode('utf-8')).hexdigest()
-
-                time_coasting = summary_df['time_coasting_seconds'].iloc[0]
-                time_stopped  = summary_df['time_stopped_seconds'].iloc[0]
-                time_moving   = summary_df['time_moving_seconds'].iloc[0]
-                time_working  = summary_df['time_working_seconds'].iloc[0]
-                time_total    = summary_df['time_total_seconds'].iloc[0]
-                
-                power_average       = summary_df['power_avg'].iloc[0]
-                power_max           = summary_df['power_max'].iloc[0]
-                power_normalized    = summary_df['power_normalized'].iloc[0]
-                power_30s_max_avg   = summary_df['power_max_avg_30s'].iloc[0]
-                power_5m_max_avg    = summary_df['power_max_avg_5m'].iloc[0]
-                power_10m_max_avg   = summary_df['power_max_avg_10m'].iloc[0]
-                power_20m_max_avg   = summary_df['power_max_avg_20m'].iloc[0]
-                power_60m_max_avg   = summary_df['power_max_avg_60m'].iloc[0]
-                
-                cadence_average = summary_df['cadence_avg'].iloc[0]
-                cadence_max     = summary_df['cadence_max'].iloc[0]
-                
-                hr_average  = summary_df['hr_avg'].iloc[0]
-                hr_max      = summary_df['hr_max'].iloc[0]
-                
-                intensity_factor = summary_df['intensity_factor'].iloc[0]
-                
-                latest_hr_zones = profile.get_hr_zones(activity_start_time.to_pydatetime().astimezone(pytz.UTC).replace(tzinfo=None))
-                hr_zone_time    = h.calculate_hr_zone_time(fit_records_df, latest_hr_zones)
+# FIT messages and fields the summary needs, everything else is skipped while decoding
+SUMMARY_PROJECTION = {
+    'record':  ['timestamp', 'distance', 'speed', 'enhanced_speed', 'heart_rate', 'power', 'cadence', 'temperature', 'position_lat', 'position_long'],
+    'event':   ['timestamp'],
+    'session': ['sport', 'sub_sport'],
+}
 
-                te = h.calculate_training_effect(hr_zone_time, intensity_factor)
-                
-                model_dic = dict()
-                model_dic['hr_time_in_zone_1']     = hr_zone_time.set_index('zone').transpose()['zone1'].values
-                model_dic['hr_time_in_zone_2']     = hr_zone_time.set_index('zone').transpose()['zone2'].values
-                model_dic['hr_time_in_zone_3']     = hr_zone_time.set_index('zone').transpose()['zone3'].values
-                model_dic['hr_time_in_zone_4']     = hr_zone_time.set_index('zone').transpose()['zone4'].values
-                model_dic['hr_time_in_zone_5']     = hr_zone_time.set_index('zone').transpose()['zone5'].values
-                model_dic['training_stress_score'] = summary_df['tss']
-                model_dic['activity_distance']     = summary_df['distance_total']
-                model_dic['hr_average']            = summary_df['hr_avg']
-                model_dic['hr_max']                = summary_df['hr_max']
-                model_dic['time_total']            = summary_df['time_total_seconds']
-                model_dic['intensity_factor']      = summary_df['intensity_factor']
-                
-                model_df   = pd.DataFrame(model_dic)
-                aerobic_te = h.predict_aerobic_training_effect(model_df)
+def submit_location_lookup(records: pd.DataFrame, row: int) -> Future:
+    # Reverse geocodes the position of one record in the background; errors are raised by result()
+    try:
+        return h.submit_location_details(api_key=API_KEY,
+                                         latitude=records['position_lat'].iloc[row]*(180 / 2**31),
+                                         longitude=records['position_long'].iloc[row]*(180 / 2**31))
+    except Exception as e:
+        future = Future()
+        future.set_exception(e)
+        return future
+
+def process_activity(root: str, file: str) -> str:
+    """
+    Parses one activity file and writes its summary_<file>.json next to it.
+
+    The file is first claimed in the dedupe index (see src/dedupe.py): a copy of an activity
+    another file already holds, in any directory, raises DuplicateActivity before decoding. The
+    claim is released when the summary cannot be written, and an original recorded as failed
+    in its directory's manifest is taken over, so copies of a failed file get their turn.
+
+    Args:
+    root (str): Directory containing the activity file.
+    file (str): Activity file name.
+
+    Returns:
+    str: Path of the written summary file.
+    """
+    full_path = f"{root}/{file}"
+    original  = DEDUPE_INDEX.claim(full_path)
+    if original is not None and failed_activity(original):
+        DEDUPE_INDEX.release(original)
+        original = DEDUPE_INDEX.claim(full_path)
+    if original is not None:
+        raise DuplicateActivity(full_path, original)
+
+    try:
+        return write_activity_summary(root, file)
+    except BaseException:
+        DEDUPE_INDEX.release(full_path)
+        raise
+
+def failed_activity(path: str) -> bool:
+    # Whether `path` is recorded as failed in the manifest of its directory
+    manifest = load_manifest(os.path.join(os.path.dirname(path), MANIFEST_FILE))
+    return os.path.basename(path) in manifest['failed']
+
+def write_activity_summary(root: str, file: str) -> str:
+    # process_activity() without the dedupe claim
+    full_path         = f"{root}/{file}"
+    summary_file_name = f"{root}/summary_{file}.json"
+    logging.info(f"Processing {full_path} --> {summary_file_name}")
+    with open(full_path, 'rb') as fitfile:
+        fitfile        = h.parse_fit_file(fitfile, projection=SUMMARY_PROJECTION)
+        fit_records_df = fitfile[0]
+        fit_events_df  = fitfile[1]
+        fit_session_df = fitfile[2]
+        
+        activity_type       = fit_session_df['sport'].iloc[-1]
+        activity_sub_type   = fit_session_df['sub_sport'].iloc[-1]
+        activity_start_time = fit_events_df['timestamp'].iloc[0] if fit_events_df['timestamp'].iloc[0] else None
+        activity_end_time   = fit_events_df['timestamp'].iloc[-1] if fit_events_df['timestamp'].iloc[0] else None
+
+        # Both ends are geocoded at once, while the summary is computed; a ride ending where it
+        # started needs a single request
+        if 'indoor_cycling' not in activity_sub_type:
+            start_location = submit_location_lookup(fit_records_df, 0)
+            end_location   = submit_location_lookup(fit_records_df, -1)
+
+        ftp_                 = profile.get_ftp(activity_start_time.to_pydatetime().astimezone(pytz.UTC).replace(tzinfo=None))
+        summary              = h.get_summary(fit_records_df, ftp = ftp_, format=EXT_FILTER)
+        activity_distance    = summary.distance_total
+        speed_average        = summary.speed_avg
+        speed_moving_average = summary.speed_moving_avg
+        speed_max            = summary.speed_max
+        
+        if 'indoor_cycling' not in activity_sub_type:
+            try:
+                activity_start_latitude  = fit_records_df['position_lat'].iloc[0]*(180 / 2**31)
+                activity_start_longitude = fit_records_df['position_long'].iloc[0]*(180 / 2**31)
+
+                rgeo_start = start_location.result()
+
+                activity_start_city     = rgeo_start['city']
+                activity_start_state    = rgeo_start['state']
+                activity_start_zip      = rgeo_start['postal_code']
+                activity_start_country  = rgeo_start['country']
                 
-                te_aerobic              = aerobic_te
-                te_anaerobic            = te[1]
-                training_stress_score   = summary_df['tss'].iloc[0]
+            except Exception as e:
+                logging.error(e)
+                activity_start_latitude  = None
+                activity_start_longitude = None
+                activity_start_city      = '-'
+                activity_start_state     = '-'
+                activity_start_zip       = '-'
+                activity_start_country   = '-'
+        
+            try:
+                activity_end_latitude  = fit_records_df['position_lat'].iloc[-1]*(180 / 2**31)
+                activity_end_longitude = fit_records_df['position_long'].iloc[-1]*(180 / 2**31)
+            
+                rgeo_end = end_location.result()
                 
-                bio_hr_resting    = BIO_HR_RESTING
-                bio_hr_max        = BIO_HR_MAX
-                bio_hr_zone_1_min = latest_hr_zones['zone.1.low_hr']
-                bio_hr_zone_1_max = latest_hr_zones['zone.1.max_hr']
-                bio_hr_zone_2_min = latest_hr_zones['zone.2.low_hr']
-                bio_hr_zone_2_max = latest_hr_zones['zone.2.max_hr']
-                bio_hr_zone_3_min = latest_hr_zones['zone.3.low_hr']
-                bio_hr_zone_3_max = latest_hr_zones['zone.3.max_hr']
-                bio_hr_zone_4_min = latest_hr_zones['zone.4.low_hr']
-                bio_hr_zone_4_max = latest_hr_zones['zone.4.max_hr']
-                bio_hr_zone_5_min = latest_hr_zones['zone.5.low_hr']
-                bio_hr_zone_5_max = latest_hr_zones['zone.5.max_hr']
+                activity_end_city     = rgeo_end['city']
+                activity_end_state    = rgeo_end['state']
+                activity_end_zip      = rgeo_end['postal_code']
+                activity_end_country  = rgeo_end['country']
                 
-                hr_time_in_zone_1 = hr_zone_time.loc[hr_zone_time['zone'] == 'zone1', 'time_in_seconds'].values[0]
-                hr_time_in_zone_2 = hr_zone_time.loc[hr_zone_time['zone'] == 'zone2', 'time_in_seconds'].values[0]
-                hr_time_in_zone_3 = hr_zone_time.loc[hr_zone_time['zone'] == 'zone3', 'time_in_seconds'].values[0]
-                hr_time_in_zone_4 = hr_zone_time.loc[hr_zone_time['zone'] == 'zone4', 'time_in_seconds'].values[0]
-                hr_time_in_zone_5 = hr_zone_time.loc[hr_zone_time['zone'] == 'zone5', 'time_in_seconds'].values[0]
+            except Exception as e:
+                logging.error(e)
+                activity_end_latitude  = None
+                activity_end_longitude = None
+                activity_end_city      = '-'
+                activity_end_state     = '-'
+                activity_end_zip       = '-'
+                activity_end_country   = '-'
 
+        elif 'indoor_cycling' in activity_sub_type:
+            activity_start_latitude  = None
+            activity_start_longitude = None
+            activity_end_latitude    = None
+            activity_end_longitude   = None
+            activity_start_city      = '-'
+            activity_start_state     = '-'
+            activity_start_zip       = '-'
+            activity_start_country   = '-'
+            activity_end_city        = '-'
+            activity_end_state       = '-'
+            activity_end_zip         = '-'
+            activity_end_country     = '-'
                 
-                latest_power_zones  = profile.get_power_zones(activity_start_time.to_pydatetime().astimezone(pytz.UTC).replace(tzinfo=None))
-                power_zone_time     = h.calculate_power_zone_time(fit_records_df, latest_power_zones)
-                
-                # Just in case not all activities contain power data
-                try:
-                    power_time_in_zone_1 = power_zone_time.loc[power_zone_time['zone'] == 'zone1', 'time_in_seconds'].values[0]
-                    power_time_in_zone_2 = power_zone_time.loc[power_zone_time['zone'] == 'zone2', 'time_in_seconds'].values[0]
-                    power_time_in_zone_3 = power_zone_time.loc[power_zone_time['zone'] == 'zone3', 'time_in_seconds'].values[0]
-                    power_time_in_zone_4 = power_zone_time.loc[power_zone_time['zone'] == 'zone4', 'time_in_seconds'].values[0]
-                    power_time_in_zone_5 = power_zone_time.loc[power_zone_time['zone'] == 'zone5', 'time_in_seconds'].values[0]
-                    power_time_in_zone_6 = power_zone_time.loc[power_zone_time['zone'] == 'zone6', 'time_in_seconds'].values[0]
-                    power_time_in_zone_7 = power_zone_time.loc[power_zone_time['zone'] == 'zone7', 'time_in_seconds'].values[0]
-                except Exception:
-                    power_time_in_zone_1 = None
-                    power_time_in_zone_2 = None
-                    power_time_in_zone_3 = None
-                    power_time_in_zone_4 = None
-                    power_time_in_zone_5 = None
-                    power_time_in_zone_6 = None
-                    power_time_in_zone_7 = None
-                    
-
-                bio_power_ftp        = ftp_
-                bio_power_zone_1_min = latest_power_zones['zone.1.low_pwr']
-                bio_power_zone_1_max = latest_power_zones['zone.1.max_pwr']
-                bio_power_zone_2_min = latest_power_zones['zone.2.low_pwr']
-                bio_power_zone_2_max = latest_power_zones['zone.2.max_pwr']
-                bio_power_zone_3_min = latest_power_zones['zone.3.low_pwr']
-                bio_power_zone_3_max = latest_power_zones['zone.3.max_pwr']
-                bio_power_zone_4_min = latest_power_zones['zone.4.low_pwr']
-                bio_power_zone_4_max = latest_power_zones['zone.4.max_pwr']
-                bio_power_zone_5_min = latest_power_zones['zone.5.low_pwr']
-                bio_power_zone_5_max = latest_power_zones['zone.5.max_pwr']
-                bio_power_zone_6_min = latest_power_zones['zone.6.low_pwr']
-                bio_power_zone_6_max = latest_power_zones['zone.6.max_pwr']
-                bio_power_zone_7_min = latest_power_zones['zone.7.low_pwr']
-                bio_power_zone_7_max = latest_power_zones['zone.7.max_pwr']
-                
+        # Localize start and end times based on the start latitude/longitude
+        activity_start_time = localize_time(activity_start_time, activity_start_latitude, activity_start_longitude)
+        activity_end_time   = localize_time(activity_end_time, activity_start_latitude, activity_start_longitude)
+
+        activity_id = hash.sha256(f"{activity_type} {activity_sub_type} {activity_start_time}".encode('utf-8')).hexdigest()
 
-            activity_data = dict()
+        time_coasting = summary.time_coasting_seconds
+        time_stopped  = summary.time_stopped_seconds
+        time_moving   = summary.time_moving_seconds
+        time_working  = summary.time_working_seconds
+        time_total    = summary.time_total_seconds
+        
+        power_average       = summary.power_avg
+        power_max           = summary.power_max
+        power_normalized    = summary.power_normalized
+        power_30s_max_avg   = summary.power_max_avg_30s
+        power_5m_max_avg    = summary.power_max_avg_5m
+        power_10m_max_avg   = summary.power_max_avg_10m
+        power_20m_max_avg   = summary.power_max_avg_20m
+        power_60m_max_avg   = summary.power_max_avg_60m
+        
+        cadence_average = summary.cadence_avg
+        cadence_max     = summary.cadence_max
+        
+        hr_average  = summary.hr_avg
+        hr_max      = summary.hr_max
+        
+        intensity_factor = summary.intensity_factor
+        
+        latest_hr_zones = profile.get_hr_zones(activity_start_time.to_pydatetime().astimezone(pytz.UTC).replace(tzinfo=None))
+        hr_zone_time    = h.calculate_hr_zone_time(fit_records_df, latest_hr_zones)
+
+        te = h.calculate_training_effect(hr_zone_time, intensity_factor)
+        
+        model_df   = h.get_aerobic_te_features(summary, hr_zone_time)
+        aerobic_te = h.predict_aerobic_training_effect(model_df)
+        
+        te_aerobic              = aerobic_te
+        te_anaerobic            = te[1]
+        training_stress_score   = summary.tss
+        
+        bio_hr_resting    = BIO_HR_RESTING
+        bio_hr_max        = BIO_HR_MAX
+        bio_hr_zone_1_min = latest_hr_zones['zone.1.low_hr']
+        bio_hr_zone_1_max = latest_hr_zones['zone.1.max_hr']
+        bio_hr_zone_2_min = latest_hr_zones['zone.2.low_hr']
+        bio_hr_zone_2_max = latest_hr_zones['zone.2.max_hr']
+        bio_hr_zone_3_min = latest_hr_zones['zone.3.low_hr']
+        bio_hr_zone_3_max = latest_hr_zones['zone.3.max_hr']
+        bio_hr_zone_4_min = latest_hr_zones['zone.4.low_hr']
+        bio_hr_zone_4_max = latest_hr_zones['zone.4.max_hr']
+        bio_hr_zone_5_min = latest_hr_zones['zone.5.low_hr']
+        bio_hr_zone_5_max = latest_hr_zones['zone.5.max_hr']
+        
+        hr_time_in_zone_1 = hr_zone_time.loc[hr_zone_time['zone'] == 'zone1', 'time_in_seconds'].values[0]
+        hr_time_in_zone_2 = hr_zone_time.loc[hr_zone_time['zone'] == 'zone2', 'time_in_seconds'].values[0]
+        hr_time_in_zone_3 = hr_zone_time.loc[hr_zone_time['zone'] == 'zone3', 'time_in_seconds'].values[0]
+        hr_time_in_zone_4 = hr_zone_time.loc[hr_zone_time['zone'] == 'zone4', 'time_in_seconds'].values[0]
+        hr_time_in_zone_5 = hr_zone_time.loc[hr_zone_time['zone'] == 'zone5', 'time_in_seconds'].values[0]
+
+        
+        latest_power_zones  = profile.get_power_zones(activity_start_time.to_pydatetime().astimezone(pytz.UTC).replace(tzinfo=None))
+        power_zone_time     = h.calculate_power_zone_time(fit_records_df, latest_power_zones)
+        
+        # Just in case not all activities contain power data
+        try:
+            power_time_in_zone_1 = power_zone_time.loc[power_zone_time['zone'] == 'zone1', 'time_in_seconds'].values[0]
+            power_time_in_zone_2 = power_zone_time.loc[power_zone_time['zone'] == 'zone2', 'time_in_seconds'].values[0]
+            power_time_in_zone_3 = power_zone_time.loc[power_zone_time['zone'] == 'zone3', 'time_in_seconds'].values[0]
+            power_time_in_zone_4 = power_zone_time.loc[power_zone_time['zone'] == 'zone4', 'time_in_seconds'].values[0]
+            power_time_in_zone_5 = power_zone_time.loc[power_zone_time['zone'] == 'zone5', 'time_in_seconds'].values[0]
+            power_time_in_zone_6 = power_zone_time.loc[power_zone_time['zone'] == 'zone6', 'time_in_seconds'].values[0]
+            power_time_in_zone_7 = power_zone_time.loc[power_zone_time['zone'] == 'zone7', 'time_in_seconds'].values[0]
+        except Exception:
+            power_time_in_zone_1 = None
+            power_time_in_zone_2 = None
+            power_time_in_zone_3 = None
+            power_time_in_zone_4 = None
+            power_time_in_zone_5 = None
+            power_time_in_zone_6 = None
+            power_time_in_zone_7 = None
             
-            if activity_sub_type == 'indoor_cycling' and activity_start_city != '-':
-                logging.error(f"There seems to be a problem with {file}")
-                
-            with open(f"{ROOT}/summary_{file}.json", 'w') as json_file:
-                activity_data[activity_id] = {
-                    'activity_type':            activity_type,
-                    'activity_sub_type':        activity_sub_type,
-                    'activity_start_time':      convert_timestamp_to_serializable(activity_start_time),
-                    'activity_end_time':        convert_timestamp_to_serializable(activity_end_time),
-                    'activity_start_latitude':  activity_start_latitude,
-                    'activity_start_longitude': activity_start_longitude,
-                    'activity_start_city':      activity_start_city,
-                    'activity_start_state':     activity_start_state,
-                    'activity_start_zip':       str(activity_start_zip),
-                    'activity_start_country':   activity_start_country,
-                    'activity_end_latitude':    activity_end_latitude,
-                    'activity_end_longitude':   activity_end_longitude,
-                    'activity_end_city':        activity_end_city,
-                    'activity_end_state':       activity_end_state,
-                    'activity_end_zip':         str(activity_end_zip),
-                    'activity_end_country':     activity_end_country,
-                    'activity_distance':        round(float(activity_distance), 2),
-                    'time_coasting':            int(time_coasting) if time_coasting else 0,
-                    'time_stopped':             int(time_stopped) if time_stopped else 0,
-                    'time_moving':              int(time_moving) if time_moving else 0,
-                    'time_working':             int(time_working) if time_working else 0,
-                    'time_total':               int(time_total) if time_total else 0,
-                    'speed_average':            round(float(speed_average), 2),
-                    'speed_moving_average':     round(float(speed_moving_average), 2),
-                    'speed_max':                round(float(speed_max), 2),
-                    'power_average':            round(float(power_average),2),
-                    'power_max':                round(float(power_max),2),
-                    'power_normalized':         round(float(power_normalized), 2),
-                    'power_30s_max_avg':        round(float(power_30s_max_avg), 2),
-                    'power_5m_max_avg':         round(float(power_5m_max_avg), 2),
-                    'power_10m_max_avg':        round(float(power_10m_max_avg), 2),
-                    'power_20m_max_avg':        round(float(power_20m_max_avg), 2),
-                    'power_60m_max_avg':        round(float(power_60m_max_avg), 2),
-                    'power_time_in_zone_1':     int(power_time_in_zone_1) if power_time_in_zone_1 else 0,
-                    'power_time_in_zone_2':     int(power_time_in_zone_2) if power_time_in_zone_2 else 0,
-                    'power_time_in_zone_3':     int(power_time_in_zone_3) if power_time_in_zone_3 else 0,
-                    'power_time_in_zone_4':     int(power_time_in_zone_4) if power_time_in_zone_4 else 0,
-                    'power_time_in_zone_5':     int(power_time_in_zone_5) if power_time_in_zone_5 else 0,
-                    'power_time_in_zone_6':     int(power_time_in_zone_6) if power_time_in_zone_6 else 0,
-                    'power_time_in_zone_7':     int(power_time_in_zone_7) if power_time_in_zone_7 else 0,
-                    'cadence_max':              int(cadence_max),
-                    'cadence_average':          int(cadence_average),
-                    'hr_max':                   int(hr_max),
-                    'hr_average':               int(hr_average),
-                    'hr_time_in_zone_1':        int(hr_time_in_zone_1),
-                    'hr_time_in_zone_2':        int(hr_time_in_zone_2),
-                    'hr_time_in_zone_3':        int(hr_time_in_zone_3),
-                    'hr_time_in_zone_4':        int(hr_time_in_zone_4),
-                    'hr_time_in_zone_5':        int(hr_time_in_zone_5),
-                    'te_aerobic':               round(float(te_aerobic), 2),
-                    'te_anaerobic':             round(float(te_anaerobic), 2),
-                    'intensity_factor':         round(float(intensity_factor), 4),
-                    'training_stress_score':    int(training_stress_score),
-                    'bio_hr_resting':           bio_hr_resting,
-                    'bio_hr_max':               bio_hr_max,
-                    'bio_hr_zone_1_min':        int(bio_hr_zone_1_min),
-                    'bio_hr_zone_1_max':        int(bio_hr_zone_1_max),
-                    'bio_hr_zone_2_min':        int(bio_hr_zone_2_min),
-                    'bio_hr_zone_2_max':        int(bio_hr_zone_2_max),
-                    'bio_hr_zone_3_min':        int(bio_hr_zone_3_min),
-                    'bio_hr_zone_3_max':        int(bio_hr_zone_3_max),
-                    'bio_hr_zone_4_min':        int(bio_hr_zone_4_min),
-                    'bio_hr_zone_4_max':        int(bio_hr_zone_4_max),
-                    'bio_hr_zone_5_min':        int(bio_hr_zone_5_min),
-                    'bio_hr_zone_5_max':        int(bio_hr_zone_5_max),
-                    'bio_power_ftp':            bio_power_ftp,
-                    'bio_power_zone_1_min':     0,
-                    'bio_power_zone_1_max':     int(bio_power_zone_1_max),
-                    'bio_power_zone_2_min':     int(bio_power_zone_2_min),
-                    'bio_power_zone_2_max':     int(bio_power_zone_2_max),
-                    'bio_power_zone_3_min':     int(bio_power_zone_3_min),
-                    'bio_power_zone_3_max':     int(bio_power_zone_3_max),
-                    'bio_power_zone_4_min':     int(bio_power_zone_4_min),
-                    'bio_power_zone_4_max':     int(bio_power_zone_4_max),
-                    'bio_power_zone_5_min':     int(bio_power_zone_5_min),
-                    'bio_power_zone_5_max':     int(bio_power_zone_5_max),
-                    'bio_power_zone_6_min':     int(bio_power_zone_6_min),
-                    'bio_power_zone_6_max':     int(bio_power_zone_6_max),
-                    'bio_power_zone_7_min':     int(bio_power_zone_7_min),
-                    'bio_power_zone_7_max':     int(bio_power_zone_7_max),
-                }
-                
-                json.dump(activity_data, json_file, indent=4)
-                
-combine_json_to_csv(ROOT, f"{ROOT}/activities.csv")
\ No newline at end of file
+
+        bio_power_ftp        = ftp_
+        bio_power_zone_1_min = latest_power_zones['zone.1.low_pwr']
+        bio_power_zone_1_max = latest_power_zones['zone.1.max_pwr']
+        bio_power_zone_2_min = latest_power_zones['zone.2.low_pwr']
+        bio_power_zone_2_max = latest_power_zones['zone.2.max_pwr']
+        bio_power_zone_3_min = latest_power_zones['zone.3.low_pwr']
+        bio_power_zone_3_max = latest_power_zones['zone.3.max_pwr']
+        bio_power_zone_4_min = latest_power_zones['zone.4.low_pwr']
+        bio_power_zone_4_max = latest_power_zones['zone.4.max_pwr']
+        bio_power_zone_5_min = latest_power_zones['zone.5.low_pwr']
+        bio_power_zone_5_max = latest_power_zones['zone.5.max_pwr']
+        bio_power_zone_6_min = latest_power_zones['zone.6.low_pwr']
+        bio_power_zone_6_max = latest_power_zones['zone.6.max_pwr']
+        bio_power_zone_7_min = latest_power_zones['zone.7.low_pwr']
+        bio_power_zone_7_max = latest_power_zones['zone.7.max_pwr']
+        
+
+    activity_data = dict()
+    
+    if activity_sub_type == 'indoor_cycling' and activity_start_city != '-':
+        logging.error(f"There seems to be a problem with {file}")
+        
+    activity_data[activity_id] = {
+        'activity_type':            activity_type,
+        'activity_sub_type':        activity_sub_type,
+        'activity_start_time':      convert_timestamp_to_serializable(activity_start_time),
+        'activity_end_time':        convert_timestamp_to_serializable(activity_end_time),
+        'activity_start_latitude':  activity_start_latitude,
+        'activity_start_longitude': activity_start_longitude,
+        'activity_start_city':      activity_start_city,
+        'activity_start_state':     activity_start_state,
+        'activity_start_zip':       str(activity_start_zip),
+        'activity_start_country':   activity_start_country,
+        'activity_end_latitude':    activity_end_latitude,
+        'activity_end_longitude':   activity_end_longitude,
+        'activity_end_city':        activity_end_city,
+        'activity_end_state':       activity_end_state,
+        'activity_end_zip':         str(activity_end_zip),
+        'activity_end_country':     activity_end_country,
+        'activity_distance':        round(float(activity_distance), 2),
+        'time_coasting':            int(time_coasting) if time_coasting else 0,
+        'time_stopped':             int(time_stopped) if time_stopped else 0,
+        'time_moving':              int(time_moving) if time_moving else 0,
+        'time_working':             int(time_working) if time_working else 0,
+        'time_total':               int(time_total) if time_total else 0,
+        'speed_average':            round(float(speed_average), 2),
+        'speed_moving_average':     round(float(speed_moving_average), 2),
+        'speed_max':                round(float(speed_max), 2),
+        'power_average':            round(float(power_average),2),
+        'power_max':                round(float(power_max),2),
+        'power_normalized':         round(float(power_normalized), 2),
+        'power_30s_max_avg':        round(float(power_30s_max_avg), 2),
+        'power_5m_max_avg':         round(float(power_5m_max_avg), 2),
+        'power_10m_max_avg':        round(float(power_10m_max_avg), 2),
+        'power_20m_max_avg':        round(float(power_20m_max_avg), 2),
+        'power_60m_max_avg':        round(float(power_60m_max_avg), 2),
+        'power_time_in_zone_1':     int(power_time_in_zone_1) if power_time_in_zone_1 else 0,
+        'power_time_in_zone_2':     int(power_time_in_zone_2) if power_time_in_zone_2 else 0,
+        'power_time_in_zone_3':     int(power_time_in_zone_3) if power_time_in_zone_3 else 0,
+        'power_time_in_zone_4':     int(power_time_in_zone_4) if power_time_in_zone_4 else 0,
+        'power_time_in_zone_5':     int(power_time_in_zone_5) if power_time_in_zone_5 else 0,
+        'power_time_in_zone_6':     int(power_time_in_zone_6) if power_time_in_zone_6 else 0,
+        'power_time_in_zone_7':     int(power_time_in_zone_7) if power_time_in_zone_7 else 0,
+        'cadence_max':              int(cadence_max),
+        'cadence_average':          int(cadence_average),
+        'hr_max':                   int(hr_max),
+        'hr_average':               int(hr_average),
+        'hr_time_in_zone_1':        int(hr_time_in_zone_1),
+        'hr_time_in_zone_2':        int(hr_time_in_zone_2),
+        'hr_time_in_zone_3':        int(hr_time_in_zone_3),
+        'hr_time_in_zone_4':        int(hr_time_in_zone_4),
+        'hr_time_in_zone_5':        int(hr_time_in_zone_5),
+        'te_aerobic':               round(float(te_aerobic), 2),
+        'te_anaerobic':             round(float(te_anaerobic), 2),
+        'intensity_factor':         round(float(intensity_factor), 4),
+        'training_stress_score':    int(training_stress_score),
+        'bio_hr_resting':           bio_hr_resting,
+        'bio_hr_max':               bio_hr_max,
+        'bio_hr_zone_1_min':        int(bio_hr_zone_1_min),
+        'bio_hr_zone_1_max':        int(bio_hr_zone_1_max),
+        'bio_hr_zone_2_min':        int(bio_hr_zone_2_min),
+        'bio_hr_zone_2_max':        int(bio_hr_zone_2_max),
+        'bio_hr_zone_3_min':        int(bio_hr_zone_3_min),
+        'bio_hr_zone_3_max':        int(bio_hr_zone_3_max),
+        'bio_hr_zone_4_min':        int(bio_hr_zone_4_min),
+        'bio_hr_zone_4_max':        int(bio_hr_zone_4_max),
+        'bio_hr_zone_5_min':        int(bio_hr_zone_5_min),
+        'bio_hr_zone_5_max':        int(bio_hr_zone_5_max),
+        'bio_power_ftp':            bio_power_ftp,
+        'bio_power_zone_1_min':     0,
+        'bio_power_zone_1_max':     int(bio_power_zone_1_max),
+        'bio_power_zone_2_min':     int(bio_power_zone_2_min),
+        'bio_power_zone_2_max':     int(bio_power_zone_2_max),
+        'bio_power_zone_3_min':     int(bio_power_zone_3_min),
+        'bio_power_zone_3_max':     int(bio_power_zone_3_max),
+        'bio_power_zone_4_min':     int(bio_power_zone_4_min),
+        'bio_power_zone_4_max':     int(bio_power_zone_4_max),
+        'bio_power_zone_5_min':     int(bio_power_zone_5_min),
+        'bio_power_zone_5_max':     int(bio_power_zone_5_max),
+        'bio_power_zone_6_min':     int(bio_power_zone_6_min),
+        'bio_power_zone_6_max':     int(bio_power_zone_6_max),
+        'bio_power_zone_7_min':     int(bio_power_zone_7_min),
+        'bio_power_zone_7_max':     int(bio_power_zone_7_max),
+    }
+
+    # Written next to the summary and moved into place, so an interrupted run never leaves a
+    # truncated summary that check_activity() would count as done
+    temp_file_name = summary_file_name + '.tmp'
+    with open(temp_file_name, 'w') as json_file:
+        json.dump(activity_data, json_file, indent=4)
+    os.replace(temp_file_name, summary_file_name)
+
+    return summary_file_name
+
+def load_manifest(manifest_file: str) -> dict:
+    # The manifest is an append-only journal (one JSON object per line); the last entry for a file wins
+    manifest = {'completed': dict(), 'failed': dict(), 'duplicate': dict()}
+    if os.path.isfile(manifest_file):
+        with open(manifest_file, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Most likely a line cut short by an interrupted run
+                    continue
+                apply_manifest_entry(manifest, entry)
+    return manifest
+
+def apply_manifest_entry(manifest: dict, entry: dict):
+    for status in manifest.values():
+        status.pop(entry['file'], None)
+    manifest[entry['status']][entry['file']] = entry.get('summary') or entry.get('error') or entry.get('original')
+
+def append_manifest(manifest_file: str, entry: dict):
+    with open(manifest_file, 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+
+def pending_activities(root: str, ext_filter: str, manifest: dict, retry_failed: bool = False) -> list:
+    pending = []
+    for file in sorted(os.listdir(root)):
+        if not file.endswith(ext_filter):
+            continue
+
+        summary_file_name = f"{root}/summary_{file}.json"
+        logging.debug(f"Check to see if {summary_file_name} needs to be processed")
+        if file in manifest['completed'] or check_activity(summary_file_name):
+            continue
+        if file in manifest['failed'] and not retry_failed:
+            logging.debug(f"Skipping {file}, it failed on a previous run (use --retry-failed)")
+            continue
+        original = manifest['duplicate'].get(file)
+        if original is not None and os.path.isfile(original) and DEDUPE_INDEX.claimed(original) and not failed_activity(original):
+            # Checked again once the original is gone, failed or released its claim
+            continue
+
+        pending.append(file)
+    return pending
+
+def record_activity(manifest_file: str, manifest: dict, index, file: str, summary_file_name: str = None, error=None):
+    if error is None:
+        entry = {'file': file, 'status': 'completed', 'summary': os.path.basename(summary_file_name)}
+        # Workers only write JSON files, the index has a single writer
+        index.add_summary_file(summary_file_name, file)
+    elif isinstance(error, DuplicateActivity):
+        logging.info(f"Skipped {file}, {error}")
+        entry = {'file': file, 'status': 'duplicate', 'original': error.original}
+    else:
+        logging.error(f"Failed to process {file}: {error}")
+        entry = {'file': file, 'status': 'failed', 'error': str(error)}
+    append_manifest(manifest_file, entry)
+    apply_manifest_entry(manifest, entry)
+
+def claim_processed(root: str, ext_filter: str, manifest: dict):
+    # Files summarized before duplicates were tracked own their activities, so copies of them are recognized
+    for file in sorted(os.listdir(root)):
+        path = os.path.abspath(os.path.join(root, file))
+        if file.endswith(ext_filter) and not DEDUPE_INDEX.claimed(path):
+            if file in manifest['completed'] or check_activity(f"{root}/summary_{file}.json"):
+                DEDUPE_INDEX.claim(path)
+
+def update_training_load(index):
+    # Only the days from the earliest new (or back-filled) activity onward are recomputed
+    days = TrainingLoad(index.path).refresh()
+    logging.info(f"Training load updated, {days} day(s) recomputed")
+
+def profiled_activity(root: str, file: str) -> tuple:
+    # Worker side of a profiled batch: the function stats travel back with the result
+    PROFILER.enable()
+    summary_file_name = process_activity(root, file)
+    return summary_file_name, PROFILER.drain()
+
+def geocode_limiter(rate: float, workers: int) -> TokenBucket:
+    # One quota for the whole run: worker processes share the bucket through the pool initializer
+    limiter = TokenBucket(rate, OPENCAGE_BURST, shared=workers > 1)
+    h.set_geocode_limiter(limiter)
+    return limiter
+
+def run_batch(root: str = ROOT, ext_filter: str = EXT_FILTER, workers: int = 1, retry_failed: bool = False,
+              geocode_rate: float = OPENCAGE_RATE):
+    """
+    Processes every activity in root that does not have a summary yet, spread over a process pool.
+
+    Progress is recorded in a manifest inside root after every file, so an interrupted run resumes
+    where it stopped. Files that raise are recorded under 'failed' with their error and skipped on
+    the next runs, unless retry_failed is set. Copies of an activity already held by another file
+    (in root or any other directory) are recorded under 'duplicate' without being decoded, and
+    skipped for as long as that file exists and was not recorded as failed. Each new summary is also appended to the summary
+    index of root (see src/summary_index.py), and the training load (CTL/ATL/TSB) is brought up to
+    date from the earliest new activity onward. While PROFILER is enabled, the workers' function
+    stats are merged into it. OpenCage requests of all workers together stay under geocode_rate
+    per second.
+    """
+    manifest_file = os.path.join(root, MANIFEST_FILE)
+    manifest      = load_manifest(manifest_file)
+    index         = open_index(root)
+    claim_processed(root, ext_filter, manifest)
+    pending       = pending_activities(root, ext_filter, manifest, retry_failed)
+    total         = len(pending)
+
+    logging.info(f"{total} activities to process with {workers} worker(s)")
+    if not pending:
+        update_training_load(index)
+        return manifest
+
+    done = 0
+    def record(file, summary_file_name=None, error=None):
+        nonlocal done
+        record_activity(manifest_file, manifest, index, file, summary_file_name, error)
+
+        done += 1
+        rate  = done / (perf_counter() - ts)
+        logging.info(f"[{done}/{total}] {file} ({rate:.2f} files/sec)")
+
+    limiter = geocode_limiter(geocode_rate, workers)
+    ts      = perf_counter()
+    if workers <= 1:
+        for file in pending:
+            try:
+                record(file, process_activity(root, file))
+            except Exception as e:
+                record(file, error=e)
+    else:
+        task = profiled_activity if PROFILER.enabled else process_activity
+        with ProcessPoolExecutor(max_workers=workers, initializer=h.set_geocode_limiter, initargs=(limiter,)) as executor:
+            futures = {executor.submit(task, root, file): file for file in pending}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                    if PROFILER.enabled:
+                        result, stats = result
+                        PROFILER.merge(stats)
+                    record(futures[future], result)
+                except Exception as e:
+                    record(futures[future], error=e)
+
+    elapsed    = perf_counter() - ts
+    failed     = len([f for f in pending if f in manifest['failed']])
+    duplicates = len([f for f in pending if f in manifest['duplicate']])
+    logging.info(f"Processed {total - failed - duplicates} activities, {duplicates} duplicates skipped, {failed} failed, "
+                 f"in {elapsed:.1f}s ({total / elapsed:.2f} files/sec)")
+    if failed:
+        logging.info(f"Failed files are listed under 'failed' in {manifest_file}")
+
+    update_training_load(index)
+    return manifest
+
+def process_path(path: str) -> str:
+    # Worker side of watch()
+    return process_activity(os.path.dirname(path), os.path.basename(path))
+
+def watch(roots: list, ext_filter: str = EXT_FILTER, workers: int = 1, retry_failed: bool = False, queue_size: int = 64,
+          settle_seconds: float = 2.0, polling: bool = False, poll_seconds: float = 1.0, status_file: str = STATUS_FILE,
+          geocode_rate: float = OPENCAGE_RATE):
+    """
+    Keeps the summaries of the activity directories up to date until interrupted: new and changed
+    files are summarized within seconds of being written, without listing the directories again
+    (see src/ingest.py). Activities without a summary are caught up with at startup, and results
+    go to the same manifest and summary index as run_batch(). The training load is refreshed
+    whenever the work queue drains, and OpenCage requests of all workers together stay under
+    geocode_rate per second.
+    """
+    roots  = [os.path.abspath(root) for root in roots]
+    stores = {}
+    for root in roots:
+        manifest_file = os.path.join(root, MANIFEST_FILE)
+        stores[root]  = (manifest_file, load_manifest(manifest_file), open_index(root))
+    changed = set()
+
+    def record(path, summary_file_name, error):
+        root = os.path.dirname(path)
+        record_activity(*stores[root], os.path.basename(path), summary_file_name, error)
+        changed.add(root)
+
+    def refresh():
+        for root in sorted(changed):
+            update_training_load(stores[root][2])
+        changed.clear()
+
+    service = IngestService(roots, process_path, extensions=(ext_filter,), workers=workers, queue_size=queue_size,
+                            settle_seconds=settle_seconds, on_result=record, on_idle=refresh,
+                            watcher=open_watcher(roots, (ext_filter,), polling, poll_seconds), status_file=status_file,
+                            initializer=h.set_geocode_limiter, initargs=(geocode_limiter(geocode_rate, workers),),
+                            skip_errors=(DuplicateActivity,))
+    for root, (_, manifest, _) in stores.items():
+        claim_processed(root, ext_filter, manifest)
+        pending = pending_activities(root, ext_filter, manifest, retry_failed)
+        logging.info(f"{len(pending)} activities to catch up with in {root}")
+        service.add([os.path.join(root, file) for file in pending], settled=True)
+    service.run()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Summarize activity files into summary_<file>.json")
+    parser.add_argument('--root', default=ROOT, help="directory containing the activity files")
+    parser.add_argument('--ext', default=EXT_FILTER, help="activity file extension to process")
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument('--retry-failed', action='store_true', help="retry files that failed on a previous run")
+    parser.add_argument('--watch', nargs='*', metavar='DIR',
+                        help="keep running and summarize new or changed files of these directories (default: --root) as they are written")
+    parser.add_argument('--queue-size', type=int, default=64, help="with --watch, bound of the work queue")
+    parser.add_argument('--settle', type=float, default=2.0, help="with --watch, seconds a file must stay unchanged before it is processed")
+    parser.add_argument('--poll', action='store_true', help="with --watch, poll the directories instead of using inotify (e.g. network shares)")
+    parser.add_argument('--poll-interval', type=float, default=1.0, help="with --watch --poll, seconds between polls")
+    parser.add_argument('--geocode-rate', type=float, default=OPENCAGE_RATE,
+                        help=f"OpenCage requests per second, all workers together (default: {OPENCAGE_RATE}, the free tier quota)")
+    parser.add_argument('--profile', action='store_true',
+                        help="record function stats and a cProfile capture (of this process only, use --workers 1 for the full picture) under ./userdata/profiles")
+    args = parser.parse_args()
+
+    if args.watch is not None:
+        watch(args.watch or [args.root], args.ext, args.workers, args.retry_failed, args.queue_size,
+              args.settle, args.poll, args.poll_interval, geocode_rate=args.geocode_rate)
+    else:
+        if args.profile:
+            PROFILER.enable()
+        with capture('batch') if args.profile else nullcontext():
+            run_batch(args.root, args.ext, args.workers, args.retry_failed, args.geocode_rate)
+        if args.profile:
+            logging.info(f"Function stats saved to {PROFILER.export_json(capture_path('batch', extension='json'))}")
+        combine_json_to_csv(args.root, f"{args.root}/activities.csv")
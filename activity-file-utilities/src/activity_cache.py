@@ -0,0 +1,179 @@
+from collections import OrderedDict
+from concurrent.futures import wait
+from src.parse_cache import file_digest
+import logging
+import pandas as pd
+import src.utils as h
+import sys
+import threading
+
+
+class ActivityCache:
+    """
+    In-memory LRU cache of analyzed activities (parsed frames, summary, zone times, location,
+    training effect), shared by every page and session of the Streamlit process.
+
+    Entries are keyed by the file content hash, the file kind and the profile version, so the
+    same ride opened from the browser or the uploader is analyzed once, and editing the profile
+    invalidates it. The least recently used entries are dropped once the estimated size of the
+    cached values exceeds `max_bytes`.
+
+    Args:
+    max_bytes (int): Memory bound of the cached values.
+    """
+    def __init__(self, max_bytes: int = 512 * 1024**2):
+        self.max_bytes = max_bytes
+        self._entries  = OrderedDict()
+        self._size     = 0
+        self._lock     = threading.Lock()
+        self._pending  = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                logging.info(f"Not caching an activity of {size / 1024**2:.1f} MB, above the cache bound")
+                return
+
+            self._entries[key] = (value, size)
+            self._size        += size
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size     -= evicted
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        # Concurrent reruns of the same activity wait for the first one instead of analyzing it again
+        with self._lock:
+            pending = self._pending.setdefault(key, threading.Lock())
+        with pending:
+            value = self.get(key)
+            if value is None:
+                value = compute()
+                self.put(key, value)
+        with self._lock:
+            self._pending.pop(key, None)
+        return value
+
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+def estimate_size(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+ACTIVITY_CACHE = ActivityCache()
+
+def analyze_activity(file, kind: str, profile) -> dict:
+    """
+    Runs the analysis the FIT/GPX pages display: parsing, summary, zone times and training effect
+    (the last two for FIT files only). The starting location is not part of it, see
+    starting_location().
+
+    Args:
+    file: Path, bytes or file-like object of the activity file.
+    kind (str): 'fit' or 'gpx'.
+    profile (UserProfile): Profile providing FTP, zones and the geocoding API key.
+
+    Returns:
+    dict: 'activity' and 'summary', plus for FIT files 'events', 'sessions', 'event_time', 'sport',
+    'start_position' (None without positions), 'hr_zone_time', 'power_zone_time', 'activity_te'
+    and 'aerobic_te'.
+    """
+    if kind == 'gpx':
+        activity = h.gpx_to_dataframe(file)
+        return {'activity': activity, 'summary': h.get_summary(activity, profile.get_ftp(), format="gpx")}
+
+    activity, events, sessions = h.parse_fit_file(file)
+    summary                    = h.get_summary(activity, profile.get_ftp(), format="fit")
+
+    # The starting location is looked up in the background while the training effect is computed,
+    # which fills GEOCODE_CACHE for starting_location()
+    position = start_position(activity)
+    location = h.submit_location_details(profile.get_api_key(), *position) if position is not None else None
+
+    hr_zone_time = h.calculate_hr_zone_time(activity, profile.get_hr_zones())
+    activity_te  = h.calculate_training_effect(hr_zone_time, float(summary.intensity_factor))
+    aerobic_te   = h.predict_aerobic_training_effect(h.get_aerobic_te_features(summary, hr_zone_time))
+
+    if location is not None:
+        # Errors are left to starting_location(), which tries again
+        wait([location])
+
+    return {
+        'activity':          activity,
+        'events':            events,
+        'sessions':          sessions,
+        'event_time':        events['timestamp'].iloc[0] if events['timestamp'].iloc[0] else None,
+        'sport':             sessions['sport'].iloc[-1],
+        'summary':           summary,
+        'start_position':    position,
+        'hr_zone_time':      hr_zone_time,
+        'power_zone_time':   h.calculate_power_zone_time(activity, profile.get_power_zones()),
+        'activity_te':       activity_te,
+        'aerobic_te':        aerobic_te,
+    }
+
+def get_activity_analysis(file, kind: str, profile, cache: ActivityCache = None) -> dict:
+    """
+    Returns analyze_activity() for a file (path, bytes or upload), from the cache when this
+    content was already analyzed with the current profile, plus the 'starting_location' of FIT
+    files. Callers must not modify the result.
+    """
+    cache    = cache if cache is not None else ACTIVITY_CACHE
+    key      = (file_digest(file), kind, profile.get_version())
+    analysis = cache.get_or_compute(key, lambda: analyze_activity(file, kind, profile))
+    if kind == 'gpx':
+        return analysis
+    return {**analysis, 'starting_location': starting_location(analysis['start_position'], profile)}
+
+def start_position(activity: pd.DataFrame) -> tuple:
+    """(latitude, longitude) of the first record, None without positions (e.g. indoor rides)."""
+    if 'position_lat' not in activity or 'position_long' not in activity or activity.empty:
+        return None
+    latitude, longitude = activity['position_lat'].iloc[0], activity['position_long'].iloc[0]
+    if pd.isna(latitude) or pd.isna(longitude):
+        return None
+    return float(latitude)*(180 / 2**31), float(longitude)*(180 / 2**31)
+
+def starting_location(position: tuple, profile) -> dict:
+    """
+    Location details of a (latitude, longitude) position, {} when they cannot be had or the
+    position is None. Resolved on every render through the persistent GEOCODE_CACHE rather than
+    cached with the analysis, so a failed lookup is tried again on the next rerun.
+    """
+    if position is None:
+        return {}
+    try:
+        return h.get_location_details(profile.get_api_key(), *position) or {}
+    except Exception as e:
+        logging.error(f"Could not look up the starting location: {e}")
+        return {}
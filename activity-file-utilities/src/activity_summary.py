@@ -0,0 +1,61 @@
+from dataclasses import dataclass, fields
+import pandas as pd
+
+
+@dataclass(slots=True)
+class ActivitySummary:
+    """
+    Summary metrics of one activity, as computed by get_summary().
+
+    A plain slotted record: reading a metric is an attribute lookup instead of indexing a
+    one-row DataFrame. Use to_frame() where a DataFrame is still needed, and summaries_frame()
+    to turn many summaries into one table.
+    """
+    hr_avg:                int   = None
+    hr_max:                int   = None
+    power_avg:             int   = 0
+    power_max:             int   = 0
+    power_max_avg_30s:     int   = 0
+    power_max_avg_5m:      int   = 0
+    power_max_avg_10m:     int   = 0
+    power_max_avg_20m:     int   = 0
+    power_max_avg_60m:     int   = 0
+    power_normalized:      int   = 0
+    intensity_factor:      float = 0
+    tss:                   float = 0
+    cadence_avg:           int   = 0
+    cadence_max:           int   = 0
+    speed_avg:             int   = 0
+    speed_moving_avg:      int   = 0
+    speed_max:             int   = 0
+    temp_avg:              int   = 0
+    temp_max:              int   = 0
+    distance_total:        int   = 0
+    time_coasting_string:  str   = '0m'
+    time_stopped_string:   str   = '0m'
+    time_moving_string:    str   = '0m'
+    time_working_string:   str   = '0m'
+    time_total_string:     str   = '0m'
+    time_coasting_seconds: float = 0
+    time_stopped_seconds:  float = 0
+    time_moving_seconds:   float = 0
+    time_working_seconds:  float = 0
+    time_total_seconds:    float = 0
+
+    def to_frame(self) -> pd.DataFrame:
+        """The one-row DataFrame get_summary() used to return, one column per metric."""
+        return summaries_frame([self])
+
+FIELDS = tuple(field.name for field in fields(ActivitySummary))
+
+def summaries_frame(summaries: list) -> pd.DataFrame:
+    """
+    Builds one table out of many summaries, a column per metric and a row per summary.
+
+    Args:
+    summaries (list): ActivitySummary records.
+
+    Returns:
+    pd.DataFrame: Columns in ActivitySummary field order.
+    """
+    return pd.DataFrame({name: [getattr(summary, name) for summary in summaries] for name in FIELDS})
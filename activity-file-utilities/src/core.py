@@ -1,95 +1,245 @@
 import src.utils as h
 from datetime import datetime
+import numpy as np
+import os
 import pandas as pd
+import threading
+
+class ProfileHistory:
+    """
+    One profile file (basic profile, HR zones or power zones) and an as-of index over it.
+
+    The rows are kept in file order, next to their timestamps sorted once, so "the row in effect
+    at date X" is a binary search. The file is only read again when its mtime or size changes.
+    Histories are shared by every UserProfile in the process, see get_history().
+    """
+    def __init__(self, path: str):
+        self.path       = path
+        self.frame      = pd.DataFrame()
+        self.times      = np.array([], dtype='datetime64[ns]')
+        self.positions  = np.array([], dtype=np.int64)
+        self.version    = 0
+        self._signature = None
+        self._lock      = threading.Lock()
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reloads the file if it changed on disk (or when forced), and returns whether it did."""
+        try:
+            stat      = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+
+        if not force and signature == self._signature and self._signature is not None:
+            return False
+
+        with self._lock:
+            frame = h.load_data(self.path).reset_index(drop=True)
+            if 'timestamp' in frame.columns:
+                times = pd.to_datetime(frame['timestamp'], errors='coerce', format='ISO8601').to_numpy(dtype='datetime64[ns]')
+            else:
+                times = np.full(len(frame), np.datetime64('NaT'), dtype='datetime64[ns]')
+
+            # Rows without a valid timestamp never match an as-of lookup
+            valid     = ~np.isnat(times)
+            positions = np.flatnonzero(valid)
+            order     = np.argsort(times[valid], kind='stable')
+
+            self.frame      = frame
+            self.times      = times[valid][order]
+            self.positions  = positions[order]
+            self.version   += 1
+            self._signature = signature
+        return True
+
+    @property
+    def signature(self) -> tuple:
+        return self._signature
+
+    def latest(self) -> pd.Series:
+        # Last row in file order, as the profile pages append to the end
+        return self.frame.iloc[-1]
+
+    def as_of(self, date) -> pd.Series:
+        """Returns the most recent row dated at or before `date`, or None."""
+        date = pd.Timestamp(date)
+        if date.tzinfo is not None:
+            date = date.tz_convert('UTC').tz_localize(None)
+        if pd.isna(date) or len(self.times) == 0:
+            return None
+
+        index = np.searchsorted(self.times, date.to_datetime64(), side='right') - 1
+        return self.frame.iloc[self.positions[index]] if index >= 0 else None
+
+    def as_of_positions(self, dates) -> np.ndarray:
+        """Returns, for each date, the position in the file of the row in effect at that date (-1 if none)."""
+        dates = pd.to_datetime(pd.Series(dates))
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert('UTC').dt.tz_localize(None)
+        dates = dates.to_numpy(dtype='datetime64[ns]')
+
+        if len(self.times) == 0:
+            return np.full(len(dates), -1, dtype=np.int64)
+
+        index     = np.searchsorted(self.times, dates, side='right') - 1
+        positions = np.where(index >= 0, self.positions[np.maximum(index, 0)], -1)
+        return np.where(np.isnat(dates), -1, positions)
+
+    def as_of_frame(self, dates) -> pd.DataFrame:
+        """Returns one row per date, the row in effect at that date, or all-NaN where there is none."""
+        positions = self.as_of_positions(dates)
+        return self.frame.reindex(np.where(positions >= 0, positions, -1)).reset_index(drop=True)
+
+HISTORIES      = {}
+HISTORIES_LOCK = threading.Lock()
+
+def get_history(path: str) -> ProfileHistory:
+    key = os.path.abspath(path)
+    with HISTORIES_LOCK:
+        if key not in HISTORIES:
+            HISTORIES[key] = ProfileHistory(path)
+        return HISTORIES[key]
+
+def int_or_zero(value) -> int:
+    return int(value) if pd.notna(value) else 0
 
 class UserProfile:
     HR_FILE      = './userdata/hr_profile.json'
     POWER_FILE   = './userdata/power_profile.json'
     PROFILE_FILE = './userdata/basic_profile.json'
-    
+
     def __init__(self, profile_file=PROFILE_FILE, hr_file=HR_FILE, power_file=POWER_FILE):
         # Initialize file paths
         self.profile_file = profile_file
         self.hr_file      = hr_file
         self.power_file   = power_file
-        
+
+        # Parsed files are shared across instances, and only read again when they change
+        self.profile_history = get_history(self.profile_file)
+        self.hr_history      = get_history(self.hr_file)
+        self.power_history   = get_history(self.power_file)
+
         # Load initial data
-        self.ftp          = h.get_latest_ftp(self.profile_file)
-        self.max_hr       = h.get_latest_maxhr(self.profile_file)
-        self.resting_hr   = h.get_latest_restinghr(self.profile_file)
-        self.hr_zones     = h.load_data(self.hr_file)
-        self.power_zones  = h.load_data(self.power_file)
-        self.api_key      = h.get_opencage_key(self.profile_file)
-    
+        self._profile_version = None
+        self._refresh()
+
+    def _refresh(self):
+        # A stat() per file; the files are only parsed again when they changed
+        self.profile_history.refresh()
+        self.hr_history.refresh()
+        self.power_history.refresh()
+        if self._profile_version != self.profile_history.version:
+            self._load_profile()
+
+    def _load_profile(self):
+        self._profile_version = self.profile_history.version
+        profile               = self.profile_history.frame
+        latest                = profile.iloc[-1] if not profile.empty else pd.Series(dtype=object)
+
+        self.ftp        = int_or_zero(latest.get('ftp'))
+        self.max_hr     = int_or_zero(latest.get('max_hr'))
+        self.resting_hr = int_or_zero(latest.get('resting_hr'))
+        api_key         = latest.get('opencage_key')
+        self.api_key    = str(api_key) if pd.notna(api_key) else None
+
+    @property
+    def hr_zones(self) -> pd.DataFrame:
+        return self.hr_history.frame
+
+    @property
+    def power_zones(self) -> pd.DataFrame:
+        return self.power_history.frame
+
     # Method to reload profile data
     def reload_profile(self):
-        self.ftp        = h.get_latest_ftp(self.profile_file)
-        self.max_hr     = h.get_latest_maxhr(self.profile_file)
-        self.resting_hr = h.get_latest_restinghr(self.profile_file)
-    
+        self.profile_history.refresh(force=True)
+        self._load_profile()
+
     # Method to reload HR zones
     def reload_hr_zones(self):
-        self.hr_zones = h.load_data(self.hr_file)
-    
+        self.hr_history.refresh(force=True)
+
     # Method to reload Power zones
     def reload_power_zones(self):
-        self.power_zones = h.load_data(self.power_file)
-    
+        self.power_history.refresh(force=True)
+
     # Method to reload the API key
     def reload_api_key(self):
-        self.api_key = h.get_opencage_key(self.profile_file)
-    
+        self.reload_profile()
+
     # Method to get the user's FTP with optional date
     def get_ftp(self, date: datetime = None):
+        self._refresh()
         if date:
-            # Filter the FTP value based on the provided date
-            filtered_df = h.load_data(self.profile_file)
-            filtered_df['timestamp'] = pd.to_datetime(filtered_df['timestamp'], errors='coerce')
-            
-            filtered_ftp = filtered_df[filtered_df['timestamp'] <= date]
-            if not filtered_ftp.empty and 'ftp' in filtered_ftp.columns:
-                ftp = filtered_ftp['ftp'].iloc[-1]
-                if pd.notna(ftp):
-                    return int(ftp)
-                else:
-                    return 0
+            # FTP in effect at the provided date
+            row = self.profile_history.as_of(date)
+            if row is not None and 'ftp' in row.index:
+                return int_or_zero(row['ftp'])
             return 0
         return self.ftp
-    
+
     # Method to get the max heart rate
     def get_max_hr(self):
+        self._refresh()
         return self.max_hr
-    
+
     # Method to get resting heart rate
     def get_resting_hr(self):
+        self._refresh()
         return self.resting_hr
-    
+
     # Method to get HR zones with optional date
     def get_hr_zones(self, date: datetime = None):
+        self._refresh()
         if date:
-            filtered_zones = self.hr_zones[pd.to_datetime(self.hr_zones['timestamp']) <= date]
-            if not filtered_zones.empty:
-                return filtered_zones.iloc[-1]
-            else:
-                return None
-        return self.hr_zones.iloc[-1]
-    
+            return self.hr_history.as_of(date)
+        return self.hr_history.latest()
+
     def get_all_hr_zones(self):
-        return self.hr_zones
-    
+        self._refresh()
+        return self.hr_zones.copy()
+
     # Method to get power zones with optional date
     def get_power_zones(self, date: datetime = None):
+        self._refresh()
         if date:
-            filtered_zones = self.power_zones[pd.to_datetime(self.power_zones['timestamp']) <= date]
-            if not filtered_zones.empty:
-                return filtered_zones.iloc[-1]
-            else:
-                return None
-        return self.power_zones.iloc[-1]
-    
+            return self.power_history.as_of(date)
+        return self.power_history.latest()
+
     def get_all_power_zones(self):
-        return self.power_zones
-    
+        self._refresh()
+        return self.power_zones.copy()
+
+    def get_settings_as_of(self, dates) -> pd.DataFrame:
+        """
+        Resolves FTP, HR zones and power zones for a whole batch of activity dates at once.
+
+        Args:
+        dates: Activity dates (naive dates are compared as-is with the profile timestamps).
+
+        Returns:
+        pd.DataFrame: One row per date with 'date', 'ftp' (0 where unknown), and the HR and power
+        zone boundaries in effect at that date ('zone.N.low_hr', 'zone.N.max_pwr', ...), NaN where unknown.
+        """
+        self._refresh()
+        profile = self.profile_history.as_of_frame(dates)
+        ftp     = profile['ftp'] if 'ftp' in profile.columns else pd.Series(np.nan, index=profile.index)
+        hr      = self.hr_history.as_of_frame(dates)
+        power   = self.power_history.as_of_frame(dates)
+
+        # Zone percentages share names across both files, only the boundaries are kept
+        hr      = hr[[c for c in hr.columns if c.startswith('zone.') and not c.endswith('.pct')]]
+        power   = power[[c for c in power.columns if c.startswith('zone.') and not c.endswith('.pct')]]
+
+        settings = pd.DataFrame({'date': list(dates), 'ftp': ftp.fillna(0).astype(int).to_numpy()})
+        return pd.concat([settings, hr, power], axis=1)
+
+    # Identifies the current content of the profile files, e.g. for cache keys
+    def get_version(self) -> tuple:
+        self._refresh()
+        return (self.profile_history.signature, self.hr_history.signature, self.power_history.signature)
+
     # Method to get the API key
     def get_api_key(self):
+        self._refresh()
         return self.api_key
@@ -0,0 +1,244 @@
+from src.fit_reader import read_fit_header
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+HASH_CHUNK = 1024 * 1024
+
+
+class DuplicateActivity(Exception):
+    """Raised for an activity file that is a copy of one already claimed by another file."""
+    def __init__(self, path: str, original: str):
+        super().__init__(path, original)
+        self.path     = path
+        self.original = original
+
+    def __str__(self) -> str:
+        return f"{self.path} is a duplicate of {self.original}"
+
+class DedupeIndex:
+    """
+    Finds copies of the same activity across directories (the head unit's file, a Strava export,
+    a Garmin Connect export, ...), stored in SQLite.
+
+    Files are fingerprinted twice: by the SHA-256 of their bytes, which catches exact copies,
+    and by a header key of start time, sport and device serial number (see read_fit_header()),
+    which catches re-encoded exports of the same recording. The header is only read when the
+    byte hash is new. Fingerprints are kept per path with the file size and mtime, so a file is
+    only read again once it changes.
+
+    The first file to claim() a fingerprint owns it; later files with the same fingerprint are
+    its duplicates for as long as the owner exists unchanged. Claims are atomic, so worker
+    processes can claim files concurrently, and an index can be shared by threads (e.g. the
+    Streamlit sessions).
+
+    Args:
+    path (str): SQLite database file.
+    """
+    INDEX_FILE = './userdata/dedupe_index.sqlite'
+
+    def __init__(self, path: str = INDEX_FILE):
+        self.path      = path
+        self._conn     = None
+        self._conn_pid = None
+        self._lock     = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared across processes (e.g. the processor.py worker pool)
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn     = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn_pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path         TEXT PRIMARY KEY,
+                    size         INTEGER NOT NULL,
+                    mtime_ns     INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    header_key   TEXT
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS content_owners (content_hash TEXT PRIMARY KEY, path TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS header_owners (header_key TEXT PRIMARY KEY, path TEXT NOT NULL)")
+        return self._conn
+
+    def fingerprint(self, path: str, header: bool = True) -> tuple:
+        """
+        Returns (content hash, header key) of a file, reading it only when it changed since it was
+        last fingerprinted. The header key is None for files without one (e.g. GPX), and is not
+        read unless `header` is set.
+        """
+        with self._lock:
+            path  = os.path.abspath(path)
+            stat  = os.stat(path)
+            row   = self._connect().execute("SELECT size, mtime_ns, content_hash, header_key FROM files WHERE path = ?", (path,)).fetchone()
+            fresh = row is not None and row[:2] == (stat.st_size, stat.st_mtime_ns)
+            # header_key is NULL until read, '' when the file has none
+            if fresh and (row[3] is not None or not header):
+                return row[2], row[3] or None
+
+            content = row[2] if fresh else content_hash(path)
+            key     = (header_key(path) or '') if header else None
+            self._connect().execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                                    (path, stat.st_size, stat.st_mtime_ns, content, key))
+            return content, key or None
+
+    def claimed(self, path: str) -> bool:
+        """Whether `path` was claimed (and owns its byte hash), as opposed to not seen yet or a duplicate."""
+        with self._lock:
+            return self._connect().execute("SELECT 1 FROM content_owners WHERE path = ?", (os.path.abspath(path),)).fetchone() is not None
+
+    def _owner(self, conn: sqlite3.Connection, table: str, column: str, value: str, path: str) -> str:
+        # The current owner of a fingerprint, if it is another file that still has that fingerprint
+        row = conn.execute(f"SELECT path FROM {table} WHERE {column} = ?", (value,)).fetchone()
+        if row is None or row[0] == path:
+            return None
+        owner = conn.execute(f"SELECT size, mtime_ns, {column} FROM files WHERE path = ?", (row[0],)).fetchone()
+        try:
+            stat = os.stat(row[0])
+        except OSError:
+            return None
+        if owner is None or owner[2] != value or owner[:2] != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return row[0]
+
+    def claim(self, path: str) -> str:
+        """
+        Registers a file as the owner of its fingerprints, unless another file already owns one
+        of them. Returns the path of that other file for a duplicate, None otherwise.
+        """
+        with self._lock:
+            path    = os.path.abspath(path)
+            content = self.fingerprint(path, header=False)[0]
+            conn    = self._connect()
+
+            owner = self._owner(conn, 'content_owners', 'content_hash', content, path)
+            if owner is not None:
+                return owner
+
+            # Not a byte copy, the header decides
+            key = self.fingerprint(path)[1]
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                owner = self._owner(conn, 'content_owners', 'content_hash', content, path)
+                if owner is None and key is not None:
+                    owner = self._owner(conn, 'header_owners', 'header_key', key, path)
+                if owner is None:
+                    conn.execute("INSERT OR REPLACE INTO content_owners VALUES (?, ?)", (content, path))
+                    if key is not None:
+                        conn.execute("INSERT OR REPLACE INTO header_owners VALUES (?, ?)", (key, path))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return owner
+
+    def original(self, path: str) -> str:
+        """Returns the file `path` is a duplicate of, or None, without claiming anything."""
+        with self._lock:
+            path         = os.path.abspath(path)
+            content, key = self.fingerprint(path)
+            conn         = self._connect()
+            owner        = self._owner(conn, 'content_owners', 'content_hash', content, path)
+            if owner is None and key is not None:
+                owner = self._owner(conn, 'header_owners', 'header_key', key, path)
+            return owner
+
+    def group(self, paths: list) -> dict:
+        """
+        Groups files that are copies of the same activity.
+
+        Returns:
+        dict: Path of each distinct activity (the claimed owner when it is among `paths`, else the
+        first copy in `paths` order) -> list of the other paths holding the same activity.
+        """
+        with self._lock:
+            groups, seen = {}, {}
+            for path in paths:
+                try:
+                    content, key = self.fingerprint(path)
+                except OSError as e:
+                    logging.error(f"Cannot fingerprint {path}: {e}")
+                    groups[path] = []
+                    continue
+
+                first = seen.get(('content', content)) or (seen.get(('header', key)) if key is not None else None)
+                if first is None:
+                    groups[path] = []
+                    seen[('content', content)] = path
+                    if key is not None:
+                        seen[('header', key)] = path
+                else:
+                    groups[first].append(path)
+
+            # Show each activity under the copy processor.py summarized, when it is listed
+            listed = {os.path.abspath(path): path for path in paths}
+            for first in list(groups):
+                owner = listed.get(self.original(first))
+                if owner is not None and owner in groups[first]:
+                    copies        = groups.pop(first)
+                    copies.remove(owner)
+                    groups[owner] = [first, *copies]
+            return groups
+
+    def release(self, path: str):
+        """
+        Gives up the fingerprints `path` owns (e.g. after it failed to process), so that the next
+        copy of its activity to claim() them becomes the original. Its own fingerprint is kept.
+        """
+        with self._lock:
+            path = os.path.abspath(path)
+            conn = self._connect()
+            for table in ('content_owners', 'header_owners'):
+                conn.execute(f"DELETE FROM {table} WHERE path = ?", (path,))
+
+    def forget(self, path: str):
+        with self._lock:
+            path = os.path.abspath(path)
+            conn = self._connect()
+            for table in ('files', 'content_owners', 'header_owners'):
+                conn.execute(f"DELETE FROM {table} WHERE path = ?", (path,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+def content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def header_key(path: str) -> str:
+    """'<UTC start time>/<sport>/<device serial>' of a FIT file, None without a start time or for other files."""
+    if not path.lower().endswith('.fit'):
+        return None
+    try:
+        header = read_fit_header(path)
+    except Exception as e:
+        logging.warning(f"Cannot read the header of {path}: {e}")
+        return None
+    if header.get('start_time') is None:
+        return None
+    return f"{header['start_time']:%Y-%m-%dT%H:%M:%SZ}/{header.get('sport')}/{header.get('serial_number')}"
+
+DEDUPE_INDEX = DedupeIndex()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="List the activity files that are copies of the same activity")
+    parser.add_argument('directories', nargs='+', help="directories containing activity files")
+    parser.add_argument('--ext', default='fit', help="activity file extension")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s [%(levelname)s] [%(module)s.%(funcName)s] - %(message)s', level=logging.INFO)
+    paths  = [os.path.join(directory, file) for directory in args.directories
+              for file in sorted(os.listdir(directory)) if file.endswith(args.ext)]
+    groups = DEDUPE_INDEX.group(paths)
+    for path, copies in groups.items():
+        if copies:
+            print(f"{path}\n" + ''.join(f"    {copy}\n" for copy in copies), end='')
+    print(f"{len(paths)} files, {len(groups)} distinct activities, {len(paths) - len(groups)} duplicates")
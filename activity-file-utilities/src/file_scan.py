@@ -0,0 +1,128 @@
+from src.fit_reader import scan_fit_file
+from src.gpx_reader import scan_gpx_file
+from src.timezones import RESOLVER
+import argparse
+import json
+import logging
+import os
+import pandas as pd
+import sqlite3
+import threading
+
+# Columns of scan() frames, after 'file'
+SCAN_COLUMNS = ('start_time', 'sport', 'sub_sport', 'duration', 'distance', 'manufacturer', 'product')
+
+
+class ScanCache:
+    """
+    Quick scans of activity files (see scan_fit_file() and scan_gpx_file()), cached in SQLite by
+    path, size and mtime, so a directory listing only reads the files that are new or changed.
+
+    Start times are stored as local wall-clock times, resolved from the start position when the
+    file is scanned, so listing cached files never loads the time zone data. A cache can be
+    shared by threads (e.g. the Streamlit sessions).
+
+    Args:
+    path (str): SQLite database file.
+    """
+    CACHE_FILE = './userdata/scan_cache.sqlite'
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path      = path
+        self._conn     = None
+        self._conn_pid = None
+        self._lock     = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared across processes (e.g. the processor.py worker pool)
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn     = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn_pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS scans (
+                    path      TEXT PRIMARY KEY,
+                    directory TEXT NOT NULL,
+                    size      INTEGER NOT NULL,
+                    mtime_ns  INTEGER NOT NULL,
+                    overview  TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS scans_directory ON scans (directory)")
+        return self._conn
+
+    def scan(self, directory: str, files: list = None, extensions: tuple = ('.fit', '.gpx'), progress=None) -> pd.DataFrame:
+        """
+        Scans the activity files of a directory, reading only those not cached yet.
+
+        Args:
+        directory (str): Directory of the files.
+        files (list): File names to scan; every file of the directory with one of `extensions` if None.
+        extensions (tuple): File name endings scanned when `files` is None.
+        progress: Called with (done, total) while uncached files are read, e.g. to drive a progress bar.
+
+        Returns:
+        pd.DataFrame: 'file' and SCAN_COLUMNS, one row per file in `files` order; 'start_time' is a
+        naive local datetime, 'duration' in seconds and 'distance' in meters. Files that cannot be
+        read (or are gone by the time they are scanned) have an 'error' and no other values.
+        """
+        directory = os.path.abspath(directory)
+        if files is None:
+            files = sorted(f for f in os.listdir(directory) if f.endswith(extensions))
+
+        with self._lock:
+            conn   = self._connect()
+            cached = {row[0]: row[1:] for row in conn.execute("SELECT path, size, mtime_ns, overview FROM scans WHERE directory = ?", (directory,))}
+        rows, misses = [], []
+        for file in files:
+            path = os.path.join(directory, file)
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                # Removed or renamed since the directory was listed; not cached
+                rows.append({'file': file, 'error': str(e)})
+                continue
+            entry = cached.get(path)
+            if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+                overview = json.loads(entry[2])
+            else:
+                overview = scan_file(path)
+                misses.append((path, directory, stat.st_size, stat.st_mtime_ns, json.dumps(overview)))
+                if progress is not None:
+                    progress(len(misses), len(files))
+            rows.append({'file': file, **overview})
+
+        if misses:
+            with self._lock, conn:
+                conn.executemany("INSERT OR REPLACE INTO scans VALUES (?, ?, ?, ?, ?)", misses)
+
+        df = pd.DataFrame(rows, columns=['file', *SCAN_COLUMNS, 'error'])
+        df['start_time'] = pd.to_datetime(df['start_time'])
+        return df
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM scans")
+
+def scan_file(path: str) -> dict:
+    """Quick scan of one FIT or GPX file, with its start time made local and JSON-ready."""
+    try:
+        overview = scan_gpx_file(path) if path.lower().endswith('.gpx') else scan_fit_file(path)
+    except Exception as e:
+        logging.error(f"Cannot scan {path}: {e}")
+        return {'error': str(e)}
+
+    start = overview.pop('start_time')
+    if start is not None:
+        start = RESOLVER.localize(start, overview['latitude'], overview['longitude']).replace(tzinfo=None).isoformat()
+    return {'start_time': start, **{name: overview[name] for name in SCAN_COLUMNS[1:]}}
+
+SCAN_CACHE = ScanCache()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="List the activity files of a directory with their date, sport, duration and distance")
+    parser.add_argument('directory', help="directory containing FIT/GPX files")
+    args = parser.parse_args()
+
+    pd.set_option('display.width', 200)
+    print(SCAN_CACHE.scan(args.directory).drop(columns='error').sort_values('start_time').to_string(index=False))
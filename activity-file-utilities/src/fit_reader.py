@@ -0,0 +1,227 @@
+from fitparse.processors import FitFileDataProcessor
+from fitparse.profile import FIELD_TYPE_TIMESTAMP
+from fitparse.records import DataMessage
+import fitparse
+import struct
+
+# Padding for fields a message does not carry, NaN like pandas uses for missing keys
+MISSING = float('nan')
+
+# Always fully decoded, fitparse needs them to resolve developer fields
+DEVELOPER_MESSAGES = ('developer_data_id', 'field_description')
+
+
+class ProjectedDataProcessor(FitFileDataProcessor):
+    """
+    fitparse data processor that only post-processes (enum names, datetimes, units) the fields
+    selected for the message currently being decoded. `fields` is None to process every field.
+    """
+    def __init__(self):
+        self.fields = None
+
+    def run_type_processor(self, field_data):
+        if self.fields is None or field_data.name in self.fields:
+            super().run_type_processor(field_data)
+
+    def run_field_processor(self, field_data):
+        if self.fields is None or field_data.name in self.fields:
+            super().run_field_processor(field_data)
+
+    def run_unit_processor(self, field_data):
+        if self.fields is None or field_data.name in self.fields:
+            super().run_unit_processor(field_data)
+
+class ProjectedFitFile(fitparse.FitFile):
+    """
+    FitFile that only decodes the message types and fields of a projection.
+
+    Messages of other types are read past in one read (their bytes still count towards the CRC,
+    and their timestamps still feed the compressed timestamp accumulator) without building any
+    field data.
+    Unlike fitparse.FitFile, messages are not kept around once they have been yielded.
+
+    This hooks into fitparse internals (_parse_data_message, _parse_message, _messages,
+    _local_mesgs, _compressed_ts_accumulator), which are only known to hold in the 1.2 series;
+    requirements.txt pins fitparse below 1.3 accordingly.
+
+    Args:
+    fileish: Path or file-like object of the FIT file.
+    projection (dict): Message name -> collection of field names, or None for every field.
+    """
+    def __init__(self, fileish, projection: dict, **kwargs):
+        self.projection = {name: set(fields) if fields is not None else None for name, fields in projection.items()}
+        self._layouts   = {}
+        super().__init__(fileish, data_processor=ProjectedDataProcessor(), **kwargs)
+
+    def _skip_layout(self, def_mesg) -> tuple:
+        # Message size and the timestamp field (offset, struct) of a definition, computed once per definition
+        layout = self._layouts.get(def_mesg)
+        if layout is None:
+            offset, timestamp = 0, None
+            for field_def in def_mesg.field_defs + def_mesg.dev_field_defs:
+                if field_def.def_num == FIELD_TYPE_TIMESTAMP.def_num and timestamp is None and field_def.size == field_def.base_type.size:
+                    timestamp = (offset, struct.Struct(def_mesg.endian + field_def.base_type.fmt), field_def.base_type)
+                offset += field_def.size
+            layout = self._layouts[def_mesg] = (offset, timestamp)
+        return layout
+
+    def _parse_data_message(self, header):
+        def_mesg = self._local_mesgs.get(header.local_mesg_num)
+        if def_mesg is None or def_mesg.name in self.projection or def_mesg.name in DEVELOPER_MESSAGES:
+            self._processor.fields = self.projection.get(def_mesg.name) if def_mesg is not None else None
+            return super()._parse_data_message(header)
+
+        size, timestamp = self._skip_layout(def_mesg)
+        data = self._read(size)
+        if timestamp is not None:
+            offset, layout, base_type = timestamp
+            raw_value = base_type.parse(layout.unpack_from(data, offset)[0])
+            if raw_value is not None:
+                self._compressed_ts_accumulator = raw_value
+        if header.time_offset is not None:
+            self._compressed_ts_accumulator = self._apply_compressed_accumulation(
+                header.time_offset, self._compressed_ts_accumulator, 5,
+            )
+        return DataMessage(header=header, def_mesg=def_mesg, fields=[])
+
+    def iter_projected(self):
+        """Yields the data messages of the projected types, releasing each one once consumed."""
+        while not self._complete:
+            message = self._parse_message()
+            self._messages.clear()
+            if message is not None and message.type == 'data' and message.name in self.projection:
+                yield message
+
+def read_fit_columns(fileish, projection: dict) -> dict:
+    """
+    Decodes a FIT file straight into per-column lists.
+
+    Args:
+    fileish: Path or file-like object of the FIT file.
+    projection (dict): Message name -> collection of field names, or None for every field.
+
+    Returns:
+    dict: Message name -> {column name: list of values}, one entry per projected message type.
+    Columns appear in the order fitparse yields the fields, and rows missing a field hold NaN.
+    """
+    fitfile = ProjectedFitFile(fileish, projection)
+    tables  = {name: ({}, [0]) for name in projection}
+
+    for message in fitfile.iter_projected():
+        columns, rows = tables[message.name]
+        fields        = fitfile.projection[message.name]
+        count         = rows[0]
+
+        for field in message:
+            name = field.name
+            if fields is not None and name not in fields:
+                continue
+
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = [MISSING] * count
+
+            # Later fields win when a name repeats within a message
+            if len(column) > count:
+                column[-1] = field.value
+            else:
+                column.append(field.value)
+
+        rows[0] = count = count + 1
+        for column in columns.values():
+            if len(column) < count:
+                column.append(MISSING)
+
+    return {name: columns for name, (columns, _) in tables.items()}
+
+# Messages identifying an activity: the device, the sport and the start time
+HEADER_PROJECTION = {
+    'file_id': ['serial_number', 'manufacturer', 'product', 'time_created'],
+    'event':   ['timestamp'],
+    'sport':   ['sport', 'sub_sport'],
+    'session': ['sport', 'sub_sport', 'start_time'],
+}
+
+def read_fit_header(fileish) -> dict:
+    """
+    Reads what identifies the activity of a FIT file, without decoding its records: the device
+    serial number (file_id), the start time (first event, as processor.py takes it) and the
+    sport (sport or session message). Reading stops as soon as all three are known, which for
+    device files is within the first few messages.
+
+    Args:
+    fileish: Path or file-like object of the FIT file.
+
+    Returns:
+    dict: 'serial_number', 'manufacturer', 'product', 'time_created', 'start_time', 'sport' and
+    'sub_sport', for those found.
+    """
+    header = {}
+    for message in ProjectedFitFile(fileish, HEADER_PROJECTION).iter_projected():
+        if message.name == 'file_id':
+            for name in HEADER_PROJECTION['file_id']:
+                header.setdefault(name, message.get_value(name))
+        elif message.name == 'event':
+            if message.get_value('timestamp') is not None:
+                header.setdefault('start_time', message.get_value('timestamp'))
+        else:
+            if message.get_value('sport') is not None:
+                header.setdefault('sport', message.get_value('sport'))
+                header.setdefault('sub_sport', message.get_value('sub_sport'))
+
+        if 'serial_number' in header and 'start_time' in header and 'sport' in header:
+            break
+    return header
+
+# What a file list shows: the session totals, and the events as a fallback for files without a session
+SCAN_PROJECTION = {
+    'file_id': ['manufacturer', 'product', 'time_created'],
+    'event':   ['timestamp'],
+    'session': ['start_time', 'sport', 'sub_sport', 'total_elapsed_time', 'total_distance', 'start_position_lat', 'start_position_long'],
+}
+
+def scan_fit_file(fileish) -> dict:
+    """
+    Quick overview of a FIT file for file lists, read from its file_id, event and session messages
+    without decoding any record. Reading stops at the first session message, which devices that
+    write it up front reach within a few messages; otherwise the records are read past.
+
+    Args:
+    fileish: Path or file-like object of the FIT file.
+
+    Returns:
+    dict: 'start_time' (naive UTC datetime), 'sport', 'sub_sport', 'duration' (seconds),
+    'distance' (meters), 'latitude' and 'longitude' (degrees, of the start), 'manufacturer' and
+    'product'. Without a session, the start time and duration come from the first and last
+    events, and the other values are None.
+    """
+    overview = dict.fromkeys(('start_time', 'sport', 'sub_sport', 'duration', 'distance', 'latitude', 'longitude', 'manufacturer', 'product'))
+    created, first, last = None, None, None
+
+    with ProjectedFitFile(fileish, SCAN_PROJECTION) as fitfile:
+        for message in fitfile.iter_projected():
+            if message.name == 'file_id':
+                overview['manufacturer'] = message.get_value('manufacturer')
+                overview['product']      = message.get_value('product')
+                created                  = message.get_value('time_created')
+            elif message.name == 'event':
+                timestamp = message.get_value('timestamp')
+                if timestamp is not None:
+                    first = first or timestamp
+                    last  = timestamp
+            else:
+                latitude, longitude = message.get_value('start_position_lat'), message.get_value('start_position_long')
+                overview.update(start_time=message.get_value('start_time'),
+                                sport=message.get_value('sport'),
+                                sub_sport=message.get_value('sub_sport'),
+                                duration=message.get_value('total_elapsed_time'),
+                                distance=message.get_value('total_distance'),
+                                latitude=latitude * (180 / 2**31) if latitude is not None else None,
+                                longitude=longitude * (180 / 2**31) if longitude is not None else None)
+                break
+
+    if overview['start_time'] is None:
+        overview['start_time'] = first or created
+    if overview['duration'] is None and first is not None:
+        overview['duration'] = (last - first).total_seconds()
+    return overview
@@ -0,0 +1,456 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from geopy.adapters import RequestsAdapter, URLLibAdapter
+from geopy.exc import GeocoderRateLimited, GeocoderTimedOut, GeocoderUnavailable
+from geopy.geocoders import OpenCage
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep, time
+from urllib.parse import parse_qs, urlparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+import threading
+
+# OpenCage free tier: 1 request per second (paid plans allow 15 to 40)
+OPENCAGE_RATE  = 1.0
+OPENCAGE_BURST = 1
+
+# Errors worth trying again after a while, anything else is final
+RETRYABLE = (GeocoderTimedOut, GeocoderRateLimited, GeocoderUnavailable)
+
+
+class OpenCageBackend:
+    """
+    Reverse geocoder backed by OpenCage (through geopy). The geolocator is built once and reused.
+    `domain` and `scheme` point it at another server, e.g. StubGeocodeServer.
+
+    The HTTP adapter does not retry on its own (requests would otherwise retry 429 answers and
+    read timeouts behind the rate limiter's back); GeocodingClient does.
+    """
+    def __init__(self, api_key: str, domain: str = 'api.opencagedata.com', scheme: str = None, timeout: float = None):
+        # Cache namespace (see GeocodeCache), answers of another server are kept apart
+        self.name       = 'opencage' if domain == 'api.opencagedata.com' else f"opencage@{domain}"
+        self.api_key    = api_key
+        kwargs          = {'timeout': timeout} if timeout is not None else {}
+        adapter         = partial(RequestsAdapter, max_retries=0) if RequestsAdapter.is_available else URLLibAdapter
+        self.geolocator = OpenCage(api_key, domain=domain, scheme=scheme, adapter_factory=adapter, **kwargs)
+
+    def reverse(self, latitude: float, longitude: float) -> dict:
+        location_details = {}
+        try:
+            location = self.geolocator.reverse((latitude, longitude), exactly_one=True)
+            if location:
+                address = location.raw.get('components', {})
+                location_details['city']        = address.get('city', address.get('town', address.get('village', '')))
+                location_details['state']       = address.get('state', '')
+                location_details['country']     = address.get('country', '')
+                location_details['postal_code'] = address.get('postcode', '')
+
+        except GeocoderTimedOut:
+            logging.error("Error: Geocoder service timed out")
+            raise
+        except Exception as e:
+            logging.error(f"Error: {e}")
+            raise
+
+        return location_details
+
+class StubGeocoder:
+    """
+    Offline reverse geocoder for tests and benchmarks. Answers from a fixed mapping of
+    (latitude, longitude) to location details, or with a generic location, and counts calls.
+    """
+    def __init__(self, locations: dict = None, default: dict = None):
+        self.name      = 'stub'
+        self.locations = locations or {}
+        self.default   = default or {'city': 'Stubville', 'state': 'Stub State', 'country': 'Stubland', 'postal_code': '00000'}
+        self.calls     = 0
+
+    def reverse(self, latitude: float, longitude: float) -> dict:
+        self.calls += 1
+        return dict(self.locations.get((latitude, longitude), self.default))
+
+class GeocodeCache:
+    """
+    Persistent reverse-geocoding cache stored in SQLite.
+
+    Coordinates are quantized to `precision` decimal places (3 is ~110m), so rides starting from
+    the same place share an entry. Entries are kept per backend (its `name`), so answers of a
+    stub or test server are never served in place of real ones. Entries expire after `ttl_seconds`, and once the cache holds
+    more than `max_entries` the oldest ones are evicted. Hits are also kept in memory, so repeated
+    lookups within a process do not touch the database. A cache can be shared by threads (e.g.
+    the GeocodingClient pool).
+
+    Args:
+    path (str): SQLite database file.
+    precision (int): Number of decimal places kept from the coordinates.
+    ttl_seconds (float): Lifetime of an entry.
+    max_entries (int): Maximum number of entries kept on disk.
+    """
+    CACHE_FILE = './userdata/geocode_cache.sqlite'
+
+    def __init__(self, path: str = CACHE_FILE, precision: int = 3, ttl_seconds: float = 90 * 24 * 3600, max_entries: int = 10000):
+        self.path        = path
+        self.precision   = precision
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory     = {}
+        self._conn       = None
+        self._conn_pid   = None
+        self._lock       = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared across processes (e.g. the processor.py worker pool)
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn     = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn_pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(locations)")]
+            if columns and 'backend' not in columns:
+                # Entries of caches created before they were kept per backend cannot be told apart
+                self._conn.execute("DROP TABLE locations")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS locations (
+                    backend   TEXT    NOT NULL,
+                    lat_key   INTEGER NOT NULL,
+                    lon_key   INTEGER NOT NULL,
+                    precision INTEGER NOT NULL,
+                    details   TEXT    NOT NULL,
+                    created   REAL    NOT NULL,
+                    PRIMARY KEY (backend, lat_key, lon_key, precision)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS locations_created ON locations (created)")
+        return self._conn
+
+    def key(self, backend, latitude: float, longitude: float) -> tuple:
+        scale = 10 ** self.precision
+        return backend_name(backend), round(latitude * scale), round(longitude * scale), self.precision
+
+    def get(self, backend, latitude: float, longitude: float):
+        with self._lock:
+            return self._get(self.key(backend, latitude, longitude), time())
+
+    def _get(self, key: tuple, now: float):
+        if key in self._memory:
+            details, created = self._memory[key]
+            if now - created <= self.ttl_seconds:
+                return dict(details)
+            del self._memory[key]
+
+        row = self._connect().execute(
+            "SELECT details, created FROM locations WHERE backend = ? AND lat_key = ? AND lon_key = ? AND precision = ?", key
+        ).fetchone()
+        if row is None or now - row[1] > self.ttl_seconds:
+            return None
+
+        details = json.loads(row[0])
+        self._remember(key, details, row[1])
+        return dict(details)
+
+    def put(self, backend, latitude: float, longitude: float, details: dict):
+        key = self.key(backend, latitude, longitude)
+        now = time()
+
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO locations VALUES (?, ?, ?, ?, ?, ?)", (*key, json.dumps(details), now))
+            conn.execute("DELETE FROM locations WHERE created < ?", (now - self.ttl_seconds,))
+            conn.execute("""
+                DELETE FROM locations WHERE rowid IN (
+                    SELECT rowid FROM locations ORDER BY created DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._remember(key, details, now)
+
+    def _remember(self, key: tuple, details: dict, created: float):
+        if len(self._memory) >= self.max_entries:
+            self._memory.clear()
+        self._memory[key] = (details, created)
+
+    def lookup(self, backend, latitude: float, longitude: float) -> dict:
+        """Returns the cached location details, asking the backend (and caching its answer) on a miss."""
+        details = self.get(backend, latitude, longitude)
+        if details is None:
+            details = backend.reverse(latitude, longitude)
+            if details:
+                self.put(backend, latitude, longitude, details)
+        return details
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM locations").fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM locations")
+            self._memory.clear()
+
+def backend_name(backend) -> str:
+    """Cache namespace of a geocoder: its `name`, else its class name; names are passed through."""
+    if isinstance(backend, str):
+        return backend
+    return getattr(backend, 'name', None) or type(backend).__name__
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: tokens come in at `rate` per second, at most `burst` of them saved
+    up, and every request takes one. With `shared`, the bucket lives in shared memory, so worker
+    processes handed the bucket (through a pool initializer) draw from one quota.
+
+    Args:
+    rate (float): Requests per second allowed in the long run.
+    burst (int): Requests allowed back to back after an idle period.
+    shared (bool): Keep the state in shared memory, for use by several processes.
+    """
+    def __init__(self, rate: float, burst: int = 1, shared: bool = False):
+        self.rate  = rate
+        self.burst = max(1, burst)
+        if shared:
+            self._state = multiprocessing.RawArray('d', 2)
+            self._lock  = multiprocessing.Lock()
+        else:
+            self._state = [0.0, 0.0]
+            self._lock  = threading.Lock()
+        # Tokens available and the time they were counted at
+        self._state[0] = self.burst
+        self._state[1] = monotonic()
+
+    def try_acquire(self) -> float:
+        """Takes a token if one is available. Returns 0 then, else the seconds until the next token."""
+        with self._lock:
+            now            = monotonic()
+            tokens         = min(self.burst, self._state[0] + (now - self._state[1]) * self.rate)
+            self._state[1] = now
+            if tokens >= 1:
+                self._state[0] = tokens - 1
+                return 0.0
+            self._state[0] = tokens
+            return (1 - tokens) / self.rate
+
+    def acquire(self) -> float:
+        """Takes a token, waiting for one if needed. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            sleep(delay)
+            waited += delay
+
+class GeocodingClient:
+    """
+    Concurrent reverse geocoding in front of a backend (OpenCageBackend, StubGeocoder, ...).
+
+    submit() answers from the cache right away, and otherwise hands the lookup to a thread pool,
+    so callers can go on with other work (or send more lookups) while the network answers.
+    Lookups of a place already in flight share its request instead of sending another one.
+    Requests go through `limiter` to stay within the provider quota, and timeouts, rate-limit
+    answers and unreachable servers are retried with exponential backoff and jitter, honoring
+    Retry-After when the server sends one.
+
+    Args:
+    backend: Geocoder with a reverse(latitude, longitude) method.
+    cache (GeocodeCache): Cache read before, and written after, each request; None for none.
+    limiter (TokenBucket): Rate limit of the requests; None for no limit.
+    workers (int): Requests in flight at most.
+    retries (int): Attempts after the first one, for RETRYABLE errors.
+    backoff_seconds (float): Wait before the first retry, doubled on each further one.
+    backoff_max (float): Longest wait between two attempts.
+    """
+    def __init__(self, backend, cache: GeocodeCache = None, limiter: TokenBucket = None, workers: int = 4,
+                 retries: int = 3, backoff_seconds: float = 1.0, backoff_max: float = 30.0):
+        self.backend         = backend
+        self.cache           = cache
+        self.limiter         = limiter
+        self.retries         = retries
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max     = backoff_max
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='geocode')
+        self._inflight = {}
+        self._lock     = threading.Lock()
+
+        self.hits      = 0
+        self.requests  = 0
+        self.coalesced = 0
+        self.retried   = 0
+        self.failed    = 0
+
+    def submit(self, latitude: float, longitude: float) -> Future:
+        """Starts a lookup. The future's result is the location details dict (shared by coalesced lookups)."""
+        if self.cache is not None:
+            details = self.cache.get(self.backend, latitude, longitude)
+            if details is not None:
+                self.hits += 1
+                future     = Future()
+                future.set_result(details)
+                return future
+            key = self.cache.key(self.backend, latitude, longitude)
+        else:
+            key = (latitude, longitude)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future              = self._executor.submit(self._fetch, latitude, longitude, key)
+            self._inflight[key] = future
+        return future
+
+    def reverse(self, latitude: float, longitude: float) -> dict:
+        return self.submit(latitude, longitude).result()
+
+    def reverse_many(self, coordinates: list) -> list:
+        """Looks up (latitude, longitude) pairs concurrently; results in the same order."""
+        futures = [self.submit(latitude, longitude) for latitude, longitude in coordinates]
+        return [future.result() for future in futures]
+
+    def _fetch(self, latitude: float, longitude: float, key: tuple) -> dict:
+        try:
+            for attempt in range(self.retries + 1):
+                if self.limiter is not None:
+                    self.limiter.acquire()
+                self.requests += 1
+                try:
+                    details = self.backend.reverse(latitude, longitude)
+                    break
+                except RETRYABLE as e:
+                    if attempt == self.retries:
+                        self.failed += 1
+                        raise
+                    delay = min(self.backoff_max, self.backoff_seconds * 2 ** attempt)
+                    delay = max(random.uniform(delay / 2, delay), getattr(e, 'retry_after', None) or 0)
+                    logging.warning(f"Geocoding ({latitude:.4f}, {longitude:.4f}) failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                    self.retried += 1
+                    sleep(delay)
+                except Exception:
+                    self.failed += 1
+                    raise
+
+            if details and self.cache is not None:
+                self.cache.put(self.backend, latitude, longitude, details)
+            return details
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def metrics(self) -> dict:
+        return {'cache_hits': self.hits, 'requests': self.requests, 'coalesced': self.coalesced,
+                'retried': self.retried, 'failed': self.failed}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+class StubGeocodeServer:
+    """
+    Local HTTP server answering like the OpenCage reverse geocoding API, so the real request path
+    (OpenCageBackend, GeocodingClient) can be exercised offline. Every answer takes `latency`
+    seconds; requests beyond `rate` per second are answered with HTTP 429, and the first `stall`
+    requests are held `stall_seconds` so that the client times out. Counts requests, throttled
+    requests and the most requests handled at once.
+
+    Use as a context manager; backend() returns an OpenCageBackend talking to the server.
+
+    Args:
+    latency (float): Seconds taken by each answer.
+    rate (float): Requests per second served, None for no limit.
+    burst (int): Requests served back to back after an idle period.
+    stall (int): Number of first requests held for `stall_seconds`.
+    stall_seconds (float): How long stalled requests are held.
+    """
+    def __init__(self, latency: float = 0.05, rate: float = None, burst: int = 1, stall: int = 0, stall_seconds: float = 2.0):
+        self.latency       = latency
+        self.limiter       = TokenBucket(rate, burst) if rate else None
+        self.stall         = stall
+        self.stall_seconds = stall_seconds
+
+        self.requests    = 0
+        self.throttled   = 0
+        self.concurrent  = 0
+        self.peak        = 0
+        self.times       = []
+        self._lock       = threading.Lock()
+        self._server     = None
+        self._thread     = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def domain(self) -> str:
+        return f"127.0.0.1:{self._server.server_port}"
+
+    def backend(self, timeout: float = 1.0) -> OpenCageBackend:
+        return OpenCageBackend('stub-key', domain=self.domain, scheme='http', timeout=timeout)
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-geocoder', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _handle(self, request: BaseHTTPRequestHandler):
+        with self._lock:
+            self.requests   += 1
+            self.concurrent += 1
+            self.peak        = max(self.peak, self.concurrent)
+            number           = self.requests
+            self.times.append(monotonic())
+        try:
+            if number <= self.stall:
+                sleep(self.stall_seconds)
+
+            if self.limiter is not None and self.limiter.try_acquire():
+                with self._lock:
+                    self.throttled += 1
+                self._reply(request, 429, {'status': {'code': 429, 'message': 'Too Many Requests'}, 'results': []}, {'Retry-After': '1'})
+                return
+
+            sleep(self.latency)
+            query    = parse_qs(urlparse(request.path).query).get('q', ['0,0'])[0]
+            lat, lon = (float(value) for value in query.split(','))
+            place    = {
+                'formatted':  f"Stub place {lat:.3f}, {lon:.3f}",
+                'geometry':   {'lat': lat, 'lng': lon},
+                'components': {'town': f"Stub {lat:.2f} {lon:.2f}", 'state': 'Stub State', 'country': 'Stubland', 'postcode': '00000'},
+            }
+            self._reply(request, 200, {'status': {'code': 200, 'message': 'OK'}, 'results': [place], 'total_results': 1})
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (timed out) first
+            pass
+        finally:
+            with self._lock:
+                self.concurrent -= 1
+
+    def _reply(self, request: BaseHTTPRequestHandler, code: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode('utf-8')
+        request.send_response(code)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(payload)
@@ -0,0 +1,154 @@
+from array import array
+from contextlib import nullcontext
+from gpxpy.gpxfield import parse_time
+import numpy as np
+import os
+import pandas as pd
+import re
+import xml.etree.ElementTree as ET
+
+TPX_NAMESPACE = '{http://www.garmin.com/xmlschemas/TrackPointExtension/v1}'
+
+# Timestamps are converted in batches, so the raw strings never pile up for the whole file
+TIME_CHUNK = 65536
+
+# scan_gpx_file() looks for the end time in the last TAIL_BYTES of the file first
+TAIL_BYTES   = 16 * 1024
+TIME_PATTERN = re.compile(rb'<(?:[\w.-]+:)?time>([^<]+)</(?:[\w.-]+:)?time>')
+
+
+def local_name(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+def read_gpx_columns(fileish, chunk_size: int = TIME_CHUNK) -> dict:
+    """
+    Streams the track points of a GPX file into columns, with incremental XML parsing.
+
+    Each track point is dropped from the document tree as soon as it has been read, so memory
+    grows with the compact output columns only, not with the size of the document. Like gpxpy,
+    only track points are read (routes and waypoints are ignored), across all tracks and segments.
+
+    Args:
+    fileish: Path or file-like object of the GPX file.
+    chunk_size (int): Number of timestamps converted at once.
+
+    Returns:
+    dict: 'latitude', 'longitude', 'elevation' (meters), 'heart_rate', 'cadence' and 'power' as
+    float arrays with NaN for missing values, and 'time' as a DatetimeIndex in the time zone of
+    the file (naive when the file has none).
+    """
+    columns = {name: array('d') for name in ('latitude', 'longitude', 'elevation', 'heart_rate', 'cadence', 'power')}
+    times   = array('q')
+    pending = []
+    tz      = None
+    zoned   = False
+    segment = None
+
+    def flush():
+        times.extend(pd.to_datetime(pending, format='ISO8601', utc=True).as_unit('ns').asi8)
+        pending.clear()
+
+    for event, elem in ET.iterparse(fileish, events=('start', 'end')):
+        if event == 'start':
+            if local_name(elem.tag) == 'trkseg':
+                segment = elem
+            continue
+        if local_name(elem.tag) != 'trkpt':
+            continue
+
+        # <power> comes without a namespace of its own, i.e. in the document's default one
+        namespace  = elem.tag[:-len('trkpt')]
+        power_tags = ('power', f'{namespace}power')
+        ele, time  = np.nan, None
+        hr, cad    = np.nan, np.nan
+        pwr        = np.nan
+
+        for child in elem:
+            name = local_name(child.tag)
+            if name == 'ele':
+                ele = float(child.text)
+            elif name == 'time':
+                time = child.text.strip()
+            elif name == 'extensions':
+                for ext in child:
+                    if ext.tag in power_tags:
+                        pwr = int(ext.text)
+                        continue
+
+                    hr_el = ext.find(f'{TPX_NAMESPACE}hr')
+                    if hr_el is not None:
+                        hr = int(hr_el.text)
+                    cad_el = ext.find(f'{TPX_NAMESPACE}cad')
+                    if cad_el is not None:
+                        cad = int(cad_el.text)
+
+        columns['latitude'].append(float(elem.get('lat')))
+        columns['longitude'].append(float(elem.get('lon')))
+        columns['elevation'].append(ele)
+        columns['heart_rate'].append(hr)
+        columns['cadence'].append(cad)
+        columns['power'].append(pwr)
+
+        # The first timestamp decides the time zone of the column, as gpxpy would parse it
+        if time is not None and not zoned:
+            tz    = parse_time(time).tzinfo
+            zoned = True
+        pending.append(time)
+        if len(pending) >= chunk_size:
+            flush()
+
+        # The point has been read, drop it from the tree
+        if segment is not None:
+            segment.clear()
+        else:
+            elem.clear()
+
+    if pending:
+        flush()
+
+    track         = {name: np.frombuffer(values, dtype=np.float64) for name, values in columns.items()}
+    time          = pd.DatetimeIndex(np.frombuffer(times, dtype=np.int64).view('M8[ns]')).tz_localize('UTC')
+    track['time'] = (time.tz_convert(tz) if tz is not None else time.tz_localize(None)).as_unit('us')
+    return track
+
+def scan_gpx_file(fileish) -> dict:
+    """
+    Quick overview of a GPX file for file lists (see scan_fit_file()): the track type, the first
+    point and the first and last point times, without building any column. GPX has no totals,
+    so the distance is None.
+
+    The document is parsed up to its first track point only; the end time is the last <time>
+    of the file, searched for in its tail (see last_gpx_time()).
+    """
+    overview = dict.fromkeys(('start_time', 'sport', 'sub_sport', 'duration', 'distance', 'latitude', 'longitude', 'manufacturer', 'product'))
+    first    = None
+
+    with (open(fileish, 'rb') if isinstance(fileish, (str, os.PathLike)) else nullcontext(fileish)) as f:
+        for event, elem in ET.iterparse(f, events=('end',)):
+            name = local_name(elem.tag)
+            if name == 'time' and elem.text:
+                first = elem.text.strip()
+            elif name == 'type' and overview['sport'] is None and elem.text:
+                overview['sport'] = elem.text.strip()
+            elif name == 'trkpt':
+                overview['latitude']  = float(elem.get('lat'))
+                overview['longitude'] = float(elem.get('lon'))
+                break
+        last = last_gpx_time(f) if overview['latitude'] is not None else None
+
+    if first is not None and last is not None:
+        start, end             = pd.to_datetime([first, last], format='ISO8601', utc=True).tz_localize(None)
+        overview['start_time'] = start.to_pydatetime()
+        overview['duration']   = (end - start).total_seconds()
+    return overview
+
+def last_gpx_time(f, window: int = TAIL_BYTES) -> str:
+    # The last <time> of a seekable binary file, reading back from its end in growing windows
+    size = f.seek(0, os.SEEK_END)
+    while True:
+        offset = max(0, size - window)
+        f.seek(offset)
+        times = TIME_PATTERN.findall(f.read(size - offset))
+        if times or offset == 0:
+            return times[-1].decode().strip() if times else None
+        window *= 4
@@ -0,0 +1,216 @@
+import numpy as np
+import os
+import pandas as pd
+import threading
+
+MODEL_FILE    = './models/aerobic_training_effect_model.keras'
+SCALER_FILE   = './models/aerobic_training_effect_scaler.pkl'
+EXPORTED_FILE = './models/aerobic_training_effect_model.npz'
+
+# Model inputs, in the order the scaler and the network were trained on
+AEROBIC_TE_FEATURES = [
+    'activity_distance',
+    'hr_average',
+    'hr_max',
+    'hr_time_in_zone_1',
+    'hr_time_in_zone_2',
+    'hr_time_in_zone_3',
+    'hr_time_in_zone_4',
+    'hr_time_in_zone_5',
+    'intensity_factor',
+    'time_total',
+    'training_stress_score',
+]
+
+# Activations the NumPy forward pass knows how to evaluate
+ACTIVATIONS = {
+    'linear':   lambda x: x,
+    'relu':     lambda x: np.maximum(x, 0),
+    'sigmoid':  lambda x: 1 / (1 + np.exp(-x)),
+    'tanh':     np.tanh,
+    'elu':      lambda x: np.where(x > 0, x, np.expm1(x)),
+    'softplus': lambda x: np.logaddexp(x, 0),
+    'swish':    lambda x: x / (1 + np.exp(-x)),
+    'silu':     lambda x: x / (1 + np.exp(-x)),
+}
+
+class ModelRegistry:
+    """
+    Process-wide registry of loaded models. Each entry is loaded lazily, the first time it is
+    requested, and exactly once even when several threads (e.g. Streamlit sessions) ask for it
+    at the same time.
+    """
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._entries = {}
+
+    def get(self, name: str, loader):
+        entry = self._entries.get(name)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is None:
+                    entry = loader()
+                    self._entries[name] = entry
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+REGISTRY = ModelRegistry()
+
+def check_features(input_df: pd.DataFrame):
+    missing = [key for key in AEROBIC_TE_FEATURES if key not in input_df.columns]
+    if missing:
+        raise ValueError(f"Missing keys in input DataFrame. Required keys are: {AEROBIC_TE_FEATURES}.")
+
+def finalize_predictions(predictions: np.ndarray) -> np.ndarray:
+    return np.minimum(5.0, np.round(predictions.astype(float), 1))
+
+def import_tensorflow():
+    os.environ['TF_CPP_MIN_LOG_LEVEL']  = '3'
+    os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
+    import tensorflow as tf
+    return tf
+
+class AerobicTrainingEffectModel:
+    """
+    The Keras aerobic training effect regressor together with its input scaler.
+
+    The forward pass is traced once with a variable batch dimension, so predicting one activity
+    or thousands of them reuses the same graph. TensorFlow is only imported when this class is
+    instantiated.
+    """
+    def __init__(self, model_file: str = MODEL_FILE, scaler_file: str = SCALER_FILE):
+        import joblib
+        tf = import_tensorflow()
+
+        self.tf     = tf
+        self.model  = tf.keras.models.load_model(model_file)
+        self.scaler = joblib.load(scaler_file)
+
+        model = self.model
+        @tf.function(input_signature=[tf.TensorSpec(shape=[None, len(AEROBIC_TE_FEATURES)], dtype=tf.float32)])
+        def forward(inputs):
+            return model(inputs)
+        self._forward = forward
+
+    def predict_raw(self, input_df: pd.DataFrame) -> np.ndarray:
+        check_features(input_df)
+
+        # Ensure the order matches
+        input_scaled = self.scaler.transform(input_df[AEROBIC_TE_FEATURES])
+        return self._forward(self.tf.convert_to_tensor(input_scaled, dtype=self.tf.float32)).numpy()[:, 0]
+
+    def predict(self, input_df: pd.DataFrame) -> np.ndarray:
+        return finalize_predictions(self.predict_raw(input_df))
+
+class NumpyAerobicTrainingEffectModel:
+    """
+    Pure NumPy forward pass over the weights exported by export_aerobic_te_model().
+
+    The scaler is folded into one affine transform (x * scale + offset), and each layer is an
+    affine transform followed by an activation, evaluated in float32 like Keras does.
+    """
+    def __init__(self, exported_file: str = EXPORTED_FILE):
+        with np.load(exported_file, allow_pickle=False) as artifact:
+            features = [str(feature) for feature in artifact['features']]
+            if features != AEROBIC_TE_FEATURES:
+                raise ValueError(f"{exported_file} was exported for different features: {features}")
+
+            self.scaler_scale  = artifact['scaler_scale']
+            self.scaler_offset = artifact['scaler_offset']
+            self.clip          = artifact['scaler_clip'] if 'scaler_clip' in artifact else None
+            self.layers        = [
+                (artifact[f'layer_{i}_kernel'], artifact[f'layer_{i}_bias'], ACTIVATIONS[str(artifact[f'layer_{i}_activation'])])
+                for i in range(int(artifact['num_layers']))
+            ]
+
+    def predict_raw(self, input_df: pd.DataFrame) -> np.ndarray:
+        check_features(input_df)
+
+        inputs = input_df[AEROBIC_TE_FEATURES].to_numpy(dtype=float) * self.scaler_scale + self.scaler_offset
+        if self.clip is not None:
+            inputs = np.clip(inputs, self.clip[0], self.clip[1])
+
+        outputs = inputs.astype(np.float32)
+        for kernel, bias, activation in self.layers:
+            outputs = activation(outputs @ kernel + bias)
+        return outputs[:, 0]
+
+    def predict(self, input_df: pd.DataFrame) -> np.ndarray:
+        return finalize_predictions(self.predict_raw(input_df))
+
+def export_aerobic_te_model(model_file: str = MODEL_FILE, scaler_file: str = SCALER_FILE, exported_file: str = EXPORTED_FILE) -> str:
+    """
+    Exports the Keras model weights and the scaler parameters to a compact .npz file, which
+    NumpyAerobicTrainingEffectModel can evaluate without TensorFlow.
+
+    Supports Dense, BatchNormalization, Activation and Dropout layers, and MinMaxScaler or
+    StandardScaler inputs.
+
+    Returns:
+        str: Path of the exported file.
+    """
+    keras_model = AerobicTrainingEffectModel(model_file, scaler_file)
+    scaler      = keras_model.scaler
+    artifact    = {'features': np.array(AEROBIC_TE_FEATURES)}
+
+    if hasattr(scaler, 'data_range_'):
+        # MinMaxScaler: x * scale_ + min_
+        artifact['scaler_scale']  = scaler.scale_
+        artifact['scaler_offset'] = scaler.min_
+        if getattr(scaler, 'clip', False):
+            artifact['scaler_clip'] = np.array(scaler.feature_range, dtype=float)
+    elif hasattr(scaler, 'mean_'):
+        # StandardScaler: (x - mean_) / scale_
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(AEROBIC_TE_FEATURES))
+        mean  = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(AEROBIC_TE_FEATURES))
+        artifact['scaler_scale']  = 1 / scale
+        artifact['scaler_offset'] = -mean / scale
+    else:
+        raise ValueError(f"Unsupported scaler: {type(scaler).__name__}")
+
+    layers = []
+    for layer in keras_model.model.layers:
+        kind = type(layer).__name__
+        if kind == 'Dense':
+            weights = layer.get_weights()
+            kernel  = weights[0]
+            bias    = weights[1] if layer.use_bias else np.zeros(kernel.shape[1], dtype=np.float32)
+            layers.append((kernel, bias, layer.activation.__name__))
+        elif kind == 'BatchNormalization':
+            gamma, beta, mean, variance = layer.get_weights()
+            scale = gamma / np.sqrt(variance + layer.epsilon)
+            layers.append((np.diag(scale), beta - mean * scale, 'linear'))
+        elif kind == 'Activation':
+            # Attach the activation to the preceding affine layer
+            if not layers or layers[-1][2] != 'linear':
+                raise ValueError("Activation layers are only supported after a linear layer")
+            kernel, bias, _ = layers.pop()
+            layers.append((kernel, bias, layer.activation.__name__))
+        elif kind in ('Dropout', 'InputLayer'):
+            continue
+        else:
+            raise ValueError(f"Unsupported layer for export: {kind}")
+
+    for i, (kernel, bias, activation) in enumerate(layers):
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"Unsupported activation for export: {activation}")
+        artifact[f'layer_{i}_kernel']     = kernel.astype(np.float32)
+        artifact[f'layer_{i}_bias']       = bias.astype(np.float32)
+        artifact[f'layer_{i}_activation'] = np.array(activation)
+    artifact['num_layers'] = np.array(len(layers))
+
+    np.savez_compressed(exported_file, **artifact)
+    return exported_file
+
+def load_aerobic_te_model():
+    # The exported NumPy artifact avoids importing TensorFlow altogether
+    if os.path.isfile(EXPORTED_FILE):
+        return NumpyAerobicTrainingEffectModel(EXPORTED_FILE)
+    return AerobicTrainingEffectModel(MODEL_FILE, SCALER_FILE)
+
+def get_aerobic_te_model():
+    return REGISTRY.get('aerobic_training_effect', load_aerobic_te_model)
@@ -0,0 +1,448 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from src.profiling import FunctionStats
+from time import monotonic, sleep
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import queue
+import select
+import signal
+import struct
+import sys
+import threading
+
+STATUS_FILE = './userdata/ingest_status.json'
+
+# inotify(7) event masks
+IN_MODIFY      = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ISDIR       = 0x40000000
+WATCH_MASK     = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event: wd, mask, cookie, len, then `len` bytes of NUL padded name
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+def scan_directory(directory: str, extensions: tuple) -> dict:
+    """Returns path -> (size, mtime in ns) for the activity files of a directory."""
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(extensions) and not entry.name.startswith('.') and entry.is_file():
+                stat = entry.stat()
+                files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+def file_signature(path: str) -> tuple:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+class InotifyWatcher:
+    """
+    Reports the activity files created, written or moved into a set of directories, through Linux
+    inotify (called through libc, no extra dependency). Costs nothing between changes, however
+    many files the directories hold. Should the kernel event queue overflow, every file of the
+    directories is reported once, as a rescan would.
+
+    Args:
+    directories (list): Directories to watch (not recursive).
+    extensions (tuple): File name endings to report, e.g. ('.fit',).
+    """
+    def __init__(self, directories: list, extensions: tuple):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+
+        self.extensions = extensions
+        self._fd        = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self._directories = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                self.close()
+                raise OSError(error, f"Cannot watch {directory}: {os.strerror(error)}")
+            self._directories[wd] = directory
+
+    def changes(self, timeout: float) -> set:
+        """Waits up to `timeout` seconds for changes, and returns the paths of the changed files."""
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                name    = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b'\0')
+                offset += INOTIFY_EVENT.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    logging.warning("inotify event queue overflowed, rescanning the watched directories")
+                    for directory in self._directories.values():
+                        changed.update(scan_directory(directory, self.extensions))
+                elif mask & IN_IGNORED:
+                    logging.warning(f"{self._directories.pop(wd, wd)} is no longer watched (removed or unmounted)")
+                elif not mask & IN_ISDIR and wd in self._directories:
+                    name = os.fsdecode(name)
+                    if name.endswith(self.extensions) and not name.startswith('.'):
+                        changed.add(os.path.join(self._directories[wd], name))
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+class PollingWatcher:
+    """
+    Portable fallback of InotifyWatcher, polling the directories every `interval` seconds.
+
+    A directory is only listed again when its own modification time changed (files added,
+    removed or renamed), or every `rescan_seconds` to also catch files rewritten in place;
+    otherwise a poll is a single stat per directory.
+
+    Args:
+    directories (list): Directories to watch (not recursive).
+    extensions (tuple): File name endings to report, e.g. ('.fit',).
+    interval (float): Seconds between polls.
+    rescan_seconds (float): Seconds between full listings of unchanged directories.
+    """
+    def __init__(self, directories: list, extensions: tuple, interval: float = 1.0, rescan_seconds: float = 300.0):
+        self.extensions     = extensions
+        self.interval       = interval
+        self.rescan_seconds = rescan_seconds
+        self._files         = {directory: scan_directory(directory, extensions) for directory in directories}
+        self._mtimes        = {directory: os.stat(directory).st_mtime_ns for directory in directories}
+        self._last_scan     = monotonic()
+
+    def changes(self, timeout: float) -> set:
+        sleep(min(timeout, self.interval))
+        rescan  = monotonic() - self._last_scan >= self.rescan_seconds
+        changed = set()
+        for directory, known in self._files.items():
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            if mtime == self._mtimes[directory] and not rescan:
+                continue
+
+            files = scan_directory(directory, self.extensions)
+            changed.update(path for path, signature in files.items() if known.get(path) != signature)
+            self._files[directory]  = files
+            self._mtimes[directory] = mtime
+        if rescan:
+            self._last_scan = monotonic()
+        return changed
+
+    def close(self):
+        pass
+
+def ignore_interrupts(initializer=None, initargs: tuple = ()):
+    # Worker processes leave Ctrl-C to the service, which lets the files in flight finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if initializer is not None:
+        initializer(*initargs)
+
+def open_watcher(directories: list, extensions: tuple, polling: bool = False, interval: float = 1.0):
+    """InotifyWatcher where the platform has it (and `polling` is not set), PollingWatcher otherwise."""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directories, extensions)
+        except OSError as e:
+            logging.warning(f"Falling back to polling: {e}")
+    return PollingWatcher(directories, extensions, interval)
+
+class Debouncer:
+    """
+    Holds changed files back until they are done being written: a file is ready once neither its
+    size nor its modification time changed for `settle_seconds`.
+
+    Args:
+    settle_seconds (float): Quiet time a file needs before it is ready.
+    """
+    def __init__(self, settle_seconds: float = 2.0):
+        self.settle_seconds = settle_seconds
+        self._pending       = {}
+
+    def touch(self, path: str, now: float, settled: bool = False):
+        """Records a change of `path`; `settled` files (e.g. found at startup) skip the wait."""
+        entry     = self._pending.get(path)
+        last      = now - self.settle_seconds if settled else now
+        signature = file_signature(path)
+        if entry is None:
+            self._pending[path] = [now, last, signature]
+        else:
+            entry[1], entry[2] = last, signature
+
+    def ready(self, now: float, limit: int, held: set = frozenset()) -> list:
+        """
+        Returns up to `limit` (path, first seen) of settled files, and forgets them. Files in `held`
+        (e.g. being processed) are kept pending, however long they have been quiet.
+        """
+        result = []
+        for path, entry in list(self._pending.items()):
+            if len(result) >= limit:
+                break
+            if path in held or now - entry[1] < self.settle_seconds:
+                continue
+
+            signature = file_signature(path)
+            if signature is None:
+                # Removed (or renamed away) before it settled
+                del self._pending[path]
+            elif signature != entry[2]:
+                entry[1], entry[2] = now, signature
+            else:
+                del self._pending[path]
+                result.append((path, entry[0]))
+        return result
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+class IngestService:
+    """
+    Long-running ingestion of activity files: watches directories, debounces files still being
+    written, and feeds the settled ones through a bounded queue to a pool of worker processes.
+
+    The main loop (run()) is the only thread calling `on_result` and `on_idle`, so those can
+    write to single-writer stores (the summary index). When the queue is full, settled files wait
+    in the debouncer until there is room again. A file changing again while queued is processed
+    once; a file changing while being processed is held in the debouncer until that run finished,
+    and processed again afterwards, so a file is never processed by two workers at once.
+
+    Args:
+    directories (list): Directories to watch.
+    process: Picklable function taking a file path, run in the worker processes.
+    extensions (tuple): File name endings to ingest.
+    workers (int): Worker processes.
+    queue_size (int): Bound of the work queue.
+    settle_seconds (float): Quiet time before a changed file is processed (see Debouncer).
+    on_result: Called with (path, result, error) after each file, error None on success.
+    on_idle: Called once the queue has drained after some work.
+    watcher: InotifyWatcher or PollingWatcher, open_watcher(directories, extensions) by default.
+    status_file (str): JSON file metrics() is written to every `report_seconds`, None for none.
+    report_seconds (float): Interval of the metrics log line (and status file).
+    initializer: Called with `initargs` in each worker process when it starts.
+    initargs (tuple): Arguments of `initializer`.
+    skip_errors (tuple): Exception types meaning a file was deliberately not processed (e.g. a
+    duplicate); counted as skipped rather than failed, and still passed to `on_result`.
+    """
+    def __init__(self, directories: list, process, extensions: tuple = ('.fit',), workers: int = 1,
+                 queue_size: int = 64, settle_seconds: float = 2.0, on_result=None, on_idle=None,
+                 watcher=None, status_file: str = STATUS_FILE, report_seconds: float = 60.0, initializer=None,
+                 initargs: tuple = (), skip_errors: tuple = ()):
+        self.directories    = [os.path.abspath(directory) for directory in directories]
+        self.process        = process
+        self.extensions     = extensions
+        self.workers        = workers
+        self.on_result      = on_result
+        self.on_idle        = on_idle
+        self.watcher        = watcher or open_watcher(self.directories, extensions)
+        self.status_file    = status_file
+        self.report_seconds = report_seconds
+        self.initializer    = initializer
+        self.initargs       = initargs
+        self.skip_errors    = skip_errors
+        self.debouncer      = Debouncer(settle_seconds)
+
+        self._queue     = queue.Queue(maxsize=queue_size)
+        self._results   = queue.Queue()
+        self._queued    = set()
+        self._running   = set()
+        self._lock      = threading.Lock()
+        self._stop      = threading.Event()
+        self._dirty     = False
+
+        self.started    = monotonic()
+        self.processed  = 0
+        self.failed     = 0
+        self.skipped    = 0
+        self.wait_time  = FunctionStats()
+        self.work_time  = FunctionStats()
+        self.latency    = FunctionStats()
+
+    def add(self, paths, settled: bool = False):
+        """Queues files for processing (e.g. those a startup scan found unprocessed) through the debouncer."""
+        now = monotonic()
+        for path in paths:
+            self.debouncer.touch(os.path.abspath(path), now, settled)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, poll_seconds: float = 0.5):
+        """
+        Runs until stop() is called, or SIGINT/SIGTERM is received when run from the main thread.
+        The files in flight are finished; queued ones are left for the next start.
+        """
+        logging.info(f"Watching {', '.join(self.directories)} with {type(self.watcher).__name__}, {self.workers} worker(s)")
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                handlers[signum] = signal.signal(signum, lambda *_: self.stop())
+
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=ignore_interrupts,
+                                       initargs=(self.initializer, self.initargs))
+        threads  = [threading.Thread(target=self._work, args=(executor,), name=f"ingest-{i}", daemon=True)
+                    for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        last_report = monotonic()
+        try:
+            while not self._stop.is_set():
+                self.add(self.watcher.changes(poll_seconds))
+                self._dispatch()
+                self._collect()
+
+                if monotonic() - last_report >= self.report_seconds:
+                    self.report()
+                    last_report = monotonic()
+        finally:
+            dropped = 0
+            while True:
+                try:
+                    self._queue.get_nowait()
+                    dropped += 1
+                except queue.Empty:
+                    break
+            if dropped:
+                logging.info(f"Stopping, {dropped} queued file(s) left for the next start")
+
+            for _ in threads:
+                self._queue.put(None)
+            for thread in threads:
+                thread.join()
+            self._collect()
+            executor.shutdown()
+            self.watcher.close()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+            self.report()
+
+    def _dispatch(self):
+        room = self._queue.maxsize - self._queue.qsize()
+        if room <= 0:
+            return
+        now = monotonic()
+        with self._lock:
+            running = set(self._running)
+        for path, first_seen in self.debouncer.ready(now, room, held=running):
+            with self._lock:
+                if path in self._running:
+                    # Picked up by a worker since the snapshot, waits for that run like the others
+                    self.debouncer.touch(path, now, settled=True)
+                    continue
+                if path in self._queued:
+                    continue
+                self._queued.add(path)
+            self._queue.put_nowait((path, first_seen, now))
+
+    def _work(self, executor: ProcessPoolExecutor):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            path, first_seen, queued = job
+            with self._lock:
+                self._queued.discard(path)
+                self._running.add(path)
+
+            started = monotonic()
+            try:
+                result, error = executor.submit(self.process, path).result(), None
+            except Exception as e:
+                result, error = None, e
+            self._results.put((path, result, error, first_seen, queued, started, monotonic()))
+
+    def _collect(self):
+        while True:
+            try:
+                path, result, error, first_seen, queued, started, finished = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            with self._lock:
+                self._running.discard(path)
+            if error is None:
+                self.processed += 1
+            elif isinstance(error, self.skip_errors):
+                self.skipped += 1
+                logging.info(f"Skipped {path}: {error}")
+            else:
+                self.failed += 1
+                logging.error(f"Failed to ingest {path}: {error}")
+            self.wait_time.add(int((started - queued) * 1e9))
+            self.work_time.add(int((finished - started) * 1e9))
+            self.latency.add(int((finished - first_seen) * 1e9))
+            self._dirty = True
+
+            if self.on_result is not None:
+                try:
+                    self.on_result(path, result, error)
+                except Exception as e:
+                    logging.error(f"Could not record {path}: {e}")
+
+        if self._dirty and self.idle and self.on_idle is not None:
+            self._dirty = False
+            self.on_idle()
+
+    @property
+    def idle(self) -> bool:
+        return not len(self.debouncer) and self._queue.empty() and not self._running
+
+    def metrics(self) -> dict:
+        def seconds(stats: FunctionStats) -> dict:
+            if not stats.count:
+                return {'count': 0}
+            return {'count': stats.count, 'mean_s': stats.total_ns / stats.count / 1e9, 'p50_s': stats.percentile(0.5),
+                    'p95_s': stats.percentile(0.95), 'max_s': stats.max_ns / 1e9}
+
+        return {
+            'updated':        datetime.now().isoformat(timespec='seconds'),
+            'directories':    self.directories,
+            'watcher':        type(self.watcher).__name__,
+            'uptime_s':       monotonic() - self.started,
+            'settling':       len(self.debouncer),
+            'queue_depth':    self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'in_flight':      len(self._running),
+            'processed':      self.processed,
+            'failed':         self.failed,
+            'skipped':        self.skipped,
+            'queue_wait':     seconds(self.wait_time),
+            'processing':     seconds(self.work_time),
+            'latency':        seconds(self.latency),
+        }
+
+    def report(self):
+        metrics = self.metrics()
+        latency = metrics['latency']
+        logging.info(f"Ingest: {metrics['settling']} settling, {metrics['queue_depth']}/{metrics['queue_capacity']} queued, "
+                     f"{metrics['in_flight']} in flight, {metrics['processed']} processed, {metrics['failed']} failed, {metrics['skipped']} skipped"
+                     + (f", latency p50 {latency['p50_s']:.1f}s p95 {latency['p95_s']:.1f}s" if latency['count'] else ""))
+        if self.status_file:
+            os.makedirs(os.path.dirname(self.status_file) or '.', exist_ok=True)
+            with open(self.status_file, 'w') as f:
+                json.dump(metrics, f, indent=2)
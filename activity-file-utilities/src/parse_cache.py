@@ -0,0 +1,232 @@
+from datetime import datetime, timedelta, timezone
+from time import time
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pandas as pd
+import pyarrow as pa
+import shutil
+import uuid
+
+HASH_CHUNK = 1024 * 1024
+
+
+class ParsedFileCache:
+    """
+    On-disk cache of parsed activity files (FIT/GPX), stored as Arrow IPC files.
+
+    Entries are keyed by the SHA-256 of the file bytes (hashed in chunks, see file_digest()) plus
+    the parser name and version, so the
+    same file opened from the browser, the uploader or processor.py is decoded only once, and
+    bumping a parser version invalidates its old entries. Cached frames are read back through a
+    memory map. Once the cache grows past `max_bytes`, the least recently used entries are evicted.
+
+    Args:
+    path (str): Cache directory.
+    max_bytes (int): Size bound of the cache directory.
+    """
+    CACHE_DIR = './userdata/parsed_cache'
+
+    def __init__(self, path: str = CACHE_DIR, max_bytes: int = 2 * 1024**3):
+        self.path      = path
+        self.max_bytes = max_bytes
+
+    def key(self, file, parser: str, version: str) -> str:
+        return f"{file_digest(file)}-{parser}-{version}"
+
+    def get(self, key: str, names: tuple):
+        entry = os.path.join(self.path, key)
+        if not all(os.path.isfile(os.path.join(entry, f"{name}.arrow")) for name in names):
+            return None
+
+        try:
+            frames = tuple(read_frame(os.path.join(entry, f"{name}.arrow")) for name in names)
+        except Exception as e:
+            logging.error(f"Discarding unreadable cache entry {key}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        # Mark as recently used for eviction
+        os.utime(entry, None)
+        return frames
+
+    def put(self, key: str, names: tuple, frames: tuple):
+        os.makedirs(self.path, exist_ok=True)
+        entry   = os.path.join(self.path, key)
+        staging = os.path.join(self.path, f".{key}.{uuid.uuid4().hex}.tmp")
+
+        # Written aside and renamed, so readers never see a half-written entry
+        os.makedirs(staging)
+        try:
+            for name, frame in zip(names, frames):
+                write_frame(frame, os.path.join(staging, f"{name}.arrow"))
+            os.rename(staging, entry)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self.evict()
+
+    def get_or_parse(self, file, parser: str, version: str, names: tuple, parse):
+        """
+        Returns the cached frames for a file (path, bytes or file-like object), or runs parse() and
+        caches its result. A single frame is returned as-is when `names` has one element.
+        """
+        key    = self.key(file, parser, version)
+        frames = self.get(key, names)
+        if frames is None:
+            parsed = parse()
+            frames = parsed if len(names) > 1 else (parsed,)
+            try:
+                self.put(key, names, frames)
+            except Exception as e:
+                logging.error(f"Could not cache {parser} frames: {e}")
+        else:
+            logging.debug(f"Parsed {parser} frames served from cache ({key})")
+
+        return frames if len(names) > 1 else frames[0]
+
+    def entries(self) -> list:
+        """Returns (path, size in bytes, last used) for every cache entry, least recently used first."""
+        if not os.path.isdir(self.path):
+            return []
+
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                entries.append((entry.path, size, entry.stat().st_mtime))
+        return sorted(entries, key=lambda e: e[2])
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        entries = self.entries()
+        total   = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def purge(self, older_than_seconds: float = None) -> int:
+        """Removes every entry (or only those unused for `older_than_seconds`), and returns how many were removed."""
+        removed = 0
+        for path, _, last_used in self.entries():
+            if older_than_seconds is None or time() - last_used > older_than_seconds:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+
+        # Leftovers from interrupted writes
+        if os.path.isdir(self.path):
+            for entry in os.scandir(self.path):
+                if entry.name.startswith('.') and entry.name.endswith('.tmp'):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+        return removed
+
+def file_digest(file) -> str:
+    """
+    SHA-256 of a path, bytes or file-like object. Files are read in chunks, so large ones are
+    never held in memory, and file objects are rewound afterwards.
+    """
+    if isinstance(file, (bytes, bytearray)):
+        return hashlib.sha256(file).hexdigest()
+
+    digest = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            while chunk := f.read(HASH_CHUNK):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    while chunk := file.read(HASH_CHUNK):
+        digest.update(chunk.encode() if isinstance(chunk, str) else chunk)
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return digest.hexdigest()
+
+def write_frame(df: pd.DataFrame, path: str):
+    # Object columns mixing types (e.g. FIT enums that fall back to raw ints) cannot be typed by
+    # Arrow; those are stored as strings. Only plain JSON goes in the schema metadata, so opening
+    # a cache file never unpickles anything.
+    df        = df.reset_index(drop=True)
+    stringed  = []
+    timezones = {}
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.DatetimeTZDtype):
+            # Arrow only understands named time zones (gpxpy uses its own tzinfo); stored as UTC and
+            # converted back on read
+            timezones[column] = timezone_spec(df[column].dt.tz)
+        elif df[column].dtype == object:
+            try:
+                pa.array(df[column], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                stringed.append(column)
+
+    encoded = df.copy() if stringed or timezones else df
+    for column in stringed:
+        encoded[column] = pd.Series([None if pd.isna(value) else str(value) for value in df[column]], dtype=object)
+    for column in timezones:
+        encoded[column] = df[column].dt.tz_convert('UTC')
+
+    table    = pa.Table.from_pandas(encoded, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'string_columns'] = json.dumps(stringed).encode()
+    metadata[b'timezones']      = json.dumps(timezones).encode()
+    table    = table.replace_schema_metadata(metadata)
+
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+def read_frame(path: str) -> pd.DataFrame:
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    metadata = table.schema.metadata or {}
+    if b'timezones' not in metadata or b'string_columns' not in metadata:
+        # Written by an older version (pickled metadata), never loaded
+        raise ValueError(f"{path} is not in the current cache format")
+
+    timezones = json.loads(metadata[b'timezones'])
+    df        = table.to_pandas()
+    for column, spec in timezones.items():
+        df[column] = df[column].dt.tz_convert(timezone_from_spec(spec))
+    return df
+
+def timezone_spec(tz) -> dict:
+    # A named zone, or the fixed UTC offset of any other tzinfo (e.g. gpxpy's SimpleTZ)
+    name = getattr(tz, 'key', None) or getattr(tz, 'zone', None)
+    if name:
+        return {'name': name}
+    return {'offset_minutes': int(tz.utcoffset(datetime.now()).total_seconds() // 60)}
+
+def timezone_from_spec(spec: dict):
+    if 'name' in spec:
+        return spec['name']
+    return timezone(timedelta(minutes=spec['offset_minutes']))
+
+PARSED_CACHE = ParsedFileCache()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect or purge the parsed activity file cache")
+    parser.add_argument('--path', default=ParsedFileCache.CACHE_DIR, help="cache directory")
+    parser.add_argument('--purge', action='store_true', help="remove cached entries")
+    parser.add_argument('--older-than-days', type=float, default=None, help="with --purge, only remove entries unused for this many days")
+    args = parser.parse_args()
+
+    cache = ParsedFileCache(args.path)
+    if args.purge:
+        older_than = args.older_than_days * 24 * 3600 if args.older_than_days is not None else None
+        print(f"Removed {cache.purge(older_than)} cached entries from {args.path}")
+    else:
+        entries = cache.entries()
+        print(f"{len(entries)} cached entries, {sum(size for _, size, _ in entries) / 1024**2:.1f} MB in {args.path}")
@@ -0,0 +1,252 @@
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from time import perf_counter_ns
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+
+PROFILE_DIR = './userdata/profiles'
+
+# Latency histograms use power-of-two buckets: bucket i counts calls of [2**(i-1), 2**i) ns
+BUCKETS = 64
+
+
+class FunctionStats:
+    __slots__ = ('count', 'total_ns', 'min_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.count    = 0
+        self.total_ns = 0
+        self.min_ns   = None
+        self.max_ns   = 0
+        self.buckets  = [0] * BUCKETS
+
+    def add(self, elapsed_ns: int):
+        self.count    += 1
+        self.total_ns += elapsed_ns
+        self.min_ns    = elapsed_ns if self.min_ns is None else min(self.min_ns, elapsed_ns)
+        self.max_ns    = max(self.max_ns, elapsed_ns)
+        self.buckets[min(elapsed_ns.bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound, in seconds, of the histogram bucket holding the q-th quantile."""
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(2**index, self.max_ns) / 1e9
+        return self.max_ns / 1e9
+
+class Profiler:
+    """
+    Per-function call counts and latency histograms of the functions decorated with @profiled.
+
+    Disabled by default, and then free: module-level functions are left undecorated, and
+    enable() swaps the measuring wrappers into their modules (disable() swaps them back), so
+    callers going through the module (h.get_summary, ...) pick up the change. Set the
+    ACTIVITY_PROFILING environment variable, call enable(), or use the Diagnostics page to turn
+    it on. While enabled, calls slower than `slow_seconds` are also logged.
+
+    Args:
+    enabled (bool): Whether calls are recorded.
+    slow_seconds (float): Calls taking longer than this are logged.
+    """
+    def __init__(self, enabled: bool = False, slow_seconds: float = 1.0):
+        self.enabled       = enabled
+        self.slow_ns       = int(slow_seconds * 1e9)
+        self._stats        = {}
+        self._functions    = []
+        self._lock         = threading.Lock()
+        self._page_capture = False
+
+    def register(self, module: str, name: str, function, wrapper):
+        self._functions.append((module, name, function, wrapper))
+
+    def _install(self, wrapped: bool):
+        for module, name, function, wrapper in self._functions:
+            module = sys.modules.get(module)
+            if module is not None and getattr(module, name, None) in (function, wrapper):
+                setattr(module, name, wrapper if wrapped else function)
+
+    def enable(self):
+        self.enabled = True
+        self._install(True)
+
+    def disable(self):
+        self.enabled = False
+        self._install(False)
+
+    def stats(self, name: str) -> FunctionStats:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = FunctionStats()
+            return stats
+
+    def record(self, name: str, stats: FunctionStats, elapsed_ns: int):
+        with self._lock:
+            stats.add(elapsed_ns)
+        if elapsed_ns > self.slow_ns:
+            logging.info(f"Long running function detected: {name} {elapsed_ns / 1e9:.2f} secs")
+
+    def snapshot(self) -> dict:
+        """Raw counters per function, as accepted by merge() (e.g. to collect worker processes' stats)."""
+        with self._lock:
+            return self._snapshot()
+
+    def drain(self) -> dict:
+        """Returns snapshot() and resets the counters."""
+        with self._lock:
+            snapshot = self._snapshot()
+            self._reset()
+        return snapshot
+
+    def _snapshot(self) -> dict:
+        return {name: {'count': s.count, 'total_ns': s.total_ns, 'min_ns': s.min_ns, 'max_ns': s.max_ns,
+                       'buckets': {i: c for i, c in enumerate(s.buckets) if c}}
+                for name, s in self._stats.items() if s.count}
+
+    def merge(self, snapshot: dict):
+        for name, other in snapshot.items():
+            stats = self.stats(name)
+            with self._lock:
+                stats.count    += other['count']
+                stats.total_ns += other['total_ns']
+                stats.max_ns    = max(stats.max_ns, other['max_ns'])
+                if other['min_ns'] is not None:
+                    stats.min_ns = other['min_ns'] if stats.min_ns is None else min(stats.min_ns, other['min_ns'])
+                for index, count in other['buckets'].items():
+                    stats.buckets[int(index)] += count
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        # The wrappers hold on to their stats objects, so they are cleared rather than dropped
+        for stats in self._stats.values():
+            stats.__init__()
+
+    def report(self) -> list:
+        """
+        Aggregates per function, slowest total first.
+
+        Returns:
+        list: One dict per function with 'function', 'calls', 'total_s', 'mean_s', 'min_s', 'p50_s',
+        'p95_s', 'p99_s', 'max_s' (percentiles are histogram bucket upper bounds) and 'histogram',
+        a list of {'le_s': bucket upper bound, 'count'} for the non-empty buckets.
+        """
+        with self._lock:
+            rows = [{
+                'function':  name,
+                'calls':     s.count,
+                'total_s':   s.total_ns / 1e9,
+                'mean_s':    s.total_ns / s.count / 1e9,
+                'min_s':     s.min_ns / 1e9,
+                'p50_s':     s.percentile(0.50),
+                'p95_s':     s.percentile(0.95),
+                'p99_s':     s.percentile(0.99),
+                'max_s':     s.max_ns / 1e9,
+                'histogram': [{'le_s': 2**i / 1e9, 'count': c} for i, c in enumerate(s.buckets) if c],
+            } for name, s in self._stats.items() if s.count]
+        return sorted(rows, key=lambda row: row['total_s'], reverse=True)
+
+    def export_json(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'functions': self.report()}, f, indent=2)
+        return path
+
+    def arm_page_capture(self):
+        """Makes the next run of a page calling begin_page_capture() record a cProfile capture."""
+        self._page_capture = True
+
+    def take_page_capture(self) -> bool:
+        with self._lock:
+            armed, self._page_capture = self._page_capture, False
+        return armed
+
+    @property
+    def page_capture_armed(self) -> bool:
+        return self._page_capture
+
+PROFILER = Profiler(enabled=bool(os.environ.get('ACTIVITY_PROFILING')))
+
+def profiled(f):
+    """Records the calls of f in PROFILER (monotonic clock, nanoseconds) while profiling is enabled."""
+    name  = f"{f.__module__}.{f.__qualname__}"
+    stats = PROFILER.stats(name)
+
+    @wraps(f)
+    def wrap(*args, **kw):
+        ts = perf_counter_ns()
+        try:
+            return f(*args, **kw)
+        finally:
+            PROFILER.record(name, stats, perf_counter_ns() - ts)
+
+    if f.__qualname__ != f.__name__:
+        # Methods and nested functions cannot be swapped in and out, they check the flag instead
+        @wraps(f)
+        def checked(*args, **kw):
+            return wrap(*args, **kw) if PROFILER.enabled else f(*args, **kw)
+        return checked
+
+    PROFILER.register(f.__module__, f.__name__, f, wrap)
+    return wrap if PROFILER.enabled else f
+
+def capture_path(name: str, directory: str = PROFILE_DIR, extension: str = 'prof') -> str:
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}")
+
+def save_capture(profile: cProfile.Profile, name: str, directory: str = PROFILE_DIR) -> str:
+    path = capture_path(name, directory)
+    profile.dump_stats(path)
+    logging.info(f"cProfile capture saved to {path}")
+    return path
+
+@contextmanager
+def capture(name: str, directory: str = PROFILE_DIR):
+    """Records a cProfile capture of the enclosed code (current thread) into directory/<name>-<time>.prof."""
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        save_capture(profile, name, directory)
+
+def begin_page_capture(name: str):
+    """
+    Starts a cProfile capture of this page run if one was requested (see Profiler.arm_page_capture),
+    and returns the handle to pass to end_page_capture() at the end of the page.
+    """
+    if not PROFILER.page_capture_armed or not PROFILER.take_page_capture():
+        return None
+    profile = cProfile.Profile()
+    profile.enable()
+    return name, profile
+
+def end_page_capture(handle) -> str:
+    if handle is None:
+        return None
+    name, profile = handle
+    profile.disable()
+    return save_capture(profile, name)
+
+def list_captures(directory: str = PROFILE_DIR) -> list:
+    if not os.path.isdir(directory):
+        return []
+    return sorted((f for f in os.listdir(directory) if f.endswith('.prof')), reverse=True)
+
+def capture_summary(path: str, limit: int = 30, sort: str = 'cumulative') -> str:
+    output = io.StringIO()
+    pstats.Stats(path, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
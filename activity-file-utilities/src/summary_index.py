@@ -0,0 +1,197 @@
+from datetime import date, datetime
+import argparse
+import json
+import logging
+import os
+import pandas as pd
+import sqlite3
+
+INDEX_FILE = 'activity_index.sqlite'
+
+# Bookkeeping columns, the summary fields follow them in the order they were first seen
+KEY_COLUMNS = ('activity_id', 'source_file', 'activity_date')
+
+
+class SummaryIndex:
+    """
+    Consolidated index of the activity summaries written by processor.py, stored in SQLite.
+
+    One row per activity, keyed by its activity id, with one column per summary field (columns
+    are added as new fields show up). The local date of the activity start is kept in an indexed
+    'activity_date' column, so readers can load a date range and only the columns they need
+    instead of opening every summary_*.json file.
+
+    Args:
+    path (str): SQLite database file.
+    """
+    def __init__(self, path: str):
+        self.path      = path
+        self._conn     = None
+        self._conn_pid = None
+        self._columns  = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared across processes (e.g. the processor.py worker pool)
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn     = sqlite3.connect(self.path, timeout=30)
+            self._conn_pid = os.getpid()
+            self._columns  = None
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS activities (
+                    activity_id   TEXT PRIMARY KEY,
+                    source_file   TEXT,
+                    activity_date TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS activities_date ON activities (activity_date)")
+        return self._conn
+
+    def columns(self) -> list:
+        """Returns every column of the index, bookkeeping columns first."""
+        if self._columns is None:
+            self._columns = [row[1] for row in self._connect().execute("PRAGMA table_info(activities)")]
+        return list(self._columns)
+
+    def fields(self) -> list:
+        """Returns the summary fields stored in the index."""
+        return [c for c in self.columns() if c not in KEY_COLUMNS]
+
+    def _add_columns(self, conn: sqlite3.Connection, names):
+        # Summary fields keep the type of their values, so no column type is declared
+        known = set(self.columns())
+        for name in names:
+            if name not in known:
+                conn.execute(f"ALTER TABLE activities ADD COLUMN {quote(name)}")
+                self._columns.append(name)
+                known.add(name)
+
+    def add(self, records: dict, source_file: str = None) -> int:
+        """
+        Inserts or replaces activities, given as summary JSON content: {activity_id: {field: value}}.
+
+        Returns:
+        int: Number of activities written.
+        """
+        conn = self._connect()
+        with conn:
+            for activity_id, summary in records.items():
+                self._add_columns(conn, summary.keys())
+                row = {'activity_id': activity_id, 'source_file': source_file,
+                       'activity_date': activity_date(summary.get('activity_start_time')), **summary}
+                conn.execute(
+                    f"INSERT OR REPLACE INTO activities ({', '.join(quote(c) for c in row)}) VALUES ({', '.join('?' * len(row))})",
+                    [sqlite_value(v) for v in row.values()]
+                )
+        return len(records)
+
+    def add_summary_file(self, summary_file: str, source_file: str = None) -> int:
+        with open(summary_file, 'r') as f:
+            records = json.load(f)
+        if source_file is None:
+            # summary_<activity file>.json
+            source_file = os.path.basename(summary_file).removeprefix('summary_').removesuffix('.json')
+        return self.add(records, source_file)
+
+    def import_json_files(self, directory: str) -> int:
+        """
+        Imports every summary JSON file of a directory (the layout processor.py used to be read
+        from), and returns the number of activities imported.
+        """
+        count = 0
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith('.json'):
+                continue
+            try:
+                count += self.add_summary_file(os.path.join(directory, file_name))
+            except (json.JSONDecodeError, AttributeError) as e:
+                logging.error(f"Skipping {file_name}, not a summary file: {e}")
+        logging.info(f"Imported {count} activities from {directory} into {self.path}")
+        return count
+
+    def load(self, columns: list = None, start=None, end=None) -> pd.DataFrame:
+        """
+        Loads activities from the index.
+
+        Args:
+        columns (list): Columns to read; defaults to 'activity_id' and every summary field.
+        start: First local activity date to include (date, datetime or 'YYYY-MM-DD'), None for no bound.
+        end: Last local activity date to include, None for no bound.
+
+        Returns:
+        pd.DataFrame: One row per activity, ordered by start time.
+        """
+        known   = self.columns()
+        columns = list(columns) if columns is not None else ['activity_id', *self.fields()]
+        missing = [c for c in columns if c not in known]
+        if missing:
+            raise KeyError(f"Unknown columns in {self.path}: {missing}")
+
+        where, params = [], []
+        if start is not None:
+            where.append("activity_date >= ?")
+            params.append(activity_date(start))
+        if end is not None:
+            where.append("activity_date <= ?")
+            params.append(activity_date(end))
+
+        query = f"SELECT {', '.join(quote(c) for c in columns)} FROM activities"
+        if where:
+            query += f" WHERE {' AND '.join(where)}"
+        order  = ['activity_date', 'activity_start_time', 'activity_id'] if 'activity_start_time' in known else ['activity_date', 'activity_id']
+        query += f" ORDER BY {', '.join(order)}"
+
+        rows = self._connect().execute(query, params).fetchall()
+        return pd.DataFrame(rows, columns=columns)
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM activities").fetchone()[0]
+
+    def __contains__(self, activity_id: str) -> bool:
+        return self._connect().execute("SELECT 1 FROM activities WHERE activity_id = ?", (activity_id,)).fetchone() is not None
+
+def quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+def sqlite_value(value):
+    # numpy scalars and nested values (should a summary ever contain them) are not SQLite types
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+def activity_date(value) -> str:
+    """Local calendar date ('YYYY-MM-DD') of a start time as written in the summaries, or of a date bound."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, str):
+        # Summaries hold local ISO timestamps ('2024-09-21T08:12:03-05:00'), the date is their prefix
+        return value[:10]
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d')
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+def open_index(directory: str) -> SummaryIndex:
+    """
+    Returns the index of an activity directory, importing the existing summary JSON files the
+    first time (once the index exists, processor.py keeps it up to date).
+    """
+    path  = os.path.join(directory, INDEX_FILE)
+    fresh = not os.path.isfile(path)
+    index = SummaryIndex(path)
+    if fresh:
+        index.import_json_files(directory)
+    return index
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or rebuild the activity summary index of a directory")
+    parser.add_argument('directory', help="directory containing the summary_*.json files")
+    parser.add_argument('--rebuild', action='store_true', help="import every summary JSON file again, even if the index exists")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s [%(levelname)s] [%(module)s.%(funcName)s] - %(message)s', level=logging.INFO)
+    index = open_index(args.directory)
+    if args.rebuild:
+        index.import_json_files(args.directory)
+    print(f"{len(index)} activities in {index.path}")
@@ -0,0 +1,114 @@
+import logging
+import numpy as np
+import pandas as pd
+import pytz
+import threading
+
+DEFAULT_TIMEZONE = 'US/Central'
+
+
+class TimezoneResolver:
+    """
+    Resolves the time zone of a location, memoized on a lat/lon grid.
+
+    Coordinates are quantized to `precision` decimal places (2 is ~1km) and each grid cell is
+    looked up once with TimezoneFinder, at the cell's own coordinates so the answer only depends
+    on the cell. Zone objects are kept loaded. Locations without a known time zone (oceans,
+    indoor activities without coordinates, lookup errors) fall back to `default`.
+
+    Args:
+    precision (int): Number of decimal places kept from the coordinates.
+    default (str): Fallback time zone name.
+    finder: TimezoneFinder-like object with timezone_at(lng=, lat=); created on first use if None.
+    """
+    def __init__(self, precision: int = 2, default: str = DEFAULT_TIMEZONE, finder=None):
+        self.precision = precision
+        self.default   = default
+        self._finder   = finder
+        self._cells    = {}
+        self._zones    = {}
+        self._lock     = threading.Lock()
+
+    @property
+    def finder(self):
+        # Loading the timezone polygons takes a while, only pay for it when needed
+        if self._finder is None:
+            with self._lock:
+                if self._finder is None:
+                    from timezonefinder import TimezoneFinder
+                    self._finder = TimezoneFinder()
+        return self._finder
+
+    def cell(self, latitude: float, longitude: float) -> tuple:
+        scale = 10 ** self.precision
+        return round(latitude * scale), round(longitude * scale)
+
+    def zone_name(self, latitude: float = None, longitude: float = None) -> str:
+        if latitude is None or longitude is None or pd.isna(latitude) or pd.isna(longitude):
+            # Fallback for indoor activities
+            return self.default
+
+        cell = self.cell(latitude, longitude)
+        name = self._cells.get(cell)
+        if name is None:
+            scale = 10 ** self.precision
+            try:
+                name = self.finder.timezone_at(lng=cell[1] / scale, lat=cell[0] / scale) or self.default
+            except Exception as e:
+                logging.error(f"Error determining timezone: {e}")
+                name = self.default
+            self._cells[cell] = name
+        return name
+
+    def zone(self, name: str):
+        tz = self._zones.get(name)
+        if tz is None:
+            tz = self._zones[name] = pytz.timezone(name)
+        return tz
+
+    def localize(self, timestamp, latitude: float = None, longitude: float = None):
+        """Converts a naive UTC timestamp to the local time at the given location."""
+        utc_time = pytz.utc.localize(timestamp)
+        return utc_time.astimezone(self.zone(self.zone_name(latitude, longitude)))
+
+    def zone_names(self, latitudes, longitudes) -> np.ndarray:
+        """Vectorized zone_name(): one lookup per distinct grid cell."""
+        latitudes  = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        names      = np.full(len(latitudes), self.default, dtype=object)
+
+        known = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        if known.any():
+            scale        = 10 ** self.precision
+            cells        = np.column_stack((np.round(latitudes[known] * scale), np.round(longitudes[known] * scale)))
+            unique, back = np.unique(cells, axis=0, return_inverse=True)
+            resolved     = np.array([self.zone_name(lat / scale, lon / scale) for lat, lon in unique], dtype=object)
+            names[known] = resolved[back.ravel()]
+        return names
+
+    def localize_column(self, timestamps: pd.Series, latitudes=None, longitudes=None) -> pd.Series:
+        """
+        Converts a column of naive UTC timestamps to local times, one time zone per row.
+
+        Args:
+        timestamps (pd.Series): Naive UTC timestamps.
+        latitudes: Latitude per row in degrees, NaN/None (or no array at all) for the default time zone.
+        longitudes: Longitude per row in degrees.
+
+        Returns:
+        pd.Series: Time zone aware timestamps (object dtype, as rows may differ in time zone).
+        """
+        timestamps = pd.Series(pd.to_datetime(timestamps)).reset_index(drop=True)
+        if latitudes is None or longitudes is None:
+            names = np.full(len(timestamps), self.default, dtype=object)
+        else:
+            names = self.zone_names(pd.Series(latitudes, dtype=float), pd.Series(longitudes, dtype=float))
+
+        utc     = pd.DatetimeIndex(timestamps).tz_localize('UTC')
+        results = np.empty(len(timestamps), dtype=object)
+        for name in pd.unique(names):
+            rows          = names == name
+            results[rows] = utc[rows].tz_convert(self.zone(name)).astype(object)
+        return pd.Series(results, index=timestamps.index)
+
+RESOLVER = TimezoneResolver()
@@ -0,0 +1,169 @@
+from datetime import date
+import numpy as np
+import os
+import pandas as pd
+import sqlite3
+
+CTL_DAYS = 42
+ATL_DAYS = 7
+
+
+class TrainingLoad:
+    """
+    Daily fitness (CTL), fatigue (ATL) and form (TSB) over the activities of a summary index,
+    stored next to them in the same SQLite file.
+
+    CTL and ATL are exponentially weighted averages of the daily training stress score, with
+    time constants of `ctl_days` and `atl_days`; TSB is the previous day's CTL minus ATL. Each
+    day's values only depend on the day before, so refresh() recomputes from the earliest day
+    whose TSS changed (a new or back-filled activity) onward, and only extends the series to
+    today otherwise.
+
+    Args:
+    path (str): SQLite file of the summary index (see src/summary_index.py).
+    ctl_days (int): Time constant of CTL, in days.
+    atl_days (int): Time constant of ATL, in days.
+    """
+    def __init__(self, path: str, ctl_days: int = CTL_DAYS, atl_days: int = ATL_DAYS):
+        self.path      = path
+        self.ctl_decay = np.exp(-1 / ctl_days)
+        self.atl_decay = np.exp(-1 / atl_days)
+        self._conn     = None
+        self._conn_pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared across processes (e.g. the processor.py worker pool)
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn     = sqlite3.connect(self.path, timeout=30)
+            self._conn_pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS training_load (
+                    day TEXT PRIMARY KEY,
+                    tss REAL NOT NULL,
+                    ctl REAL NOT NULL,
+                    atl REAL NOT NULL,
+                    tsb REAL NOT NULL
+                )
+            """)
+        return self._conn
+
+    def has_tss(self) -> bool:
+        return 'training_stress_score' in [row[1] for row in self._connect().execute("PRAGMA table_info(activities)")]
+
+    def activity_days(self) -> tuple:
+        """First and last local activity dates of the index, (None, None) without activities."""
+        if not self.has_tss():
+            return None, None
+        return self._connect().execute("SELECT MIN(activity_date), MAX(activity_date) FROM activities").fetchone()
+
+    def daily_tss(self, start: str = None) -> dict:
+        """Training stress score per local activity date ('YYYY-MM-DD'), from `start` on."""
+        conn = self._connect()
+        if not self.has_tss():
+            return {}
+
+        query  = "SELECT activity_date, SUM(training_stress_score) FROM activities WHERE activity_date IS NOT NULL"
+        params = []
+        if start is not None:
+            query += " AND activity_date >= ?"
+            params.append(start)
+        rows = conn.execute(query + " GROUP BY activity_date ORDER BY activity_date", params).fetchall()
+        return {day: float(tss or 0) for day, tss in rows}
+
+    def stale_from(self, today: str = None) -> str:
+        """
+        Returns the first day whose stored values are out of date, or None when the series is current:
+        the earliest day whose TSS no longer matches the activities, else the day after the last stored one.
+        """
+        today = today or date.today().isoformat()
+        conn  = self._connect()
+        if self.has_tss():
+            # Days whose activities add up to a different TSS than stored, or that have no stored row
+            changed = conn.execute("""
+                SELECT MIN(day) FROM (
+                    SELECT a.day FROM (
+                        SELECT activity_date AS day, COALESCE(SUM(training_stress_score), 0) AS tss
+                        FROM activities WHERE activity_date IS NOT NULL GROUP BY activity_date
+                    ) a LEFT JOIN training_load t ON t.day = a.day
+                    WHERE t.day IS NULL OR ABS(t.tss - a.tss) > 1e-9
+                    UNION ALL
+                    SELECT t.day FROM training_load t
+                    WHERE t.tss != 0 AND NOT EXISTS (SELECT 1 FROM activities WHERE activity_date = t.day)
+                )
+            """).fetchone()[0]
+        else:
+            changed = conn.execute("SELECT MIN(day) FROM training_load WHERE tss != 0").fetchone()[0]
+        if changed is not None:
+            return changed
+
+        last = conn.execute("SELECT MAX(day) FROM training_load").fetchone()[0]
+        if last is not None and last < today:
+            return (pd.Timestamp(last) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        return None
+
+    def refresh(self, changed_from: str = None, today: str = None) -> int:
+        """
+        Brings the series up to date, recomputing from `changed_from` (or the first stale day,
+        when not given) through today. Returns the number of days computed.
+        """
+        today = today or date.today().isoformat()
+        start = changed_from or self.stale_from(today)
+        if start is None:
+            return 0
+
+        conn        = self._connect()
+        first, last = conn.execute("SELECT MIN(day), MAX(day) FROM training_load").fetchone()
+        activities  = self.activity_days()
+        if activities[0] is not None and (first is None or activities[0] < first):
+            # The series starts on the first activity, nothing before it needs computing
+            first = activities[0]
+        if first is None:
+            return 0
+        start = max(start, first)
+        if last is not None:
+            # Never leave a gap after the stored days
+            start = min(start, (pd.Timestamp(last) + pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+
+        previous = conn.execute("SELECT ctl, atl FROM training_load WHERE day < ? ORDER BY day DESC LIMIT 1", (start,)).fetchone()
+        ctl, atl = previous if previous else (0.0, 0.0)
+
+        end  = max(today, activities[1] or today)
+        days = pd.date_range(start, end, freq='D').strftime('%Y-%m-%d').tolist()
+        tss  = self.daily_tss(start)
+        load = [tss.get(day, 0.0) for day in days]
+
+        rows = []
+        for day, value in zip(days, load):
+            tsb  = ctl - atl
+            ctl  = ctl * self.ctl_decay + value * (1 - self.ctl_decay)
+            atl  = atl * self.atl_decay + value * (1 - self.atl_decay)
+            rows.append((day, value, ctl, atl, tsb))
+
+        with conn:
+            conn.execute("DELETE FROM training_load WHERE day >= ?", (start,))
+            conn.executemany("INSERT INTO training_load VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def series(self, start=None, end=None) -> pd.DataFrame:
+        """
+        Loads the stored series between two dates (inclusive, date or 'YYYY-MM-DD', None for no bound).
+
+        Returns:
+        pd.DataFrame: 'day' (datetime), 'tss', 'ctl', 'atl' and 'tsb', one row per day.
+        """
+        query, params = "SELECT day, tss, ctl, atl, tsb FROM training_load", []
+        where = []
+        if start is not None:
+            where.append("day >= ?")
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            where.append("day <= ?")
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        if where:
+            query += f" WHERE {' AND '.join(where)}"
+
+        rows = self._connect().execute(query + " ORDER BY day", params).fetchall()
+        df   = pd.DataFrame(rows, columns=['day', 'tss', 'ctl', 'atl', 'tsb'])
+        df['day'] = pd.to_datetime(df['day'])
+        return df
@@ -1,152 +1,123 @@
 from datetime import datetime
-from functools import wraps
-from geopy.distance import geodesic
-from geopy.exc import GeocoderTimedOut
-from geopy.geocoders import OpenCage
-from math import radians, sin, cos, sqrt, atan2
-from time import time
+from src.activity_summary import ActivitySummary
+from concurrent.futures import Future
+from src.geocoding import OPENCAGE_BURST, OPENCAGE_RATE, GeocodeCache, GeocodingClient, OpenCageBackend, TokenBucket
+from src.inference import get_aerobic_te_model
+from src.fit_reader import read_fit_columns
+from src.gpx_reader import read_gpx_columns
+from src.parse_cache import PARSED_CACHE
+from src.profiling import profiled
 from typing import Literal
 import altair as alt
-import fitparse
 import folium
-import gpxpy
+import hashlib
+import io
 import json
+import numpy as np
 import os
 import pandas as pd
 import logging
-import joblib
 
-os.environ['TF_CPP_MIN_LOG_LEVEL']  = '3'
-os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
-import tensorflow as tf
-from tensorflow.keras.models import load_model
+# Bump these whenever a parser's output changes, so cached frames from the old version are not reused
+FIT_PARSER_VERSION = '3'
+GPX_PARSER_VERSION = '2'
+
+# Most points a chart sends to the browser, see downsample_lttb()
+CHART_MAX_POINTS = 1000
+
+# FIT message types parse_fit_file returns, in order
+FIT_MESSAGES = ('record', 'event', 'session')
+
+# Compact dtypes of the record fields, from their FIT profile base types, see compact_frame()
+RECORD_DTYPES = {
+    'heart_rate':        'uint8',
+    'cadence':           'uint8',
+    'power':             'uint16',
+    'temperature':       'int8',
+    'position_lat':      'int32',
+    'position_long':     'int32',
+    'speed':             'float32',
+    'enhanced_speed':    'float32',
+    'altitude':          'float32',
+    'enhanced_altitude': 'float32',
+}
+
+# Largest integer a float32 holds exactly
+FLOAT32_EXACT = 2**24
 
 logging.basicConfig(format='%(asctime)s [%(levelname)s] [%(module)s.%(funcName)s] [%(threadName)s] - %(message)s', level=logging.INFO)
 
-def timing(f):
-    @wraps(f)
-    def wrap(*args, **kw):
-        ts = time()
-        result = f(*args, **kw)
-        te = time()
-        tt = te-ts
-        if tt > 1:
-            logging.info("""
-------------------------------------------
-Long running function detected.
-Function: {}\t{} secs
-------------------------------------------
-                         """.format(f.__name__, round(tt,2)))
-        return result
-    return wrap
-
-@timing
 def haversine(lat1, lon1, lat2, lon2):
     # Radius of Earth in kilometers
     R = 6371.0
     
-    # Convert decimal degrees to radians
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    # Convert decimal degrees to radians; works on scalars and on whole arrays of points alike
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
     
     # The haversine formula determines the great-circle distance between two points on a sphere given their longitudes and latitudes.
     # https://en.wikipedia.org/wiki/Haversine_formula
     dlat = lat2 - lat1
     dlon = lon2 - lon1
-    a    = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    c    = 2 * atan2(sqrt(a), sqrt(1 - a))
+    a    = np.sin(dlat / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2)**2
+    c    = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
     
     # Distance in meters
     distance = R * c * 1000
     
     return distance
 
-@timing
+def file_source(file):
+    # What the decoders read: paths and (rewound) file objects as they are, bytes as a stream
+    if isinstance(file, (bytes, bytearray)):
+        return io.BytesIO(file)
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return file
+
+@profiled
 def gpx_to_dataframe(gpx_file) -> pd.DataFrame:
-    NAMESPACES = {'ns3': 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'}
-    gpx  = gpxpy.parse(gpx_file)
-    data = {
-        'latitude': [],
-        'longitude': [],
-        'elevation': [],
-        'time': [],
-        'temperature': [],
-        'heart_rate': [],
-        'cadence': [],
-        'distance': [],
-        'speed': [],  # meters / second
-        'power': []
-    }
-    
-    # Iterate through track points in all tracks and segments
-    previous_point = None
-    previous_time = None
-    for track in gpx.tracks:
-        for segment in track.segments:
-            for point in segment.points:
-                # Basic trackpoint data
-                data['latitude'].append(point.latitude)
-                data['longitude'].append(point.longitude)
-                data['elevation'].append(point.elevation * 3.281) #in feet
-                data['time'].append(point.time)
-                
-                # Initialize default None values for optional extensions
-                atemp = None
-                hr    = None
-                cad   = None
-                pwr   = None
-
-                # Check for extensions and extract additional attributes if present
-                if point.extensions:
-                    for ext in point.extensions:
-                        if ext.tag == 'power':  # Check if the tag is exactly 'power'
-                            pwr = int(ext.text)
-                        
-                        hr_el = ext.find('ns3:hr', NAMESPACES)
-                        if hr_el is not None:
-                            hr = int(hr_el.text)
-                        else:
-                            hr = None
-                        
-                        cad_el = ext.find('ns3:cad', NAMESPACES)
-                        if cad_el is not None:
-                            cad = int(cad_el.text)
-                        else:
-                            cad = None
-                        
-                # Append the extension attributes to the data lists
-                # Farenheit temperature
-                data['temperature'].append(((atemp * 9/5) + 32) if atemp is not None else 0)
-                
-                data['heart_rate'].append(hr)
-                data['cadence'].append(cad)
-                data['power'].append(pwr)
-                
-                # Calculate the distance from the previous point
-                if previous_point is not None:
-                    dist      = haversine(previous_point['latitude'], previous_point['longitude'], point.latitude, point.longitude)
-                    time_diff = (point.time - previous_time).total_seconds()
-                    
-                    # Calculate speed (miles per hour)
-                    speed = dist / time_diff * 2.237 if time_diff > 0 else 0
-                else:
-                    dist  = 0
-                    speed = 0
-                
-                # Append the calculated values
-                data['distance'].append(dist)
-                data['speed'].append(speed)
-                
-                # Update the previous point and time
-                previous_point = {
-                    'latitude': point.latitude,
-                    'longitude': point.longitude
-                }
-                previous_time = point.time
-    
-    df = pd.DataFrame(data)
-    return df
+    # Hashed in chunks and decoded from the file itself, so memory does not grow with the file size
+    return PARSED_CACHE.get_or_parse(gpx_file, 'gpx', GPX_PARSER_VERSION, ('track',), lambda: decode_gpx(file_source(gpx_file)))
+
+def decode_gpx(gpx_file) -> pd.DataFrame:
+    track = read_gpx_columns(gpx_file)
+    lat   = track['latitude']
+    lon   = track['longitude']
+
+    # Distance and speed from the previous point, across all tracks and segments
+    distance     = np.zeros(len(lat))
+    time_diff    = np.zeros(len(lat))
+    distance[1:] = haversine(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    if len(lat) > 1:
+        time_diff[1:] = (track['time'][1:] - track['time'][:-1]).total_seconds()
+
+    # Speed (miles per hour)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed = np.where(time_diff > 0, distance / time_diff * 2.237, 0)
+
+    return pd.DataFrame({
+        'latitude':    lat,
+        'longitude':   lon,
+        'elevation':   track['elevation'] * 3.281, #in feet
+        'time':        track['time'],
+        'temperature': np.zeros(len(lat), dtype=np.int64), # not read from the extensions, reported as 0
+        'heart_rate':  integer_column(track['heart_rate']),
+        'cadence':     integer_column(track['cadence']),
+        'distance':    distance,
+        'speed':       speed,
+        'power':       integer_column(track['power']),
+    })
 
-@timing
+def integer_column(values: np.ndarray) -> np.ndarray:
+    # Integer readings stay integers when complete, become floats with NaN gaps, and None when absent altogether
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.astype(np.int64)
+    if missing.all():
+        return np.full(len(values), None, dtype=object)
+    return values
+
+@profiled
 def aggregate_gpx_data(df: pd.DataFrame) -> pd.DataFrame:
     # Round the time column to the nearest minute
     df['time'] = df['time'].dt.round('min')
@@ -191,11 +162,68 @@ def aggregate_gpx_data(df: pd.DataFrame) -> pd.DataFrame:
     
     return grouped.reset_index()
 
-@timing
-def create_dual_chart(source_df1: str, source_df2: str, agg_df1: pd.DataFrame, agg_df2: pd.DataFrame, y_column: str, title: str, y_label: str):
-    # Add a source column for each DataFrame
-    agg_df1['source'] = source_df1
-    agg_df2['source'] = source_df2
+def downsample_lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points, and from each of `max_points - 2` equal-count buckets in
+    between, the point forming the largest triangle with the previously kept point and the
+    average of the next bucket. Peaks and dips survive, unlike with plain decimation.
+
+    Args:
+    x (np.ndarray): Sorted, NaN-free x values (as numbers).
+    y (np.ndarray): NaN-free y values.
+    max_points (int): Number of points to keep.
+
+    Returns:
+    np.ndarray: Sorted indices of the kept points.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    edges         = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected      = np.empty(max_points, dtype=np.int64)
+    selected[0]   = 0
+    selected[-1]  = n - 1
+    previous      = 0
+
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+
+        # Average of the next bucket, or the last point after the final bucket
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area     = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+
+    return selected
+
+def downsample_frame(df: pd.DataFrame, x_column: str, y_column: str, max_points: int = CHART_MAX_POINTS) -> pd.DataFrame:
+    """Returns the rows of df worth plotting for y_column against x_column, at most max_points of them (LTTB)."""
+    df = df[[x_column, y_column]].dropna()
+    if len(df) <= max_points:
+        return df
+
+    x = df[x_column]
+    if pd.api.types.is_datetime64_any_dtype(x):
+        x = x.dt.as_unit('ns').astype('int64')
+    x = x.to_numpy(dtype=float)
+    y = df[y_column].to_numpy(dtype=float)
+
+    return df.iloc[downsample_lttb(x, y, max_points)]
+
+@profiled
+def create_dual_chart(source_df1: str, source_df2: str, agg_df1: pd.DataFrame, agg_df2: pd.DataFrame, y_column: str, title: str, y_label: str, max_points: int = CHART_MAX_POINTS):
+    # Add a source column for each DataFrame, on downsampled copies
+    agg_df1 = downsample_frame(agg_df1, 'distance', y_column, max_points).assign(source=source_df1)
+    agg_df2 = downsample_frame(agg_df2, 'distance', y_column, max_points).assign(source=source_df2)
     
     combined_df = pd.concat([agg_df1, agg_df2])
 
@@ -224,23 +252,22 @@ def create_dual_chart(source_df1: str, source_df2: str, agg_df1: pd.DataFrame, a
         height=400
     ).interactive()
 
-@timing
-def create_chart(df: pd.DataFrame, y_column: str, title: str, y_label: str):
+@profiled
+def create_chart(df: pd.DataFrame, y_column: str, title: str, y_label: str, max_points: int = CHART_MAX_POINTS):
     # Implement sensible smoothing of chart data
-    samples = round(len(df))
-    if samples < 1000:
-        smoothing = round(len(df) * 0.1)
+    samples = len(df)
+    if samples >= 10000:
+        smoothing = round(samples * 0.001)
     elif samples >= 1000:
-        smoothing = round(len(df) * 0.01)
-    elif samples >= 10000:
-        smoothing = round(len(df) * 0.001)
-    elif samples >= 50000:
-        smoothing = round(len(df) * 0.001)
+        smoothing = round(samples * 0.01)
     else:
-        smoothing = 0
+        smoothing = round(samples * 0.1)
     
+    # Smoothed on a copy, then downsampled for plotting
+    df = df[['timestamp', y_column]].assign(**{y_column: df[y_column].rolling(max(smoothing, 1)).mean()})
+    df = downsample_frame(df, 'timestamp', y_column, max_points)
+
     # Eyeballing a min/max value for "Y"
-    df[y_column] = df[y_column].rolling(smoothing).mean()
     y_min = df[y_column].min() * 1
     y_max = df[y_column].max() * 1
 
@@ -265,91 +292,332 @@ def create_chart(df: pd.DataFrame, y_column: str, title: str, y_label: str):
         height=100,
     ).configure_axis(grid=False)
     
-@timing
-def parse_fit_file(fit_file) -> pd.DataFrame:
-    fitfile = fitparse.FitFile(fit_file)
-    rdata, edata, sdata = [], [], []
-    
-    # Single iteration through all messages
-    for message in fitfile:
-        data_dict = {field.name: field.value for field in message}
-
-        # Categorize message by type
-        if message.name == "record":
-            rdata.append(data_dict)
-        elif message.name == "event":
-            edata.append(data_dict)
-        elif message.name == "session":
-            sdata.append(data_dict)
-
-    # Construct DataFrames
-    record_df  = pd.DataFrame(rdata)
-    event_df   = pd.DataFrame(edata)
-    session_df = pd.DataFrame(sdata)
-
-    return record_df, event_df, session_df
-
-@timing
-def plot_map(df: pd.DataFrame):
-    # NOTE: looks like Panda.DataFrame as shared in-memory objects; beware, this function is not "safe"
+@profiled
+def parse_fit_file(fit_file, projection: dict = None) -> pd.DataFrame:
+    """
+    Parses a FIT file into its record, event and session DataFrames.
+
+    Args:
+    fit_file: Path, bytes or file-like object of the FIT file.
+    projection (dict): Optional subset to decode, as message name -> collection of field names
+    (None for every field of that message), e.g. {'record': ['timestamp', 'power'], 'session': None}.
+    Message types left out of the projection come back as empty DataFrames. Defaults to everything.
+
+    Returns:
+    tuple: record, event and session DataFrames.
+    """
+    version = FIT_PARSER_VERSION
+    if projection is not None:
+        version = f"{version}.{projection_digest(projection)}"
+    return PARSED_CACHE.get_or_parse(fit_file, 'fit', version, FIT_MESSAGES, lambda: decode_fit(file_source(fit_file), projection))
+
+def projection_digest(projection: dict) -> str:
+    canonical = json.dumps({name: sorted(fields) if fields is not None else None for name, fields in projection.items()}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+def decode_fit(fit_file, projection: dict = None) -> pd.DataFrame:
+    if projection is None:
+        projection = {name: None for name in FIT_MESSAGES}
+
+    # Values go straight into per-column lists, pandas then infers each column's dtype once
+    tables = read_fit_columns(fit_file, {name: fields for name, fields in projection.items() if name in FIT_MESSAGES})
+    frames = [pd.DataFrame(tables.get(name, {})) for name in FIT_MESSAGES]
+    return tuple(compact_frame(df, RECORD_DTYPES if name == 'record' else {}) for name, df in zip(FIT_MESSAGES, frames))
+
+def compact_frame(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """
+    Downcasts the columns of a parsed frame to the smallest dtypes that hold their values exactly.
+
+    Columns listed in `dtypes` get that dtype: float targets always (speeds and altitudes keep
+    float32 precision, well below what the devices measure), integer targets only when every
+    value is a whole number in range. Whole-number columns with gaps cannot be integers (no
+    NaN) and become float32 instead, as long as that is exact. Other whole-number columns are
+    downcast losslessly, and columns of strings (sport, event names, ...) become categoricals.
+
+    Args:
+    df (pd.DataFrame): Frame to compact, modified in place.
+    dtypes (dict): Column name -> target dtype.
+
+    Returns:
+    pd.DataFrame: The same frame.
+    """
+    for column in df.columns:
+        values = df[column]
+        target = dtypes.get(column)
+
+        if pd.api.types.is_string_dtype(values) and not pd.api.types.is_object_dtype(values):
+            df[column] = values.astype('category')
+        elif pd.api.types.is_object_dtype(values):
+            # Mixed values (FIT enums falling back to raw ints, lists, ...) are left alone
+            if len(values) and values.map(type).eq(str).all():
+                df[column] = values.astype('category')
+        elif not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            continue
+        elif target is not None and np.dtype(target).kind == 'f':
+            df[column] = values.astype(target)
+        else:
+            df[column] = integer_values(values, target)
+
+    return df
+
+def integer_values(values: pd.Series, dtype: str = None) -> pd.Series:
+    # Whole numbers to `dtype` (or the smallest integer dtype) when they fit, unchanged otherwise
+    array = values.to_numpy(dtype=float, na_value=np.nan)
+    valid = array[~np.isnan(array)]
+    if len(valid) == 0 or not np.array_equal(valid, np.round(valid)):
+        return values
+
+    if len(valid) < len(array):
+        fits = np.abs(valid).max() <= FLOAT32_EXACT
+        return values.astype(np.float32) if fits and values.dtype != np.float32 else values
+
+    if dtype is None:
+        return pd.to_numeric(values, downcast='integer')
+    info = np.iinfo(dtype)
+    return values.astype(dtype) if info.min <= valid.min() and valid.max() <= info.max else values
+
+def route_coordinates(df: pd.DataFrame) -> tuple:
+    # Latitude/longitude in degrees, from FIT semicircles or GPX degrees, without touching the frame
     if "position_lat" in df.columns and "position_long" in df.columns:
-        # Convert semi-circles to degrees (standard for GPS lat/lon)
-        df["latitude"]  = df["position_lat"] * (180 / 2**31)
-        df["longitude"]  = df["position_long"] * (180 / 2**31)
+        lat = df["position_lat"].to_numpy(dtype=float) * (180 / 2**31)
+        lon = df["position_long"].to_numpy(dtype=float) * (180 / 2**31)
+    elif "latitude" in df.columns and "longitude" in df.columns:
+        lat = df["latitude"].to_numpy(dtype=float)
+        lon = df["longitude"].to_numpy(dtype=float)
+    else:
+        return np.array([]), np.array([])
+
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    return lat[valid], lon[valid]
+
+def meters_per_pixel(zoom: float, latitude: float) -> float:
+    # Ground resolution of a Web Mercator tile pixel
+    return 156543.03392 * np.cos(np.radians(latitude)) / 2**zoom
+
+def simplify_route(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker simplification of a polyline given in projected meters.
 
-    df = df.dropna(subset=["latitude", "longitude"])
+    Args:
+    x (np.ndarray): Easting of each point.
+    y (np.ndarray): Northing of each point.
+    tolerance (float): Largest distance, in meters, a dropped point may lie from the simplified line.
+
+    Returns:
+    np.ndarray: Sorted indices of the points to keep, always including the first and the last one.
+    """
+    n = len(x)
+    if n < 3:
+        return np.arange(n)
+
+    keep           = np.zeros(n, dtype=bool)
+    keep[[0, -1]]  = True
+    stack          = [(0, n - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        # Distance of the inner points to the segment (not the line), so loops that end where they started still split
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        length = dx * dx + dy * dy
+        t      = np.clip((px * dx + py * dy) / length, 0, 1) if length > 0 else 0
+        dist   = np.hypot(px - t * dx, py - t * dy)
+
+        farthest = int(np.argmax(dist))
+        if dist[farthest] > tolerance:
+            index       = first + 1 + farthest
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return np.flatnonzero(keep)
+
+@profiled
+def plot_map(df: pd.DataFrame, marker_km: float = 10.0, detail_zoom: int = None, width_px: int = 800):
+    """
+    Builds a folium map of the route, with Start/End markers and a marker every `marker_km`.
+
+    The route is simplified before rendering: points closer than half a pixel (at `detail_zoom`)
+    to the simplified line are dropped. By default that is two zoom levels past the one the map
+    opens at, so zooming in a bit still shows the full detail.
+
+    Args:
+    df (pd.DataFrame): Activity records, with position_lat/position_long (FIT) or latitude/longitude (GPX).
+    marker_km (float): Distance between the distance markers.
+    detail_zoom (int): Zoom level the simplified route should look exact at.
+    width_px (int): Approximate width of the rendered map.
+
+    Returns:
+    folium.Map: The map, or None if the activity has no coordinates.
+    """
+    lat, lon = route_coordinates(df)
+    if len(lat) == 0:
+        return None
 
     # Create a map centered at the mean latitude/longitude
-    center_lat = df["latitude"].mean()
-    center_lon = df["longitude"].mean()
+    center_lat = lat.mean()
+    center_lon = lon.mean()
     m = folium.Map(location=[center_lat, center_lon], zoom_start=13)
 
+    # Cumulative distance in kilometers, in one pass over all consecutive pairs of points
+    cumulative     = np.zeros(len(lat))
+    cumulative[1:] = np.cumsum(haversine(lat[:-1], lon[:-1], lat[1:], lon[1:])) / 1000
+
+    # Local equirectangular projection, plenty accurate at the scale of a ride
+    x = np.radians(lon - center_lon) * 6371000.0 * np.cos(np.radians(center_lat))
+    y = np.radians(lat - center_lat) * 6371000.0
+
+    if detail_zoom is None:
+        extent      = max(np.ptp(x), np.ptp(y), 1.0)
+        fitted_zoom = np.floor(np.log2(meters_per_pixel(0, center_lat) * width_px / extent))
+        detail_zoom = min(fitted_zoom + 2, 18)
+    kept  = simplify_route(x, y, meters_per_pixel(detail_zoom, center_lat) / 2)
+    route = np.column_stack((lat[kept], lon[kept])).tolist()
+
     # Plot the route by adding a polyline to the map
-    route = list(zip(df["latitude"], df["longitude"]))
     folium.PolyLine(route, color="blue", weight=2.5, opacity=1).add_to(m)
 
-    # Add markers every 10 km
-    total_distance = 0
-    previous_point = route[0]
-    cumulative_distance = 0
-    total_distance = 0
-
-    for i in range(1, len(route)):
-        current_point = route[i]
-        distance = geodesic(previous_point, current_point).kilometers
-        cumulative_distance += distance  # Update the cumulative distance
-
-        # Check if the cumulative distance exceeds the next 10 km mark
-        if cumulative_distance >= 10.0:
-            total_distance += cumulative_distance
-            folium.Marker(
-                location=current_point,
-                popup=f"{total_distance:.0f} km",
-                icon=folium.Icon(color="blue", icon="info-sign"),
-            ).add_to(m)
-            # Reset cumulative distance after placing a marker
-            cumulative_distance = 0
-        previous_point = current_point
+    # Add markers every marker_km: first point at or past each mark
+    marks   = np.arange(marker_km, cumulative[-1], marker_km)
+    indices = np.searchsorted(cumulative, marks, side='left')
+    for index in np.unique(indices[indices < len(cumulative)]):
+        folium.Marker(
+            location=[lat[index], lon[index]],
+            popup=f"{cumulative[index]:.0f} km",
+            icon=folium.Icon(color="blue", icon="info-sign"),
+        ).add_to(m)
 
     # Start & End markers
     folium.Marker(
-        location=route[0],
+        location=[lat[0], lon[0]],
         popup="Start",
         icon=folium.Icon(color="green", icon="play"),
     ).add_to(m)
 
     folium.Marker(
-        location=route[-1], popup="End", icon=folium.Icon(color="red", icon="stop")
+        location=[lat[-1], lon[-1]], popup="End", icon=folium.Icon(color="red", icon="stop")
     ).add_to(m)
 
-    m.fit_bounds(route)
+    m.fit_bounds([[lat.min(), lon.min()], [lat.max(), lon.max()]])
 
     return m
 
-@timing
-def get_summary(df: pd.DataFrame, ftp: float, format: Literal["gpx", "fit"]) -> pd.DataFrame:
+class ActivityContext:
+    """
+    Time-sorted view of an activity, shared by the summary metrics so the records are sorted
+    and diffed once instead of once per metric.
+
+    Only the columns that are actually read get copied (as sorted numpy arrays), and the
+    caller's DataFrame is never modified.
+
+    Args:
+    df (pd.DataFrame): Activity records.
+    time_column (str): Name of the time column, 'timestamp' (FIT) or 'time' (GPX).
+    """
+    def __init__(self, df: pd.DataFrame, time_column: str = 'timestamp'):
+        self.df          = df
+        self.time_column = time_column
+        self._columns    = {}
+
+        times = df[time_column]
+        if not pd.api.types.is_datetime64_any_dtype(times):
+            times = pd.to_datetime(times)
+
+        # Most recordings are already in order, in which case there is nothing to sort
+        if times.is_monotonic_increasing:
+            self.order = None
+        else:
+            self.order = np.argsort(times.to_numpy(dtype='datetime64[ns]'), kind='stable')
+            times      = times.iloc[self.order]
+
+        self.times = times.reset_index(drop=True)
+
+        # Seconds elapsed since the previous sample (0 for the first one)
+        self.time_diff = self.times.diff().dt.total_seconds().fillna(0).to_numpy()
+
+        # Seconds since the first sample
+        self.time_seconds = (self.times - self.times.min()).dt.total_seconds().to_numpy()
+
+        # The time based metrics historically prefer 'speed' over 'enhanced_speed'
+        if 'speed' in df:
+            self.speed_column = 'speed'
+        elif 'enhanced_speed' in df:
+            self.speed_column = 'enhanced_speed'
+        else:
+            self.speed_column = None
+
+        self._masks     = {}
+        self._timelines = {}
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns a column as a float array in time order (cached)."""
+        if name not in self._columns:
+            values = self.df[name].to_numpy(dtype=float, na_value=np.nan)
+            self._columns[name] = values if self.order is None else values[self.order]
+        return self._columns[name]
+
+    def timeline(self, name: str, max_gap: int = 10) -> np.ndarray:
+        """
+        Resamples a column onto a 1 Hz grid running from the first to the last sample.
+
+        Each second holds the latest sample at or before it, as long as that sample is at most
+        max_gap seconds old; longer gaps (auto-pause, dropouts) read as 0. This keeps smart
+        recording files (one sample every few seconds) on the same time base as 1 Hz files.
+        """
+        key = (name, max_gap)
+        if key not in self._timelines:
+            values  = self.column(name)
+            valid   = ~np.isnan(values) & ~np.isnan(self.time_seconds)
+            seconds = np.floor(self.time_seconds[valid]).astype(np.int64)
+            values  = values[valid]
+
+            if len(seconds) == 0:
+                self._timelines[key] = np.zeros(0)
+                return self._timelines[key]
+
+            grid   = np.arange(seconds[-1] + 1)
+            latest = np.searchsorted(seconds, grid, side='right') - 1
+            fresh  = (grid - seconds[latest]) <= max_gap
+
+            self._timelines[key] = np.where(fresh, values[latest], 0.0)
+        return self._timelines[key]
+
+    def _mask(self, name: str, build) -> np.ndarray:
+        if name not in self._masks:
+            self._masks[name] = build()
+        return self._masks[name]
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.times.max() - self.times.min()).total_seconds()
+
+    @property
+    def rolling(self) -> np.ndarray:
+        return self._mask('rolling', lambda: self.column(self.speed_column) > 0)
+
+    @property
+    def stopped(self) -> np.ndarray:
+        return self._mask('stopped', lambda: self.column(self.speed_column) == 0)
+
+    @property
+    def moving(self) -> np.ndarray:
+        return self._mask('moving', lambda: self.column(self.speed_column) > 1)
+
+    @property
+    def working(self) -> np.ndarray:
+        return self._mask('working', lambda: (self.column('power') > 0) | (self.column('cadence') > 0))
+
+    @property
+    def coasting(self) -> np.ndarray:
+        return self._mask('coasting', lambda: self.rolling & ((self.column('power') == 0) | (self.column('cadence') == 0)))
+
+@profiled
+def get_summary(df: pd.DataFrame, ftp: float, format: Literal["gpx", "fit"]) -> ActivitySummary:
     if "heart_rate" in df:
-        heart_rate_avg = round(df[df["heart_rate"] != 0]["heart_rate"].mean(skipna=True))
+        heart_rate_avg = round(df["heart_rate"][df["heart_rate"] != 0].mean(skipna=True))
         heart_rate_max = round(df["heart_rate"].max())
     else:
         heart_rate_avg = heart_rate_max = None
@@ -358,22 +626,23 @@ def get_summary(df: pd.DataFrame, ftp: float, format: Literal["gpx", "fit"]) ->
         ts_column = "timestamp"
     elif "time" in df:
         ts_column = "time"
+    else:
+        ts_column = None
         
+    context = ActivityContext(df, ts_column) if ts_column else None
+
     if "power" in df:
         if "enhanced_speed" in df:
-            power_avg = round(df[(df["enhanced_speed"] > 0)]["power"].mean(skipna=True))
+            power_avg = round(df["power"][df["enhanced_speed"] > 0].mean(skipna=True))
         else:
-            power_avg = round(df[df["speed"] > 0]["power"].mean(skipna=True))
+            power_avg = round(df["power"][df["speed"] > 0].mean(skipna=True))
             
         power_max        = round(df["power"].max())
-        power_np         = get_normalized_power(df)
+        power_np         = get_normalized_power(df, context=context)
         intensity_factor = get_intensity_factor(power_np, ftp)
-        tss              = get_tss(power_np, ftp, get_duration_seconds(df, ts_column), intensity_factor)
-        power_5          = get_max_avg_pwr(df, 5, ts_column)
-        power_10         = get_max_avg_pwr(df, 10, ts_column)
-        power_20         = get_max_avg_pwr(df, 20, ts_column)
-        power_60         = get_max_avg_pwr(df, 60, ts_column)
-        power_30s        = get_max_avg_pwr(df, 0.5, ts_column)
+        tss              = get_tss(power_np, ftp, context.duration_seconds if context else 0, intensity_factor)
+        power_curve      = get_power_curve(df, ts_column, durations=[30, 300, 600, 1200, 3600], context=context)
+        power_30s, power_5, power_10, power_20, power_60 = [round(p) for p in power_curve['power']]
     else:
         power_avg = power_max = power_np = intensity_factor = power_5 = power_10 = power_20 = power_60 = power_30s = tss = 0
 
@@ -385,11 +654,11 @@ def get_summary(df: pd.DataFrame, ftp: float, format: Literal["gpx", "fit"]) ->
 
     if "enhanced_speed" in df:
         speed_avg        = round(df["enhanced_speed"].mean(skipna=True) * 3.6)
-        speed_moving_avg = round(df[df["enhanced_speed"] > 4]["enhanced_speed"].mean(skipna=True) * 3.6)
+        speed_moving_avg = round(df["enhanced_speed"][df["enhanced_speed"] > 4].mean(skipna=True) * 3.6)
         speed_max        = round(df["enhanced_speed"].max() * 3.6)
     elif "speed" in df:
         speed_avg        = round(df["speed"].mean(skipna=True) * 1.609)
-        speed_moving_avg = round(df[df["speed"] > 8]["speed"].mean(skipna=True) * 1.609)
+        speed_moving_avg = round(df["speed"][df["speed"] > 8].mean(skipna=True) * 1.609)
         speed_max        = round(df["speed"].max() * 1.609)
     else:
         speed_avg = speed_max = speed_moving_avg = 0
@@ -408,28 +677,12 @@ def get_summary(df: pd.DataFrame, ftp: float, format: Literal["gpx", "fit"]) ->
     else:
         distance_km = round(df["distance"].max())
         
-    if 'timestamp' in df:
-        coasting_time_string  = get_coasting(df, time_column='timestamp')[0]
-        coasting_time_seconds = get_coasting(df, time_column='timestamp')[1]
-        stopped_time_string   = get_stopped_time(df, time_column='timestamp')[0]
-        stopped_time_seconds  = get_stopped_time(df, time_column='timestamp')[1]
-        moving_time_string    = get_moving_time(df, time_column='timestamp')[0]
-        moving_time_seconds   = get_moving_time(df, time_column='timestamp')[1]
-        work_time_string      = get_work_time(df, time_column='timestamp')[0]
-        work_time_seconds     = get_work_time(df, time_column='timestamp')[1]
-        total_time_string     = get_total_time(df, time_column='timestamp')[0]
-        total_time_seconds    = get_total_time(df, time_column='timestamp')[1]
-    elif 'time' in df:
-        coasting_time_string  = get_coasting(df, time_column='time')[0]
-        coasting_time_seconds = get_coasting(df, time_column='time')[1]
-        stopped_time_string   = get_stopped_time(df, time_column='time')[0]
-        stopped_time_seconds  = get_stopped_time(df, time_column='time')[1]
-        moving_time_string    = get_moving_time(df, time_column='time')[0]
-        moving_time_seconds   = get_moving_time(df, time_column='time')[1]
-        work_time_string      = get_work_time(df, time_column='time')[0]
-        work_time_seconds     = get_work_time(df, time_column='time')[1]
-        total_time_string     = get_total_time(df, time_column='time')[0]
-        total_time_seconds    = get_total_time(df, time_column='time')[1]
+    if context is not None:
+        coasting_time_string, coasting_time_seconds = get_coasting(df, time_column=ts_column, context=context)
+        stopped_time_string,  stopped_time_seconds  = get_stopped_time(df, time_column=ts_column, context=context)
+        moving_time_string,   moving_time_seconds   = get_moving_time(df, time_column=ts_column, context=context)
+        work_time_string,     work_time_seconds     = get_work_time(df, time_column=ts_column, context=context)
+        total_time_string,    total_time_seconds    = get_total_time(df, time_column=ts_column, context=context)
     else:
         coasting_time_string  = '0m'
         coasting_time_seconds = 0
@@ -442,64 +695,62 @@ def get_summary(df: pd.DataFrame, ftp: float, format: Literal["gpx", "fit"]) ->
         total_time_string     = '0m'
         total_time_seconds    = 0
     
-    df0 = pd.DataFrame({
-        'hr_avg':                [heart_rate_avg],
-        'hr_max':                [heart_rate_max],
-        'power_avg':             [power_avg],
-        'power_max':             [power_max],
-        'power_max_avg_30s':     [power_30s],
-        'power_max_avg_5m':      [power_5],
-        'power_max_avg_10m':     [power_10],
-        'power_max_avg_20m':     [power_20],
-        'power_max_avg_60m':     [power_60],
-        'power_normalized':      [power_np],
-        'intensity_factor':      [intensity_factor],
-        'tss':                   [tss],
-        'cadence_avg':           [cadence_avg],
-        'cadence_max':           [cadence_max],
-        'speed_avg':             [speed_avg],
-        'speed_moving_avg':      [speed_moving_avg],
-        'speed_max':             [speed_max],
-        'temp_avg':              [temperature_avg],
-        'temp_max':              [temperature_max],
-        'distance_total':        [distance_km],
-        'time_coasting_string':  [coasting_time_string],
-        'time_stopped_string':   [stopped_time_string],
-        'time_moving_string':    [moving_time_string],
-        'time_working_string':   [work_time_string],
-        'time_total_string':     [total_time_string],
-        'time_coasting_seconds': [coasting_time_seconds],
-        'time_stopped_seconds':  [stopped_time_seconds],
-        'time_moving_seconds':   [moving_time_seconds],
-        'time_working_seconds':  [work_time_seconds],
-        'time_total_seconds':    [total_time_seconds],
-    })
-    
-    return df0
-
-@timing
-def get_normalized_power(df: pd.DataFrame) -> float:
+    return ActivitySummary(
+        hr_avg                = heart_rate_avg,
+        hr_max                = heart_rate_max,
+        power_avg             = power_avg,
+        power_max             = power_max,
+        power_max_avg_30s     = power_30s,
+        power_max_avg_5m      = power_5,
+        power_max_avg_10m     = power_10,
+        power_max_avg_20m     = power_20,
+        power_max_avg_60m     = power_60,
+        power_normalized      = power_np,
+        intensity_factor      = intensity_factor,
+        tss                   = tss,
+        cadence_avg           = cadence_avg,
+        cadence_max           = cadence_max,
+        speed_avg             = speed_avg,
+        speed_moving_avg      = speed_moving_avg,
+        speed_max             = speed_max,
+        temp_avg              = temperature_avg,
+        temp_max              = temperature_max,
+        distance_total        = distance_km,
+        time_coasting_string  = coasting_time_string,
+        time_stopped_string   = stopped_time_string,
+        time_moving_string    = moving_time_string,
+        time_working_string   = work_time_string,
+        time_total_string     = total_time_string,
+        time_coasting_seconds = coasting_time_seconds,
+        time_stopped_seconds  = stopped_time_seconds,
+        time_moving_seconds   = moving_time_seconds,
+        time_working_seconds  = work_time_seconds,
+        time_total_seconds    = total_time_seconds,
+    )
+
+@profiled
+def get_normalized_power(df: pd.DataFrame, context: ActivityContext = None) -> float:
     if "power" not in df:
         raise ValueError("The DataFrame does not contain a 'power' column")
     
-    # Drop null values from the 'power' column
-    df = df.dropna(subset=["power"])
+    # Drop null values from the 'power' column, in time order when a context is available
+    if context is not None:
+        power = pd.Series(context.column('power')).dropna()
+    else:
+        power = df['power'].dropna()
     
     # Check if there are still values left after dropping nulls
-    if df.empty:
+    if power.empty:
         raise ValueError("The DataFrame contains only null values in the 'power' column")
     
-    rolling_power       = df['power'].rolling(window=30, min_periods=1).mean()
+    rolling_power       = power.rolling(window=30, min_periods=1).mean()
     rolling_power_4th   = rolling_power ** 4
     avg_4th_power       = rolling_power_4th.mean()
     normalized_power    = avg_4th_power ** (1 / 4)
 
     return round(normalized_power)
 
-
-    return round(normalized_power)
-
-@timing
+@profiled
 def get_intensity_factor(normalized_power: float, ftp: float) -> float:
     if ftp <= 0:
         return 0
@@ -507,7 +758,7 @@ def get_intensity_factor(normalized_power: float, ftp: float) -> float:
     intensity_factor = normalized_power / ftp
     return round(intensity_factor, 3)
 
-@timing
+@profiled
 def get_tss(normalized_power: float, ftp: float, duration_seconds: float, intensity_factor: float) -> float:
     if ftp <= 0 or duration_seconds <= 0:
         return 0
@@ -515,7 +766,7 @@ def get_tss(normalized_power: float, ftp: float, duration_seconds: float, intens
     tss = (duration_seconds * normalized_power * intensity_factor) / (ftp * 3600) * 100
     return round(tss, 1)
 
-@timing
+@profiled
 def get_duration_seconds(df: pd.DataFrame, column: str = 'timestamp') -> float:
     if column not in df.columns:
         raise ValueError(f"Column '{column}' not found in the DataFrame")
@@ -531,166 +782,140 @@ def get_duration_seconds(df: pd.DataFrame, column: str = 'timestamp') -> float:
 
     return elapsed_seconds
 
-@timing
-def get_max_avg_pwr(df: pd.DataFrame, minutes: float, time_column: str = 'timestamp') -> float:
+# Default number of durations on a power curve, see power_curve_durations()
+POWER_CURVE_POINTS = 120
+
+def power_curve_durations(max_duration: int, points: int = POWER_CURVE_POINTS) -> np.ndarray:
+    """Every second up to a minute, then log-spaced durations up to `max_duration` seconds."""
+    if max_duration < 1:
+        return np.zeros(0, dtype=np.int64)
+    short = np.arange(1, min(max_duration, 60) + 1)
+    long  = np.geomspace(61, max_duration, max(points - len(short), 2)).round() if max_duration > 60 else []
+    return np.unique(np.concatenate((short, long, [max_duration]))).astype(np.int64)
+
+@profiled
+def get_power_curve(df: pd.DataFrame, time_column: str = 'timestamp', durations: list = None, context: ActivityContext = None) -> pd.DataFrame:
+    """
+    Computes the mean-maximal power curve: the best average power held for each duration.
+
+    Power is laid out on a gap-aware 1 Hz timeline (see ActivityContext.timeline) and every
+    duration is answered from one cumulative sum, so each duration costs a single vectorized
+    difference over the activity instead of a rolling mean. The total cost is therefore
+    O(samples x durations): asking for every second of a long ride is quadratic, which is why
+    the default is a log-spaced grid of at most POWER_CURVE_POINTS durations.
+
+    Args:
+    df (pd.DataFrame): Activity records with 'power' and the time column.
+    time_column (str): Name of the time column, 'timestamp' (FIT) or 'time' (GPX).
+    durations (list): Durations in seconds, each computed exactly; by default every second up to
+    a minute, then log-spaced up to the activity length (see power_curve_durations()).
+    context (ActivityContext): Optional precomputed context for the same DataFrame.
+
+    Returns:
+    pd.DataFrame: 'duration' (seconds) and 'power' (watts) columns. Durations longer than the
+    activity have a power of 0.
+    """
     if 'power' not in df or time_column not in df:
         raise ValueError(f"The DataFrame must contain 'power' and '{time_column}' columns")
 
-    # Ensure the DataFrame is sorted by the time column and convert it to datetime if needed
-    df = df.sort_values(by=time_column).reset_index(drop=True)
-    if not pd.api.types.is_datetime64_any_dtype(df[time_column]):
-        df[time_column] = pd.to_datetime(df[time_column])
+    context  = context or ActivityContext(df, time_column)
+    timeline = context.timeline('power')
 
-    # Convert the time column to seconds since the start to calculate the window
-    df['time_seconds'] = (df[time_column] - df[time_column].min()).dt.total_seconds()
+    # Elapsed seconds between the first and last sample
+    total_time_span = len(timeline) - 1
 
-    window_seconds  = minutes * 60
-    total_time_span = df['time_seconds'].max()
+    if durations is None:
+        durations = power_curve_durations(total_time_span)
+    durations = np.asarray(durations, dtype=np.int64)
 
-    if total_time_span < window_seconds:
-        return 0
+    cumulative = np.concatenate(([0.0], np.cumsum(timeline)))
+    best_power = np.zeros(len(durations))
 
-    # Use a rolling window to calculate the mean power over the specified window duration
-    if "enhanced_speed" in df:
-        rolling_avg_power = df[df['enhanced_speed'] > 0]['power'].rolling(window=int(window_seconds), min_periods=1).mean()
-    else:
-        rolling_avg_power = df[df['speed'] > 0]['power'].rolling(window=int(window_seconds), min_periods=1).mean()
+    for i, duration in enumerate(durations):
+        if 0 < duration <= total_time_span:
+            best_power[i] = (cumulative[duration:] - cumulative[:-duration]).max() / duration
+
+    return pd.DataFrame({
+        'duration': durations,
+        'power':    best_power,
+    })
 
-    # Return the maximum average power over the rolling window
-    max_avg_power = rolling_avg_power.max()
+@profiled
+def get_max_avg_pwr(df: pd.DataFrame, minutes: float, time_column: str = 'timestamp', context: ActivityContext = None) -> float:
+    power_curve = get_power_curve(df, time_column, durations=[round(minutes * 60)], context=context)
 
-    return round(max_avg_power)
+    return round(power_curve['power'].iloc[0])
 
-@timing
-def get_coasting(df: pd.DataFrame, time_column: str = 'timestamp'):
+def format_duration(total_seconds: int) -> str:
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}h {minutes}m {seconds}s"
+
+@profiled
+def get_coasting(df: pd.DataFrame, time_column: str = 'timestamp', context: ActivityContext = None):
     if 'power' not in df or 'cadence' not in df or ('speed' not in df and 'enhanced_speed' not in df) or time_column not in df:
         logging.error(f"Missing at least power, cadence, speed or enhanced_speed, or {time_column}")
         return None, None
-    
-    # Ensure the time column is in datetime format
-    if not pd.api.types.is_datetime64_any_dtype(df[time_column]):
-        df[time_column] = pd.to_datetime(df[time_column])
-    
-    df = df.sort_values(by=time_column).reset_index(drop=True)
-    
-    # Calculate the time difference between consecutive rows
-    df['time_diff'] = df[time_column].diff().dt.total_seconds().fillna(0)
-    
-    # Filter rows where either power or cadence is 0, and speed is greater than 0 (moving)
-    if 'speed' in df:
-        zero_power_or_cadence_while_moving = df[(df['speed'] > 0) & ((df['power'] == 0) | (df['cadence'] == 0))]
-    elif 'enhanced_speed' in df:
-        zero_power_or_cadence_while_moving = df[(df['enhanced_speed'] > 0) & ((df['power'] == 0) | (df['cadence'] == 0))]
-    
-    total_time_seconds = zero_power_or_cadence_while_moving['time_diff'].sum()
-    total_seconds      = int(total_time_seconds)
-    hours, remainder   = divmod(total_seconds, 3600)
-    minutes, seconds   = divmod(remainder, 60)
 
-    return f"{hours}h {minutes}m {seconds}s", total_seconds
+    context = context or ActivityContext(df, time_column)
 
-@timing
-def get_stopped_time(df: pd.DataFrame, time_column: str = 'timestamp'):
+    # Rows where either power or cadence is 0, and speed is greater than 0 (moving)
+    total_seconds = int(context.time_diff[context.coasting].sum())
+
+    return format_duration(total_seconds), total_seconds
+
+@profiled
+def get_stopped_time(df: pd.DataFrame, time_column: str = 'timestamp', context: ActivityContext = None):
     if ('speed' not in df and 'enhanced_speed' not in df) or time_column not in df:
         logging.error(f"The DataFrame must contain 'speed' or 'enhanced_speed', or '{time_column}' columns")
         return None, None
-        
-    # Ensure the time column is in datetime format
-    if not pd.api.types.is_datetime64_any_dtype(df[time_column]):
-        df[time_column] = pd.to_datetime(df[time_column])
-    
-    df = df.sort_values(by=time_column).reset_index(drop=True)
-    
-    # Calculate the time difference between consecutive rows
-    df['time_diff'] = df[time_column].diff().dt.total_seconds().fillna(0)
-    
-    # Filter rows where speed or enhanced_speed is 0 (stationary time)
-    if 'speed' in df:
-        stationary_time_df = df[df['speed'] == 0]
-    elif 'enhanced_speed' in df:
-        stationary_time_df = df[df['enhanced_speed'] == 0]
-    
-    total_stationary_seconds = stationary_time_df['time_diff'].sum()
-    total_seconds            = int(total_stationary_seconds)
-    hours, remainder         = divmod(total_seconds, 3600)
-    minutes, seconds         = divmod(remainder, 60)
 
-    return f"{hours}h {minutes}m {seconds}s", total_seconds
+    context = context or ActivityContext(df, time_column)
+
+    # Rows where speed or enhanced_speed is 0 (stationary time)
+    total_seconds = int(context.time_diff[context.stopped].sum())
+
+    return format_duration(total_seconds), total_seconds
 
-@timing
-def get_moving_time(df: pd.DataFrame, time_column: str = 'timestamp'):
+@profiled
+def get_moving_time(df: pd.DataFrame, time_column: str = 'timestamp', context: ActivityContext = None):
     if ('speed' not in df and 'enhanced_speed' not in df) or time_column not in df:
         logging.error(f"The DataFrame must contain 'speed' or 'enhanced_speed', or '{time_column}' columns")
         return None, None
-    
-    # Ensure the time column is in datetime format
-    if not pd.api.types.is_datetime64_any_dtype(df[time_column]):
-        df[time_column] = pd.to_datetime(df[time_column])
-    
-    df = df.sort_values(by=time_column).reset_index(drop=True)
-    
-    # Calculate the time difference between consecutive rows
-    df['time_diff'] = df[time_column].diff().dt.total_seconds().fillna(0)
-    
-    # Filter rows where speed or enhanced_speed is 0 (stationary time)
-    if 'speed' in df:
-        moving_time_df = df[df['speed'] > 1]
-    elif 'enhanced_speed' in df:
-        moving_time_df = df[df['enhanced_speed'] > 1]
-    
-    total_moving_seconds = moving_time_df['time_diff'].sum()
-    total_seconds            = int(total_moving_seconds)
-    hours, remainder         = divmod(total_seconds, 3600)
-    minutes, seconds         = divmod(remainder, 60)
 
-    return f"{hours}h {minutes}m {seconds}s", total_seconds
+    context = context or ActivityContext(df, time_column)
+
+    # Rows where speed or enhanced_speed is above 1
+    total_seconds = int(context.time_diff[context.moving].sum())
 
-@timing
-def get_work_time(df: pd.DataFrame, time_column: str = 'timestamp'):
+    return format_duration(total_seconds), total_seconds
+
+@profiled
+def get_work_time(df: pd.DataFrame, time_column: str = 'timestamp', context: ActivityContext = None):
     if 'power' not in df or 'cadence' not in df or time_column not in df:
         logging.error(f"The DataFrame must contain 'speed' or 'enhanced_speed', or '{time_column}' columns")
         return None, None
-    
-    # Ensure the time column is in datetime format
-    if not pd.api.types.is_datetime64_any_dtype(df[time_column]):
-        df[time_column] = pd.to_datetime(df[time_column])
-    
-    df = df.sort_values(by=time_column).reset_index(drop=True)
-    
-    # Calculate the time difference between consecutive rows
-    df['time_diff'] = df[time_column].diff().dt.total_seconds().fillna(0)
-    
-    # Filter rows where either power or cadence is greater than 0
-    active_time_df       = df[(df['power'] > 0) | (df['cadence'] > 0)]
-    total_active_seconds = active_time_df['time_diff'].sum()
-    total_seconds        = int(total_active_seconds)
-    hours, remainder     = divmod(total_seconds, 3600)
-    minutes, seconds     = divmod(remainder, 60)
 
-    return f"{hours}h {minutes}m {seconds}s", total_seconds
+    context = context or ActivityContext(df, time_column)
+
+    # Rows where either power or cadence is greater than 0
+    total_seconds = int(context.time_diff[context.working].sum())
 
-@timing
-def get_total_time(df: pd.DataFrame, time_column: str = 'timestamp'):
+    return format_duration(total_seconds), total_seconds
+
+@profiled
+def get_total_time(df: pd.DataFrame, time_column: str = 'timestamp', context: ActivityContext = None):
     if time_column not in df:
         logging.error(f"The DataFrame must contain a '{time_column}' column")
         return None, None
-    
-    # Ensure the time column is in datetime format
-    if not pd.api.types.is_datetime64_any_dtype(df[time_column]):
-        df[time_column] = pd.to_datetime(df[time_column])
-    
-    df = df.sort_values(by=time_column).reset_index(drop=True)
-    
-    # Calculate the time difference between consecutive rows
-    df['time_diff']    = df[time_column].diff().dt.total_seconds().fillna(0)
-    total_time_seconds = df['time_diff'].sum()
-    total_seconds      = int(total_time_seconds)
-    hours, remainder   = divmod(total_seconds, 3600)
-    minutes, seconds   = divmod(remainder, 60)
 
-    return f"{hours}h {minutes}m {seconds}s", total_seconds
+    context = context or ActivityContext(df, time_column)
+
+    total_seconds = int(context.time_diff.sum())
+
+    return format_duration(total_seconds), total_seconds
 
-@timing
+@profiled
 def get_chart_data(df: pd.DataFrame, y_col: str, x_col: str) -> pd.DataFrame:
     if not all(col in df.columns for col in [y_col, x_col]):
         raise ValueError("One or more specified columns do not exist in the DataFrame.")
@@ -698,7 +923,7 @@ def get_chart_data(df: pd.DataFrame, y_col: str, x_col: str) -> pd.DataFrame:
     chart_data.set_index(x_col, inplace=True)
     return chart_data
 
-@timing
+@profiled
 def aggregate_by_time(df: pd.DataFrame, timestamp_col: str, interval: str = '5min') -> pd.DataFrame:
     if timestamp_col not in df.columns:
         raise ValueError(f"Column '{timestamp_col}' does not exist in the DataFrame.")
@@ -710,7 +935,7 @@ def aggregate_by_time(df: pd.DataFrame, timestamp_col: str, interval: str = '5mi
     return aggregated_df
 
 
-@timing
+@profiled
 def load_data(data_file) -> pd.DataFrame:
     if os.path.exists(data_file):
         with open(data_file, "r") as file:
@@ -723,7 +948,7 @@ def save_data(data, data_file):
     with open(data_file, "w") as file:
         json.dump(data, file, indent=4)
 
-@timing
+@profiled
 def get_latest_ftp(data_file, date: datetime = None):
     df = load_data(data_file)
     if 'timestamp' in df.columns:
@@ -752,7 +977,7 @@ def get_latest_ftp(data_file, date: datetime = None):
     else:
         return 0
 
-@timing    
+@profiled    
 def get_ftp_by_date(data_file, target_date):
     df = load_data(data_file)
     if not df.empty and "ftp" in df.columns and "timestamp" in df.columns:
@@ -766,7 +991,7 @@ def get_ftp_by_date(data_file, target_date):
     else:
         return 0
 
-@timing
+@profiled
 def get_latest_maxhr(data_file):
     df = load_data(data_file)
     if not df.empty and "max_hr" in df.columns:
@@ -778,7 +1003,7 @@ def get_latest_maxhr(data_file):
     else:
         return 0
 
-@timing    
+@profiled    
 def get_latest_restinghr(data_file):
     df = load_data(data_file)
     if not df.empty and "resting_hr" in df.columns:
@@ -790,14 +1015,14 @@ def get_latest_restinghr(data_file):
     else:
         return 0
 
-@timing
+@profiled
 def get_latest_hr_zones(df: pd.DataFrame) -> pd.DataFrame:
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     latest_row      = df.loc[df['timestamp'].idxmax()]
     
     return latest_row
 
-@timing
+@profiled
 def calculate_training_effect(heart_rate_zones_df: pd.DataFrame, intensity: float):
     # Define aerobic and anaerobic factors for each zone (scaled up)
     zone_factors = {
@@ -850,39 +1075,77 @@ def calculate_training_effect(heart_rate_zones_df: pd.DataFrame, intensity: floa
     return round(aerobic_te, 1), round(anaerobic_te, 1)
 
 
-@timing
-def calculate_hr_zone_time(df: pd.DataFrame, hr_zones: pd.DataFrame) -> pd.DataFrame:
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['time_diff'] = df['timestamp'].diff().dt.total_seconds().fillna(0)
-    
-    zone_numbers  = list(set([int(row.split('.')[1]) for row in hr_zones.index if 'zone.' in row]))
-    num_zones     = len(zone_numbers)
-    time_in_zones = {f'zone{i+1}': 0 for i in range(num_zones)}
+@profiled
+def get_zone_edges(zones: pd.Series, low_key: str, max_key: str):
+    """
+    Extracts the zone boundaries from a profile row (e.g. 'zone.1.low_hr', 'zone.1.max_hr').
+
+    Args:
+    zones (pd.Series): Zone profile row, as returned by UserProfile.get_hr_zones() or get_power_zones().
+    low_key (str): Suffix of the lower bound entries, e.g. 'low_hr'.
+    max_key (str): Suffix of the upper bound entries, e.g. 'max_hr'.
+
+    Returns:
+    tuple: Zone numbers, lower and upper bounds as numpy arrays, sorted by lower bound.
+    """
+    zone_numbers = sorted(set([int(row.split('.')[1]) for row in zones.index if 'zone.' in row]))
+    zone_numbers = [zone_num for zone_num in zone_numbers
+                    if f'zone.{zone_num}.{low_key}' in zones.index and f'zone.{zone_num}.{max_key}' in zones.index]
+
+    zone_numbers = np.array(zone_numbers, dtype=int)
+    lows         = np.array([zones[f'zone.{zone_num}.{low_key}'] for zone_num in zone_numbers], dtype=float)
+    highs        = np.array([zones[f'zone.{zone_num}.{max_key}'] for zone_num in zone_numbers], dtype=float)
+
+    order = np.argsort(lows, kind='stable')
+    return zone_numbers[order], lows[order], highs[order]
 
-    for i in range(1, len(df)):
-        heart_rate    = df.iloc[i]['heart_rate']
-        time_interval = df.iloc[i]['time_diff']
+@profiled
+def calculate_zone_time(df: pd.DataFrame, zones: pd.Series, channel: str, low_key: str, max_key: str) -> pd.DataFrame:
+    """
+    Computes the time spent in each zone for any channel (heart_rate, power, ...) in one vectorized pass.
+
+    Every sample is credited with the time elapsed since the previous sample, and binned by
+    binary search over the sorted lower zone bounds. Zones are expected to be contiguous and
+    non-overlapping, which is how the profile pages write them. Samples outside of every zone
+    (or missing) are not counted.
+
+    Args:
+    df (pd.DataFrame): Activity records with a 'timestamp' column and the requested channel.
+    zones (pd.Series): Zone profile row.
+    channel (str): Column to bin, e.g. 'heart_rate'.
+    low_key (str): Suffix of the lower bound entries, e.g. 'low_hr'.
+    max_key (str): Suffix of the upper bound entries, e.g. 'max_hr'.
+
+    Returns:
+    pd.DataFrame: One row per zone with 'zone' and 'time_in_seconds' columns.
+    """
+    zone_numbers, lows, highs = get_zone_edges(zones, low_key, max_key)
+    num_zones = len(set([int(row.split('.')[1]) for row in zones.index if 'zone.' in row]))
+    labels    = [f'zone{i+1}' for i in range(num_zones)]
 
-        for zone_num in zone_numbers:
-            low_hr_row = f'zone.{zone_num}.low_hr'
-            max_hr_row = f'zone.{zone_num}.max_hr'
+    timestamps = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]')
+    time_diff  = np.diff(timestamps).astype('timedelta64[ns]').astype(float) / 1e9
+    time_diff  = np.nan_to_num(time_diff, nan=0.0)
+    values     = pd.to_numeric(df[channel], errors='coerce').to_numpy(dtype=float)[1:]
 
-            if low_hr_row in hr_zones.index and max_hr_row in hr_zones.index:
-                min_hr = hr_zones.loc[low_hr_row]
-                max_hr = hr_zones.loc[max_hr_row]
+    # Right-most zone whose lower bound is <= value; NaN sorts past every edge and fails the upper bound check
+    idx     = np.searchsorted(lows, values, side='right') - 1
+    in_zone = (idx >= 0) & (values <= highs[np.clip(idx, 0, None)]) if len(lows) else np.zeros(len(values), dtype=bool)
 
-                if min_hr <= heart_rate <= max_hr:
-                    time_in_zones[f'zone{zone_num}'] += time_interval
-                    break
+    totals = np.bincount(zone_numbers[idx[in_zone]] - 1, weights=time_diff[in_zone], minlength=num_zones)
 
     time_in_zones_df = pd.DataFrame({
-        'zone': list(time_in_zones.keys()),
-        'time_in_seconds': list(time_in_zones.values())
+        'zone': labels,
+        'time_in_seconds': totals[:num_zones]
     })
 
     return time_in_zones_df
 
-@timing
+@profiled
+def calculate_hr_zone_time(df: pd.DataFrame, hr_zones: pd.DataFrame) -> pd.DataFrame:
+    return calculate_zone_time(df, hr_zones, channel='heart_rate', low_key='low_hr', max_key='max_hr')
+
+@profiled
 def format_nice_date(timestamp: datetime.timestamp):
     dt  = timestamp.to_pydatetime()
     day = dt.day
@@ -893,7 +1156,7 @@ def format_nice_date(timestamp: datetime.timestamp):
     formatted_date = dt.strftime(f"%A, %B {day}{suffix} %Y @ %I:%M%p")
     return formatted_date.lstrip("0")
 
-@timing
+@profiled
 def convert(value: float, from_to: Literal['miles_km',
                                            'km_miles',
                                            'mph_kmh',
@@ -919,44 +1182,75 @@ def convert(value: float, from_to: Literal['miles_km',
 
     return round(value * conversion_factors[from_to], 1)
 
-@timing
+# Shared by every page and processor.py; see GeocodeCache for precision, TTL and size settings
+GEOCODE_CACHE    = GeocodeCache()
+GEOCODE_CLIENTS  = {}
+# Every OpenCage request of the process goes through this bucket (see set_geocode_limiter())
+GEOCODE_LIMITER  = TokenBucket(OPENCAGE_RATE, OPENCAGE_BURST)
+
+def set_geocode_limiter(limiter: TokenBucket):
+    """
+    Makes all OpenCage requests of this process draw from `limiter`. Used as a pool initializer
+    with a shared TokenBucket, so that worker processes together stay within the quota.
+    """
+    global GEOCODE_LIMITER
+    GEOCODE_LIMITER = limiter
+    GEOCODE_CLIENTS.clear()
+
+def geocoding_client(api_key: str) -> GeocodingClient:
+    if api_key not in GEOCODE_CLIENTS:
+        GEOCODE_CLIENTS[api_key] = GeocodingClient(OpenCageBackend(api_key), GEOCODE_CACHE, GEOCODE_LIMITER)
+    return GEOCODE_CLIENTS[api_key]
+
+def submit_location_details(api_key: str, latitude: float, longitude: float, backend=None, cache: GeocodeCache = None) -> Future:
+    """
+    Starts a get_location_details() lookup in the background and returns its future, so that other
+    work (or other lookups) can go on while OpenCage answers. Lookups of the same place share one
+    request, and requests stay within the GEOCODE_LIMITER rate.
+
+    Args: as get_location_details().
+
+    Returns:
+    Future: Resolves to the location details dict, or None without an API key.
+    """
+    if api_key and backend is None and cache is None:
+        return geocoding_client(api_key).submit(latitude, longitude)
+
+    future = Future()
+    try:
+        future.set_result(get_location_details(api_key, latitude, longitude, backend, cache))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+@profiled
 # @retry(stop=stop_after_attempt(4), wait=wait_exponential(min=5, max=60))
-def get_location_details(api_key: str, latitude: float, longitude: float):
+def get_location_details(api_key: str, latitude: float, longitude: float, backend=None, cache: GeocodeCache = None):
     """
     Returns city, state, country, and postal code based on latitude and longitude using OpenCage with geopy.
+    Answers are kept in a persistent on-disk cache, so places seen before do not hit the network.
+    OpenCage requests are rate limited and retried with backoff (see geocoding_client()).
 
     Args:
     latitude (float): Latitude of the location.
     longitude (float): Longitude of the location.
     api_key (str): Your OpenCage API key.
+    backend: Optional geocoder with a reverse(latitude, longitude) method (e.g. StubGeocoder); OpenCage by default.
+    cache (GeocodeCache): Optional cache; the shared GEOCODE_CACHE by default.
 
     Returns:
     dict: A dictionary containing city, state, country, and postal code.
     """
-    if api_key:
-        geolocator       = OpenCage(api_key)
-        location_details = {}
-        try:
-            location = geolocator.reverse((latitude, longitude), exactly_one=True)
-            if location:
-                address = location.raw.get('components', {})
-                location_details['city'] = address.get('city', address.get('town', address.get('village', '')))
-                location_details['state'] = address.get('state', '')
-                location_details['country'] = address.get('country', '')
-                location_details['postal_code'] = address.get('postcode', '')
-
-        except GeocoderTimedOut:
-            logging.error("Error: Geocoder service timed out")
-            raise GeocoderTimedOut
-        except Exception as e:
-            logging.error(f"Error: {e}")
-            raise Exception
-        
-        return location_details
+    if backend is None and cache is None and api_key:
+        return geocoding_client(api_key).reverse(latitude, longitude)
+    elif api_key or backend is not None:
+        backend = backend or geocoding_client(api_key).backend
+        cache   = cache or GEOCODE_CACHE
+        return cache.lookup(backend, latitude, longitude)
     else:
         return None
 
-@timing
+@profiled
 def get_opencage_key(data_file):
     df = load_data(data_file)
     if not df.empty and "opencage_key" in df.columns:
@@ -968,47 +1262,61 @@ def get_opencage_key(data_file):
     else:
         return None
 
-@timing    
+@profiled    
 def calculate_power_zone_time(df: pd.DataFrame, power_zones: pd.DataFrame) -> pd.DataFrame:
     if 'timestamp' not in df or 'power' not in df:
         logging.error("Main DataFrame must contain timestamp and power data")
         return pd.DataFrame()
-    
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['time_diff'] = df['timestamp'].diff().dt.total_seconds().fillna(0)
-    
-    zone_numbers  = list(set([int(row.split('.')[1]) for row in power_zones.index if 'zone.' in row]))
-    num_zones     = len(zone_numbers)
-    time_in_zones = {f'zone{i+1}': 0 for i in range(num_zones)}
 
-    for i in range(1, len(df)):
-        power         = df.iloc[i]['power']
-        time_interval = df.iloc[i]['time_diff']
+    return calculate_zone_time(df, power_zones, channel='power', low_key='low_pwr', max_key='max_pwr')
 
-        for zone_num in zone_numbers:
-            low_power_row = f'zone.{zone_num}.low_pwr'
-            max_power_row = f'zone.{zone_num}.max_pwr'
-
-            if low_power_row in power_zones.index and max_power_row in power_zones.index:
-                min_power = power_zones.loc[low_power_row]
-                max_power = power_zones.loc[max_power_row]
+@profiled
+def get_aerobic_te_features(summary: ActivitySummary, hr_zone_time: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds the aerobic training effect model inputs for one activity.
 
-                if min_power <= power <= max_power:
-                    time_in_zones[f'zone{zone_num}'] += time_interval
-                    break
+    Args:
+        summary (ActivitySummary): Output of get_summary().
+        hr_zone_time (pd.DataFrame): Output of calculate_hr_zone_time().
 
-    time_in_zones_df = pd.DataFrame({
-        'zone': list(time_in_zones.keys()),
-        'time_in_seconds': list(time_in_zones.values())
+    Returns:
+        pd.DataFrame: One row with the model features.
+    """
+    zone_time = hr_zone_time.set_index('zone')['time_in_seconds']
+
+    return pd.DataFrame({
+        'hr_time_in_zone_1':     [zone_time['zone1']],
+        'hr_time_in_zone_2':     [zone_time['zone2']],
+        'hr_time_in_zone_3':     [zone_time['zone3']],
+        'hr_time_in_zone_4':     [zone_time['zone4']],
+        'hr_time_in_zone_5':     [zone_time['zone5']],
+        'training_stress_score': [summary.tss],
+        'activity_distance':     [summary.distance_total],
+        'hr_average':            [summary.hr_avg],
+        'hr_max':                [summary.hr_max],
+        'time_total':            [summary.time_total_seconds],
+        'intensity_factor':      [summary.intensity_factor],
     })
 
-    return time_in_zones_df
+@profiled
+def predict_aerobic_training_effect_batch(input_df: pd.DataFrame) -> np.ndarray:
+    """
+    Predicts the aerobic training effect of many activities in a single forward pass.
+    The model and scaler are loaded once per process (see src.inference.ModelRegistry).
 
-@timing
+    Args:
+        input_df (pd.DataFrame): One row per activity, containing the necessary features.
+
+    Returns:
+        np.ndarray: Predicted aerobic training effect per row, rounded and capped at 5.0.
+    """
+    return get_aerobic_te_model().predict(input_df)
+
+@profiled
 def predict_aerobic_training_effect(input_df):
     """
-    Loads the pre-trained model and scaler, then predicts the aerobic training effect 
-    based on the provided DataFrame.
+    Predicts the aerobic training effect based on the provided DataFrame,
+    using the shared pre-trained model and scaler.
 
     Args:
         input_df (pd.DataFrame): DataFrame containing the necessary features.
@@ -1016,38 +1324,4 @@ def predict_aerobic_training_effect(input_df):
     Returns:
         float: Rounded predicted aerobic training effect.
     """
-    
-    MODEL  = load_model('./models/aerobic_training_effect_model.keras')
-    SCALER = joblib.load('./models/aerobic_training_effect_scaler.pkl')
-
-    required_keys = [
-        'activity_distance',
-        'hr_average',
-        'hr_max',
-        'hr_time_in_zone_1',
-        'hr_time_in_zone_2',
-        'hr_time_in_zone_3',
-        'hr_time_in_zone_4',
-        'hr_time_in_zone_5',
-        'intensity_factor',
-        'time_total',
-        'training_stress_score',
-    ]
-
-    # Ensure input DataFrame contains the required keys
-    input_data = {key: input_df[key].values[0] for key in required_keys if key in input_df.columns}
-    if len(input_data) < len(required_keys):
-        raise ValueError(f"Missing keys in input DataFrame. Required keys are: {required_keys}.")
-
-    input_df_ordered = pd.DataFrame([input_data])[required_keys]  # Ensure the order matches
-    input_scaled     = SCALER.transform(input_df_ordered)
-
-    @tf.function(reduce_retracing=True)
-    def make_prediction(input_scaled_tensor):
-        return MODEL(input_scaled_tensor)
-
-    input_scaled_tensor = tf.convert_to_tensor(input_scaled, dtype=tf.float32)
-    predictions_tensor  = make_prediction(input_scaled_tensor)
-    predicted_value     = min(5.0, round(float(predictions_tensor[0][0]), 1))
-
-    return predicted_value
+    return float(predict_aerobic_training_effect_batch(input_df.iloc[[0]])[0])